@@ -1,247 +1,250 @@
+"""
+Ad cost calculator CLI.
+
+Interactive by default: prompts for targeting, subscribers, views and a
+markup. With --batch it reads quote requests as JSON lines instead,
+
+    {"id": 1, "targeting": "india:5000, nepal:3000", "subs": 300, "markup": 50}
+
+and writes one result record per request (Quote.to_dict: breakdown, totals,
+client price; {"error": ...} for a bad request) in input order. Requests
+are streamed through in chunks, so memory stays flat however long the
+input is; --workers spreads the chunks over a process pool.
+
+Every priced quote is also recorded in the quote ledger (quote_ledger.py)
+unless --no-ledger is given.
+
+    python ad_cost_calculator.py
+    python ad_cost_calculator.py --batch quotes.jsonl --workers 4 > results.jsonl
+"""
+import argparse
+from collections import deque
+import datetime as dt
+from itertools import islice
+import json
 import sys
-import pandas as pd
 
-INR_TO_USD = 1 / 85  # Fixed conversion
-
-
-# ---------- Smart CSV reader ----------
-
-def _read_two_col_smart(filepath: str, value_col_name: str, value_name_hints: list[str] = None):
+from instrumentation import span
+from pricing_engine import (  # noqa: F401  (re-exported for existing imports)
+    INR_TO_USD,
+    WORLDWIDE_CPV_INR,
+    WORLDWIDE_CPS_INR,
+    Quote,
+    RateCard,
+    _read_two_col_smart,
+    allocate_subs,
+    breakdown_lines,
+    calculate_cost,
+    load_cps,
+    load_cpvs,
+    quote_batch,
+    quote_request_or_error,
+    quote_targeting,
+    split_even,
+    targeting_mode,
+)
+from rate_snapshot import CPS_FILE, CPV_FILE
+
+BATCH_CHUNK_LINES = 2_000  # requests per worker task
+
+
+# ---------- Batch (JSONL) mode ----------
+
+def quote_lines(card: RateCard, lines, rate_card: str = None,
+                customer: str = None) -> list[tuple[str, tuple | None]]:
     """
-    Robustly read 2+ column CSVs that might have title rows or be headerless.
-    Returns a DataFrame with columns ['Country', value_col_name].
+    (result record as JSON text, ledger entry) per request line; blank lines
+    are skipped. Entries are built only when rate_card (the card's ledger
+    version) is given, and never for errors.
     """
-    value_col_name = value_col_name.strip()
-    value_name_hints = (value_name_hints or [])
-    raw = pd.read_csv(filepath, header=None)
+    if rate_card is not None:
+        from quote_ledger import ledger_entry
+    out = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            req = json.loads(line)
+        except ValueError as e:
+            out.append((json.dumps({"error": f"Invalid JSON: {e}"}), None))
+            continue
+        record = quote_request_or_error(card, req)
+        entry = None
+        if rate_card is not None and "error" not in record:
+            entry = ledger_entry(record, req, req.get("customer") or customer, "batch", rate_card)
+        if isinstance(req, dict) and "id" in req:
+            record = {"id": req["id"], **record}
+        out.append((json.dumps(record, ensure_ascii=False), entry))
+    return out
 
-    if raw.shape[1] < 2:
-        raise ValueError(f"{filepath} must have at least two columns.")
 
-    first_second = pd.to_numeric(raw.iloc[0, 1], errors='coerce')
-    if pd.notna(first_second):
-        df = raw.iloc[:, :2].copy()
-        df.columns = ["Country", value_col_name]
-    else:
-        dfh = pd.read_csv(filepath)
-        dfh.columns = (dfh.columns.astype(str)
-                       .str.replace('\xa0', ' ', regex=False)
-                       .str.strip()
-                       .str.replace(r'\s+', ' ', regex=True))
-        country_col = next(
-            (c for c in dfh.columns if any(k in c.lower() for k in ['country', 'territory', 'user location'])),
-            dfh.columns[0]
-        )
-        value_col = next(
-            (c for c in dfh.columns
-             if any(h in c.lower() for h in [*value_name_hints, value_col_name.lower()])),
-            dfh.columns[-1]
-        )
-        df = dfh[[country_col, value_col]].copy()
-        df.columns = ["Country", value_col_name]
+def _chunks(lines, size: int):
+    lines = iter(lines)
+    while chunk := list(islice(lines, size)):
+        yield chunk
 
-    df["Country"] = df["Country"].astype(str).str.strip()
-    df[value_col_name] = pd.to_numeric(df[value_col_name], errors='coerce').fillna(0.0)
-    return df
 
+_worker_args = None
 
-# ---------- Loaders returning lookup dicts ----------
 
-def load_cpvs(filepath: str) -> dict[str, float]:
-    """
-    Reads a CSV that is either headerless or has a single header row.
-    Always returns a dict mapping lowercase country → CPV_INR.
-    """
-    raw = pd.read_csv(filepath, header=None)
-    if raw.shape[1] < 2:
-        raise ValueError(f"{filepath} must have at least two columns.")
-    # Detect header row: if cell (0,1) is not numeric, drop it
-    first = pd.to_numeric(raw.iloc[0, 1], errors='coerce')
-    if pd.isna(first):
-        data = raw.iloc[1:, [0, 1]].copy()
-    else:
-        data = raw.iloc[:, [0, 1]].copy()
-    data.columns = ["Country", "CPV_INR"]
-    data["Country"] = data["Country"].astype(str).str.strip().str.casefold()
-    data["CPV_INR"] = pd.to_numeric(data["CPV_INR"], errors='coerce').fillna(0)
-    return dict(zip(data["Country"], data["CPV_INR"]))
+def _init_worker(*args):
+    global _worker_args
+    _worker_args = args
+
 
+def _quote_chunk(lines: list[str]) -> list[tuple[str, tuple | None]]:
+    return quote_lines(*_worker_args[:1], lines, *_worker_args[1:])
 
-def load_cps(filepath: str) -> dict[str, float]:
+
+def stream_quotes(card: RateCard, lines, workers: int = 1, chunk_lines: int = BATCH_CHUNK_LINES,
+                  rate_card: str = None, customer: str = None):
     """
-    Reads a CSV that is either headerless or has a single header row.
-    Always returns a dict mapping lowercase country → CPS_INR.
-    Zero values are replaced with 10.0.
+    Yield quote_lines() pairs per request line, in input order. With
+    workers > 1, chunks are quoted in a process pool with at most
+    2 × workers chunks in flight, so neither input nor output is ever held
+    in full.
     """
-    raw = pd.read_csv(filepath, header=None)
-    if raw.shape[1] < 2:
-        raise ValueError(f"{filepath} must have at least two columns.")
-    first = pd.to_numeric(raw.iloc[0, 1], errors='coerce')
-    if pd.isna(first):
-        data = raw.iloc[1:, [0, 1]].copy()
-    else:
-        data = raw.iloc[:, [0, 1]].copy()
-    data.columns = ["Country", "CPS_INR"]
-    data["Country"] = data["Country"].astype(str).str.strip().str.casefold()
-    data["CPS_INR"] = pd.to_numeric(data["CPS_INR"], errors='coerce').fillna(0)
-    data.loc[data["CPS_INR"] == 0, "CPS_INR"] = 10.0
-    return dict(zip(data["Country"], data["CPS_INR"]))
+    if workers <= 1:
+        for chunk in _chunks(lines, chunk_lines):
+            yield from quote_lines(card, chunk, rate_card, customer)
+        return
 
+    from concurrent.futures import ProcessPoolExecutor
 
-# ---------- Cost engine ----------
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(card, rate_card, customer)) as pool:
+        pending = deque()
+        for chunk in _chunks(lines, chunk_lines):
+            pending.append(pool.submit(_quote_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
 
-def calculate_cost(total_inr: float, markup_percent: float):
-    client_inr = total_inr * (1 + markup_percent / 100.0)
-    return (
-        round(total_inr, 2),
-        round(total_inr * INR_TO_USD, 2),
-        round(client_inr, 2),
-        round(client_inr * INR_TO_USD, 2),
-    )
 
+def run_batch(card: RateCard, infile, outfile, workers: int = 1, ledger=None, customer: str = None) -> int:
+    """
+    Quote every request line of infile into outfile, recording each priced
+    quote in `ledger` (a QuoteLedger) if given. Returns the record count;
+    commit failures surface from ledger.close().
+    """
+    rate_card = None
+    if ledger is not None:
+        from quote_ledger import rate_card_version
 
-# ---------- Main ----------
-
-if __name__ == "__main__":
-    # --- Update these paths as needed ---
-    cpv_file = r"C:\Users\Asus\Downloads\Costing_automation\data\Cost_Conv Location Wise - March to May 27th 2025 - Countrywise Avg Cpv - Infeed + Instream.csv"
-    cps_file = r"C:\Users\Asus\Downloads\Costing_automation\data\Cost_Conv Location Wise - March to May 27th 2025 - Cost_Conv Location Wise - March to May 27th 2025.csv"
-    # --------------------------------------
+        rate_card = rate_card_version(card)
 
-    cpv_lookup = load_cpvs(cpv_file)
-    cps_lookup = load_cps(cps_file)
+    written = 0
+    for record, entry in stream_quotes(card, infile, workers, rate_card=rate_card, customer=customer):
+        outfile.write(record)
+        outfile.write("\n")
+        if entry is not None:
+            ledger.append(entry)
+        written += 1
+    return written
 
-    targeting_input = input(
-        "Enter targeting (worldwide OR country list OR country:views split): "
-    ).strip().casefold()
 
-    try:
-        total_subs = int(input("Enter total number of subscribers expected: "))
-    except ValueError:
-        print("❌ Invalid subscriber count.")
-        sys.exit(1)
+# ---------- Main ----------
 
-    total_views = 0
-    internal_cost_inr = 0.0
-    breakdown = []
+def main():
+    parser = argparse.ArgumentParser(description="Ad cost calculator (interactive, or JSONL with --batch).")
+    parser.add_argument("--cpv", default=CPV_FILE, help="CPV export CSV")
+    parser.add_argument("--cps", default=CPS_FILE, help="CPS export CSV")
+    parser.add_argument("--batch", nargs="?", const="-", metavar="FILE",
+                        help="read JSONL quote requests from FILE (or stdin) and write JSONL results to stdout")
+    parser.add_argument("--workers", type=int, default=1, help="with --batch, worker processes")
+    parser.add_argument("--customer", help="customer to record the quotes under")
+    parser.add_argument("--ledger", help="quote ledger file (default: next to the CPV export)")
+    parser.add_argument("--no-ledger", action="store_true", help="do not record quotes")
+    parser.add_argument("--as-of", type=dt.date.fromisoformat,
+                        help="quote with the rates in effect on this date (YYYY-MM-DD), from the rate history")
+    parser.add_argument("--trailing-months", type=int, default=0,
+                        help="with --as-of, average the rates over the trailing N months")
+    parser.add_argument("--history", help="rate history file (default: next to the CPV export)")
+    args = parser.parse_args()
+    if args.trailing_months and not args.as_of:
+        parser.error("--trailing-months requires --as-of")
+
+    if args.as_of:
+        # Dated rates from the history store (see rate_history.py); imported
+        # only here, so plain quotes do not pay for it at startup
+        from rate_history import RateHistory, default_history_path
 
-    # --- Worldwide fixed rates ---
-    if targeting_input == "worldwide":
         try:
-            views = int(input("Enter total views: "))
-        except ValueError:
-            print("❌ Invalid total views.")
+            history = RateHistory.load(args.history or default_history_path(args.cpv))
+            card = history.card(args.as_of, args.trailing_months)
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
             sys.exit(1)
+        # stderr, so batch output stays pure JSONL
+        print(f"📅 Rates as of {args.as_of}"
+              + (f", {args.trailing_months}-month trailing average" if args.trailing_months else ""),
+              file=sys.stderr)
+    else:
+        # Compiled snapshot; rebuilt automatically when either CSV changes
+        card = RateCard.from_files(args.cpv, args.cps)
 
-        cpv_inr = 0.22
-        cps_inr = 6.5
-
-        view_cost = views * cpv_inr
-        sub_cost = total_subs * cps_inr
-        internal_cost_inr = view_cost + sub_cost
-        total_views = views
+    # sqlite3 and the writer thread only load once a quote is to be recorded; the
+    # file is opened on the first write, and an unwritable one only warns
+    if args.no_ledger:
+        ledger = None
+    else:
+        from quote_ledger import RESULT_TIMEOUT, QuoteLedger, default_ledger_path, rate_card_version
 
-        breakdown.append(f"Worldwide Views: {views} × ₹{cpv_inr:.2f} = ₹{view_cost:.2f}")
-        breakdown.append(f"Worldwide Subs:  {total_subs} × ₹{cps_inr:.2f} = ₹{sub_cost:.2f}")
+        ledger = QuoteLedger(args.ledger or default_ledger_path(args.cpv))
 
-    # --- Custom "country:views" splits with proportional subscriber allocation ---
-    elif ":" in targeting_input:
-        parts = [p.strip() for p in targeting_input.split(",") if p.strip()]
-        if not parts:
-            print("❌ No countries provided.")
+    if args.batch:
+        try:
+            infile = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+        except OSError as e:
+            print(f"❌ {e}", file=sys.stderr)
             sys.exit(1)
-
-        # First, parse all views and keys
-        entries = []
-        for entry in parts:
-            if ":" not in entry:
-                print(f"❌ Invalid format: '{entry}'. Use country:views")
-                sys.exit(1)
-            country_raw, view_str = entry.split(":", 1)
-            key = country_raw.strip().casefold()
+        with infile, span("cli.batch"):
+            run_batch(card, infile, sys.stdout, args.workers, ledger, args.customer)
+        if ledger is not None:
             try:
-                views = int(view_str.strip())
-            except ValueError:
-                print(f"❌ Invalid view count for '{country_raw}'.")
-                sys.exit(1)
-            if key not in cpv_lookup or key not in cps_lookup:
-                print(f"❌ No CPV/CPS for '{country_raw}'. Available: {', '.join(sorted(cpv_lookup.keys()))}")
+                ledger.close()
+            except Exception as e:
+                print(f"❌ {ledger.lost} quotes were not saved to the ledger: {e}", file=sys.stderr)
                 sys.exit(1)
-            entries.append((country_raw, key, views))
-
-        # Sum total views in this custom split
-        sum_views = sum(v for _, _, v in entries)
-        if sum_views == 0:
-            print("❌ Total views cannot be zero.")
-            sys.exit(1)
-
-        # Compute proportional subscribers
-        ideal_subs = [total_subs * v / sum_views for _, _, v in entries]
-        floor_subs = [int(x) for x in ideal_subs]
-        leftover = total_subs - sum(floor_subs)
+        return
 
-        # Distribute leftover based on largest fractional parts
-        fracs = [(ideal_subs[i] - floor_subs[i], i) for i in range(len(floor_subs))]
-        for _, idx in sorted(fracs, reverse=True)[:leftover]:
-            floor_subs[idx] += 1
-
-        # Now calculate costs
-        for (country_raw, key, views), assigned_subs in zip(entries, floor_subs):
-            cpv_inr = cpv_lookup[key]
-            cps_inr = cps_lookup[key]
-
-            vc = views * cpv_inr
-            sc = assigned_subs * cps_inr
-            internal_cost_inr += (vc + sc)
-            total_views += views
-
-            breakdown.append(f"{country_raw.title()} Views: {views} × ₹{cpv_inr:.2f} = ₹{vc:.2f}")
-            breakdown.append(f"{country_raw.title()} Subs:  {assigned_subs} × ₹{cps_inr:.2f} = ₹{sc:.2f}")
+    targeting_input = input(
+        "Enter targeting (worldwide OR country list OR country:views split): "
+    ).strip().casefold()
 
-    # --- Even split across listed countries ---
-    else:
-        countries = [c.strip() for c in targeting_input.split(",") if c.strip()]
-        if not countries:
-            print("❌ No countries provided.")
-            sys.exit(1)
+    try:
+        total_subs = int(input("Enter total number of subscribers expected: "))
+    except ValueError:
+        print("❌ Invalid subscriber count.")
+        sys.exit(1)
 
+    mode = targeting_mode(targeting_input)
+    views = None
+    if mode != "custom":
         try:
-            views_total = int(input("Enter total number of views: "))
+            views = int(input("Enter total views: " if mode == "worldwide" else "Enter total number of views: "))
         except ValueError:
             print("❌ Invalid total views.")
             sys.exit(1)
 
-        views_per_country = views_total // len(countries)
-        leftover_views = views_total % len(countries)
-        subs_per_country = total_subs // len(countries)
-        leftover_subs = total_subs % len(countries)
-
-        for i, country_raw in enumerate(countries):
-            key = country_raw.casefold()
-            if key not in cpv_lookup or key not in cps_lookup:
-                print(f"❌ No CPV/CPS for '{country_raw}'. Available: {', '.join(sorted(cpv_lookup.keys()))}")
-                sys.exit(1)
-
-            cpv_inr = cpv_lookup[key]
-            cps_inr = cps_lookup[key]
-
-            v = views_per_country + (1 if i < leftover_views else 0)
-            s = subs_per_country + (1 if i < leftover_subs else 0)
-
-            vc = v * cpv_inr
-            sc = s * cps_inr
-            internal_cost_inr += (vc + sc)
-            total_views += v
-
-            breakdown.append(f"{country_raw.title()} Views: {v} × ₹{cpv_inr:.2f} = ₹{vc:.2f}")
-            breakdown.append(f"{country_raw.title()} Subs:  {s} × ₹{cps_inr:.2f} = ₹{sc:.2f}")
+    try:
+        with span(f"cli.quote.{mode}"):
+            quote = quote_targeting(card, targeting_input, total_subs, views)
+    except KeyError as e:
+        print(f"❌ {e.args[0]}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
 
     # ---- Output breakdown ----
-    print("\n📊 Cost Breakdown:")
-    for line in breakdown:
-        print("  -", line)
-    print(f"\n📦 Total Views: {total_views}")
-    print(f"🧾 Internal Total Cost (INR): ₹{internal_cost_inr:.2f}")
+    with span("cli.render"):
+        print("\n📊 Cost Breakdown:")
+        for line in quote.breakdown():
+            print("  -", line)
+        print(f"\n📦 Total Views: {quote.total_views}")
+        print(f"🧾 Internal Total Cost (INR): ₹{quote.internal_inr:.2f}")
 
     # ---- Profit margin selection & final quote ----
     print("\nChoose your profit margin:")
@@ -265,8 +268,26 @@ if __name__ == "__main__":
         print("❌ Invalid profit input.")
         sys.exit(1)
 
-    internal_inr, internal_usd, client_inr, client_usd = calculate_cost(
-        internal_cost_inr, markup
-    )
+    internal_inr, internal_usd, client_inr, client_usd = quote.price(markup)
     print(f"\n✅ Cost to us: ₹{internal_inr} / ${internal_usd}")
     print(f"💼 Offer to client (at {markup}% markup): ₹{client_inr} / ${client_usd}")
+
+    if ledger is not None:
+        request = {"targeting": targeting_input, "subs": total_subs, "views": views, "markup": markup}
+        future = ledger.record(quote.to_dict(markup), request, args.customer, "cli", rate_card_version(card))
+        try:
+            quote_id = future.result(timeout=RESULT_TIMEOUT)
+        except TimeoutError:
+            print("❌ The quote ledger did not answer in time; the quote may not be saved.")
+            sys.exit(1)
+        except Exception as e:
+            if ledger.unavailable is None:
+                print(f"❌ Quote not saved to the ledger: {e}")
+                sys.exit(1)
+            return  # the ledger has already warned that it cannot be written
+        ledger.close()
+        print(f"🗂️ Saved as quote #{quote_id}")
+
+
+if __name__ == "__main__":
+    main()
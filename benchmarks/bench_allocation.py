@@ -0,0 +1,69 @@
+"""
+Largest-remainder subscriber allocation: list loop vs NumPy batch.
+
+Generates splits across every country on the card (plus tie-heavy splits
+with repeated view counts), checks that allocate_subs_batch matches the
+original list-based allocate_subs exactly, then times both.
+
+    python benchmarks/bench_allocation.py [--quotes 2000] [--countries 236]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing_engine import allocate_subs, allocate_subs_batch  # noqa: E402
+
+
+def _workload(quotes: int, countries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    views = rng.integers(0, 200_000, size=(quotes, countries))
+    # Every other quote uses a handful of repeated view counts to force ties
+    views[::2] = rng.choice([1000, 2500, 5000, 10000], size=(len(views[::2]), countries))
+    views[:, 0] += 1  # never an all-zero split
+    subs = rng.integers(0, 50_000, size=quotes)
+    return views, subs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quotes", type=int, default=2000)
+    parser.add_argument("--countries", type=int, default=236)
+    args = parser.parse_args()
+
+    views, subs = _workload(args.quotes, args.countries)
+    view_lists = views.tolist()
+    sub_list = subs.tolist()
+
+    t0 = time.perf_counter()
+    expected = [allocate_subs(s, v) for s, v in zip(sub_list, view_lists)]
+    loop_s = time.perf_counter() - t0
+
+    allocate_subs_batch(subs[:8], views[:8])  # warm up NumPy
+    t0 = time.perf_counter()
+    got = allocate_subs_batch(subs, views)
+    batch_s = time.perf_counter() - t0
+
+    if got.tolist() != expected:
+        print("❌ batch allocation differs from allocate_subs")
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    for s, v in zip(sub_list, views):
+        allocate_subs_batch(s, v)
+    single_s = time.perf_counter() - t0
+
+    n = args.quotes
+    print(f"{n} quotes × {args.countries} countries (results identical)")
+    print(f"list loop        {loop_s * 1000:9.1f} ms   {loop_s / n * 1e6:8.1f} µs/quote")
+    print(f"numpy per quote  {single_s * 1000:9.1f} ms   {single_s / n * 1e6:8.1f} µs/quote")
+    print(f"numpy 2-D batch  {batch_s * 1000:9.1f} ms   {batch_s / n * 1e6:8.1f} µs/quote"
+          f"   ({loop_s / batch_s:.1f}× faster)")
+
+
+if __name__ == "__main__":
+    main()
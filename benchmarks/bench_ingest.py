@@ -0,0 +1,65 @@
+"""
+Streaming export ingest: rows/s and peak memory, sequential vs parallel.
+
+Writes synthetic raw per-day exports (see synthetic.py), aggregates them
+with export_ingest in one process and across worker processes, checks
+that both give the same totals, and reports throughput and the peak RSS
+of the process, which stays flat as --rows grows.
+
+    python benchmarks/bench_ingest.py [--files 4] [--rows 500000] [--workers 4]
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export_ingest import aggregate_files  # noqa: E402
+from synthetic import region_names, write_raw_export  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=500_000, help="rows per file")
+    parser.add_argument("--regions", type=int, default=236)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    regions = region_names(args.regions)
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = [os.path.join(workdir, f"raw_{i}.csv") for i in range(args.files)]
+        for i, path in enumerate(paths):
+            write_raw_export(path, regions, args.rows, seed=i)
+        size_mb = sum(os.path.getsize(p) for p in paths) / 1e6
+        total_rows = args.files * args.rows
+
+        t0 = time.perf_counter()
+        sequential = aggregate_files(paths, workers=1, chunk_rows=args.chunk_rows)
+        seq_s = time.perf_counter() - t0
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        t0 = time.perf_counter()
+        parallel = aggregate_files(paths, workers=args.workers, chunk_rows=args.chunk_rows)
+        par_s = time.perf_counter() - t0
+
+    same = sequential.keys() == parallel.keys() and all(
+        abs(a - b) <= 1e-6 * max(1.0, abs(a))
+        for k in sequential for a, b in zip(sequential[k][1:], parallel[k][1:])
+    )
+    if not same:
+        print("❌ parallel totals differ from sequential")
+        sys.exit(1)
+
+    print(f"{args.files} files × {args.rows:,} rows ({size_mb:,.0f} MB), {len(sequential)} countries")
+    print(f"sequential       {seq_s:7.2f} s   {total_rows / seq_s:12,.0f} rows/s   peak RSS {peak_mb:,.0f} MB")
+    print(f"{args.workers} workers        {par_s:7.2f} s   {total_rows / par_s:12,.0f} rows/s"
+          f"   ({seq_s / par_s:.1f}× faster)")
+
+
+if __name__ == "__main__":
+    main()
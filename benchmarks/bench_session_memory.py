@@ -0,0 +1,78 @@
+"""
+Per-session memory of the rate card in the Streamlit app.
+
+"before" replays what every rerun did with @st.cache_data loaders: each
+session receives its own unpickled copy of the CPV and CPS dicts and
+re-derives the sorted and title-cased country option lists. "after"
+replays the shared path: one RateCard in st.cache_resource plus option
+lists memoized once per card. Each simulated session keeps what its
+rerun holds, and tracemalloc reports the bytes retained per session.
+
+    python benchmarks/bench_session_memory.py [--sessions 15]
+"""
+import argparse
+import gc
+import os
+import pickle
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import quote_memo  # noqa: E402
+from pricing_engine import RateCard, load_cps, load_cpvs  # noqa: E402
+
+CPV_FILE = "data/Cost_Conv_Location_CPV.csv"
+CPS_FILE = "data/Cost_Conv_Location_CPS.csv"
+
+
+def _before_session(cpv_blob: bytes, cps_blob: bytes) -> tuple:
+    # st.cache_data hands each caller a fresh deserialized copy
+    cpv_lookup, cps_lookup = pickle.loads(cpv_blob), pickle.loads(cps_blob)
+    countries = sorted([c for c in cpv_lookup.keys() if c and c[0].isalpha()])
+    country_options = sorted([c.title() for c in cpv_lookup.keys() if c and c[0].isalpha()])
+    return cpv_lookup, cps_lookup, countries, country_options
+
+
+def _after_session(card: RateCard) -> tuple:
+    return card, quote_memo.country_keys(card), quote_memo.country_titles(card)
+
+
+def _measure(make_session, sessions: int) -> tuple[int, int]:
+    """(first-session bytes, bytes per extra session) retained."""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    held = [make_session()]
+    first = tracemalloc.get_traced_memory()[0] - base
+    held += [make_session() for _ in range(sessions - 1)]
+    total = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del held
+    return first, (total - first) // max(sessions - 1, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=15)
+    args = parser.parse_args()
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    cpv_blob = pickle.dumps(load_cpvs(CPV_FILE))
+    cps_blob = pickle.dumps(load_cps(CPS_FILE))
+    before = _measure(lambda: _before_session(cpv_blob, cps_blob), args.sessions)
+
+    card = RateCard.from_lookups(load_cpvs(CPV_FILE), load_cps(CPS_FILE))
+    quote_memo.country_keys.cache_clear()
+    quote_memo.country_titles.cache_clear()
+    after = _measure(lambda: _after_session(card), args.sessions)
+
+    print(f"{args.sessions} sessions")
+    print(f"{'':<28}{'first session':>15}{'per extra session':>20}{'total':>12}")
+    for name, (first, extra) in (("before (cache_data copies)", before), ("after (shared card)", after)):
+        total = first + extra * (args.sessions - 1)
+        print(f"{name:<28}{first / 1024:>12.1f} KiB{extra / 1024:>17.1f} KiB{total / 1024:>9.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
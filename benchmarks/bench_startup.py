@@ -0,0 +1,75 @@
+"""
+Cold-start benchmark for scripted quoting.
+
+Each sample is a fresh `python ad_cost_calculator.py --batch` pricing one
+quote from stdin, the way scripts call it, with and without recording the
+quote in a (scratch) ledger. A bare interpreter and the old pandas path
+(import pandas + read_csv of both exports) are timed for comparison; the
+budget applies to the two CLI runs.
+
+    python benchmarks/bench_startup.py [--runs 15] [--budget-ms 100]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUEST = '{"targeting": "india", "subs": 100, "views": 5000, "markup": 50}\n'
+CLI = ["ad_cost_calculator.py", "--batch"]
+BUDGETED = ("cli --no-ledger", "cli + ledger")
+
+
+def scenarios(ledger_file: str) -> dict[str, list[str]]:
+    return {
+        "python (baseline)": ["-c", "pass"],
+        "cli --no-ledger": CLI + ["--no-ledger"],
+        "cli + ledger": CLI + ["--ledger", ledger_file],
+        "pandas read_csv": ["-c", (
+            "import pandas as pd\n"
+            "pd.read_csv('data/Cost_Conv_Location_CPV.csv', header=None)\n"
+            "pd.read_csv('data/Cost_Conv_Location_CPS.csv', header=None)\n"
+        )],
+    }
+
+
+def _time_once(argv: list[str]) -> float:
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, *argv], cwd=ROOT, input=REQUEST, text=True,
+                   stdout=subprocess.DEVNULL, check=True)
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    ok = True
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, argv in scenarios(os.path.join(tmp, "quotes.ledger")).items():
+            try:
+                _time_once(argv)  # warm the OS page cache and the snapshot
+            except subprocess.CalledProcessError:
+                print(f"{name:<20} skipped (failed to run)")
+                continue
+            samples = [_time_once(argv) for _ in range(args.runs)]
+            p50 = statistics.median(samples)
+            baseline = p50 if baseline is None else baseline
+            print(f"{name:<20} p50 {p50:7.1f} ms   min {min(samples):7.1f} ms"
+                  f"   +{p50 - baseline:6.1f} ms over python")
+            if name in BUDGETED and p50 > args.budget_ms:
+                ok = False
+
+    print("✅ within budget" if ok else f"❌ over {args.budget_ms:.0f} ms budget")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Benchmark suite: loaders, allocation and pricing on synthetic rate cards.
+
+For each card size it writes synthetic CPV/CPS exports (see synthetic.py)
+and times _read_two_col_smart, load_cpvs and load_cps on them, then prices
+a mixed worldwide/custom/even quote workload against the loaded card,
+timing quote_targeting, the subscriber allocation, calculate_cost and the
+same splits priced as one quote_batch. It also times building the
+ValueTable ranking and a reverse-budget answer across every country.
+
+Results are written as JSON (default benchmarks/results/<git rev>.json).
+Pass --compare with an earlier results file to print the change per
+benchmark; the exit status is 1 if any median slowed down by more than
+--threshold.
+
+    python benchmarks/bench_suite.py [--sizes 236,1000,10000,100000] [--quotes 3000]
+    python benchmarks/bench_suite.py --compare benchmarks/results/abc1234.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from pricing_engine import (  # noqa: E402
+    RateCard,
+    _read_two_col_smart,
+    allocate_subs,
+    allocate_subs_batch,
+    calculate_cost,
+    load_cps,
+    load_cpvs,
+    parse_splits,
+    quote_batch,
+    quote_targeting,
+    targeting_mode,
+)
+from value_table import ValueTable  # noqa: E402
+from synthetic import quote_workload, region_names, write_cps_csv, write_cpv_csv  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def _git_rev() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _time(fn, repeat: int, items: int = 1) -> dict:
+    """Run fn once to warm up, then `repeat` times; seconds per run and per item."""
+    fn()
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    median = statistics.median(runs)
+    return {"items": items, "repeat": repeat, "min_s": min(runs), "median_s": median,
+            "mean_s": statistics.fmean(runs), "median_us_per_item": median / items * 1e6}
+
+
+def _bench_size(rows: int, quotes: int, repeat: int, workdir: str) -> dict:
+    regions = region_names(rows)
+    cpv_file = os.path.join(workdir, f"cpv_{rows}.csv")
+    cps_file = os.path.join(workdir, f"cps_{rows}.csv")
+    write_cpv_csv(cpv_file, regions)
+    write_cps_csv(cps_file, regions)
+
+    results = {
+        "_read_two_col_smart": _time(lambda: _read_two_col_smart(cpv_file, "CPV_INR", ["cpv"]), repeat, rows),
+        "load_cpvs": _time(lambda: load_cpvs(cpv_file), repeat, rows),
+        "load_cps": _time(lambda: load_cps(cps_file), repeat, rows),
+    }
+
+    card = RateCard.from_lookups(load_cpvs(cpv_file), load_cps(cps_file))
+    workload = quote_workload(regions, quotes)
+    results["quote_targeting"] = _time(
+        lambda: [quote_targeting(card, t, s, v) for t, s, v in workload], repeat, quotes)
+
+    splits = [([v for _, v in parse_splits(t)], s) for t, s, _ in workload if targeting_mode(t) == "custom"]
+    results["allocate_subs"] = _time(lambda: [allocate_subs(s, v) for v, s in splits], repeat, len(splits))
+
+    width = max(len(v) for v, _ in splits)
+    padded = np.zeros((len(splits), width), dtype=np.int64)
+    for i, (v, _) in enumerate(splits):
+        padded[i, :len(v)] = v
+    subs = np.array([s for _, s in splits], dtype=np.int64)
+    results["allocate_subs_batch"] = _time(lambda: allocate_subs_batch(subs, padded), repeat, len(splits))
+
+    totals = [q.internal_inr for q in (quote_targeting(card, t, s, v) for t, s, v in workload)]
+    results["calculate_cost"] = _time(lambda: [calculate_cost(x, 50) for x in totals], repeat, quotes)
+
+    # The custom splits as one batch of lines, summed per quote in int64 micro-rupees
+    lines = [(c, v, s, i) for i, (t, total, _) in enumerate(workload) if targeting_mode(t) == "custom"
+             for (c, v), s in zip(parse_splits(t), allocate_subs(total, [v for _, v in parse_splits(t)]))]
+    keys, line_views, line_subs, quote_ids = (list(col) for col in zip(*lines))
+    quote_ids = np.unique(quote_ids, return_inverse=True)[1]
+    results["quote_batch"] = _time(
+        lambda: quote_batch(card, keys, line_views, line_subs, 50, quote_ids), repeat, len(lines))
+
+    results["value_table"] = _time(lambda: ValueTable(card), repeat, rows)
+    table = ValueTable(card)
+    budgets = np.arange(50, 5050, 50)
+    results["reverse_budget"] = _time(lambda: table.reverse_budget(budgets), repeat, rows * len(budgets))
+    return results
+
+
+def _compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """Print median changes against a baseline; True if any exceeds threshold."""
+    regressed = False
+    print(f"\nvs {baseline['meta'].get('git_rev', '?')}:")
+    for key, result in current["results"].items():
+        old = baseline["results"].get(key)
+        if old is None:
+            continue
+        change = result["median_s"] / old["median_s"] - 1
+        flag = " ⚠️" if change > threshold else ""
+        regressed |= bool(flag)
+        print(f"  {key:<36}{change:+8.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="236,1000,10000,100000",
+                        help="comma-separated region-row counts")
+    parser.add_argument("--quotes", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="results JSON path (default results/<git rev>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="median slowdown that counts as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    import pandas
+
+    report = {
+        "meta": {
+            "git_rev": _git_rev(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pandas.__version__,
+            "platform": platform.platform(),
+            "quotes": args.quotes,
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in (int(s) for s in args.sizes.split(",")):
+            for name, result in _bench_size(rows, args.quotes, args.repeat, workdir).items():
+                key = f"{name}[rows={rows}]"
+                report["results"][key] = result
+                print(f"{key:<36}{result['median_s'] * 1000:10.2f} ms"
+                      f"{result['median_us_per_item']:10.2f} µs/item")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['meta']['git_rev']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if _compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
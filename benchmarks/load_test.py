@@ -0,0 +1,128 @@
+"""
+Load test for quote_service.py against localhost.
+
+Opens --connections keep-alive connections and sends --requests quote
+requests in total (single quotes, or batches with --batch N), then
+reports requests/sec and p50/p99 latency. Use --spawn to start the
+service in a subprocess for the duration of the run (with --no-ledger, so
+the synthetic quotes are not recorded).
+
+    python benchmarks/load_test.py --spawn [--requests 5000] [--connections 32]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_QUOTES = [
+    {"targeting": "worldwide", "views": 80000, "subs": 2000, "markup": 50},
+    {"targeting": "india:50000, united states:20000", "subs": 3000, "markup": 45},
+    {"targeting": "india, france, germany", "views": 30000, "subs": 900, "markup": 55},
+    {"targeting": "brazil:10000, mexico:8000, spain:4000, italy:3000", "subs": 1200, "markup": 60},
+]
+
+
+async def _request(reader, writer, path: str, payload: dict) -> int:
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def _worker(host, port, count, batch, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random(count)
+    try:
+        for _ in range(count):
+            if batch > 1:
+                path, payload = "/quote/batch", {"quotes": [rng.choice(SAMPLE_QUOTES) for _ in range(batch)]}
+            else:
+                path, payload = "/quote", rng.choice(SAMPLE_QUOTES)
+            t0 = time.perf_counter()
+            status = await _request(reader, writer, path, payload)
+            latencies.append(time.perf_counter() - t0)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def _run(args) -> tuple[list[float], list[int], float]:
+    latencies, errors = [], []
+    per_conn = [args.requests // args.connections + (1 if i < args.requests % args.connections else 0)
+                for i in range(args.connections)]
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_worker(args.host, args.port, n, args.batch, latencies, errors)
+                           for n in per_conn if n))
+    return latencies, errors, time.perf_counter() - t0
+
+
+async def _wait_for_port(host, port, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--batch", type=int, default=1, help="quotes per request (uses /quote/batch)")
+    parser.add_argument("--spawn", action="store_true", help="start quote_service.py for the run")
+    args = parser.parse_args()
+
+    proc = None
+    if args.spawn:
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "quote_service.py"), "--host", args.host,
+             "--port", str(args.port), "--no-ledger"],
+            cwd=ROOT, stdout=subprocess.DEVNULL,
+        )
+    try:
+        asyncio.run(_wait_for_port(args.host, args.port))
+        latencies, errors, elapsed = asyncio.run(_run(args))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    ms = sorted(x * 1000 for x in latencies)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    print(f"{len(ms)} requests × {args.batch} quote(s) over {args.connections} connections in {elapsed:.2f} s")
+    print(f"throughput  {len(ms) / elapsed:9.0f} req/s   {len(ms) * args.batch / elapsed:9.0f} quotes/s")
+    print(f"latency     p50 {statistics.median(ms):7.2f} ms   p99 {p99:7.2f} ms   max {ms[-1]:7.2f} ms")
+    if errors:
+        print(f"❌ {len(errors)} non-200 responses")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Synthetic rate cards and quote workloads for the benchmarks.
+
+write_cpv_csv/write_cps_csv reproduce the two Google Ads export layouts
+the loaders are written against, at any number of region rows:
+
+CPV  title row, date row with '#DIV/0!', then 'Country,0.12' rows with a
+     repeated 'Country/Territory (User location),#DIV/0!' row and 0.00
+     rates mixed in.
+CPS  title row, date row and a header row, then 'Country,Cost / conv.,
+     Cost,Conversions' rows where most regions have zero conversions.
+
+RAW  per-day, per-campaign rows as exported before aggregation (see
+     export_ingest.py), with title rows, '--' cells, thousands separators
+     and 'Total:' footer rows.
+
+Everything is seeded, so the same arguments always write the same files.
+"""
+import random
+
+from pricing_engine import WORLDWIDE
+
+CPV_TITLE = ("Avg CPV - Video Views March - May 27th 2025", "AVERAGE CPV (Infeed+Instream)")
+CPS_TITLE = "Cost-Conv Location Wise - March to May 27th 2025"
+DATE_ROW = "1 March 2025 - 27 May 2025"
+HEADER = "Country/Territory (User location)"
+
+
+def region_names(n: int) -> list[str]:
+    """n distinct region names that sort in generation order."""
+    return [f"Region {i:06d}" for i in range(n)]
+
+
+def write_cpv_csv(path: str, regions: list[str], seed: int = 0) -> None:
+    rng = random.Random(seed)
+    lines = [",".join(CPV_TITLE), f"{DATE_ROW},#DIV/0!"]
+    for i, name in enumerate(regions):
+        if i % 50 == 48:  # the export repeats its header mid-file
+            lines.append(f"{HEADER},#DIV/0!")
+        rate = 0.0 if rng.random() < 0.05 else rng.uniform(0.01, 0.6)
+        lines.append(f"{name},{rate:.2f}")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def write_cps_csv(path: str, regions: list[str], seed: int = 1) -> None:
+    rng = random.Random(seed)
+    lines = [f"{CPS_TITLE},,,", f"{DATE_ROW},,,", f"{HEADER},Cost / conv.,Cost,Conversions"]
+    for name in regions:
+        cost = round(rng.uniform(0, 40), 2) if rng.random() < 0.7 else 0
+        conversions = rng.randint(1, 20) if rng.random() < 0.2 else 0
+        per_conv = round(cost / conversions, 2) if conversions else 0
+        lines.append(f"{name},{per_conv},{cost},{conversions}")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def write_raw_export(path: str, regions: list[str], rows: int, seed: int = 3) -> None:
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("Location report\n1 March 2025 - 27 May 2025\n")
+        f.write(f"Day,Campaign,{HEADER},Cost,Conversions,Views\n")
+        for i in range(rows):
+            cost = rng.uniform(0, 2500)
+            views = int(cost / rng.uniform(0.02, 0.6))
+            conversions = "--" if rng.random() < 0.3 else rng.randint(0, 40)
+            cost_text = f'"{cost:,.2f}"' if cost >= 1000 else f"{cost:.2f}"
+            f.write(f"2025-03-{1 + i % 28:02d},Campaign {i % 17},{rng.choice(regions)},"
+                    f"{cost_text},{conversions},{views}\n")
+        f.write("Total: Account,,,,,\n")
+
+
+def quote_workload(regions: list[str], n: int, max_countries: int = 12, seed: int = 2) -> list[tuple]:
+    """
+    n (targeting, subs, views) requests, cycling worldwide, custom
+    'country:views' splits and even splits, as quote_targeting takes them.
+    views is None for custom splits.
+    """
+    rng = random.Random(seed)
+    requests = []
+    for i in range(n):
+        mode = i % 3
+        if mode == 0:
+            views = rng.randint(80_000, 2_000_000)
+            requests.append((WORLDWIDE, rng.randint(2000, views // 20), views))
+            continue
+        picked = rng.sample(regions, rng.randint(1, min(max_countries, len(regions))))
+        if mode == 1:
+            splits = [(c, rng.randint(1000, 200_000)) for c in picked]
+            total = sum(v for _, v in splits)
+            targeting = ", ".join(f"{c}:{v}" for c, v in splits)
+            requests.append((targeting, rng.randint(0, total // 20), None))
+        else:
+            views = rng.randint(10_000, 1_000_000)
+            requests.append((", ".join(picked), rng.randint(0, views // 20), views))
+    return requests
@@ -0,0 +1,117 @@
+"""
+Budget optimizer: the best views/subs allocation for a USD/INR budget.
+
+Every country is bought as the same bundle the "What can you get for $X?"
+tabs use, views plus subs_ratio × views subscribers, so one view costs
+cpv + subs_ratio × cps. With a single budget constraint and per-country
+min/max views, the linear programme is a fractional knapsack. Greedy
+filling by value per rupee is therefore optimal, and a sort plus a
+cumulative-sum search solves the full card in well under a millisecond.
+"""
+import numpy as np
+
+from pricing_engine import INR_TO_USD, RateCard, _country_rates
+
+SUBS_RATIO = 0.05  # subscribers per view, as in the app's 5% cap
+
+# Subscribers are a fixed ratio of views, so maximizing views maximizes them too
+OBJECTIVES = {
+    "views": "Maximize total views (and subscribers)",
+    "value": "Maximize market value (weights per country, CPV by default)",
+}
+
+
+class BudgetAllocation:
+    """Per-country result of optimize_budget, in the order countries were given."""
+
+    def __init__(self, countries, views, subs, cost_inr, budget_inr, objective):
+        self.countries = countries
+        self.views = views
+        self.subs = subs
+        self.cost_inr = cost_inr
+        self.budget_inr = budget_inr
+        self.objective = objective
+
+    @property
+    def total_views(self) -> int:
+        return int(self.views.sum())
+
+    @property
+    def total_subs(self) -> int:
+        return int(self.subs.sum())
+
+    @property
+    def total_cost_inr(self) -> float:
+        return float(self.cost_inr.sum())
+
+    @property
+    def unspent_inr(self) -> float:
+        return self.budget_inr - self.total_cost_inr
+
+    def rows(self) -> list[tuple[str, int, int, float]]:
+        """(country, views, subs, cost_inr) for countries that received views."""
+        return [(c, v, s, x) for c, v, s, x in
+                zip(self.countries, self.views.tolist(), self.subs.tolist(), self.cost_inr.tolist())
+                if v > 0]
+
+
+def optimize_budget(card: RateCard, budget_inr: float, countries: list[str],
+                    objective: str = "views", min_views: dict[str, int] = None,
+                    max_views: dict[str, int] = None, weights: dict[str, float] = None,
+                    subs_ratio: float = SUBS_RATIO, strict: bool = True) -> BudgetAllocation:
+    """
+    Allocate budget_inr across countries to maximize the objective.
+
+    min_views/max_views optionally bound each country's views (keys are
+    country names in any case). 'views' also maximizes subscribers, a
+    fixed ratio of views; 'value' weights each view by weights[country],
+    defaulting to the country's CPV as a market-value proxy.
+
+    Unknown countries, and countries missing a rate, raise KeyError with
+    suggestions, as in quote_custom; strict=False buys them at the default
+    rates instead. Raises ValueError if the minimums alone exceed the
+    budget.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}'. Use one of: {', '.join(OBJECTIVES)}.")
+    if not countries:
+        raise ValueError("No countries provided.")
+
+    def _per_country(mapping, default):
+        folded = {k.strip().casefold(): v for k, v in (mapping or {}).items()}
+        return np.array([folded.get(c.strip().casefold(), default) for c in countries], dtype=np.float64)
+
+    cpv, cps = np.array([_country_rates(card, c, strict) for c in countries], dtype=np.float64).T
+    unit = cpv + subs_ratio * cps  # INR per view, subs included
+    lo = _per_country(min_views, 0.0)
+    hi = np.maximum(_per_country(max_views, np.inf), lo)
+
+    remaining = budget_inr - float(lo @ unit)
+    if remaining < 0:
+        raise ValueError(
+            f"Minimum views need ₹{budget_inr - remaining:,.0f}, more than the ₹{budget_inr:,.0f} budget."
+        )
+
+    if objective == "views":
+        value = np.ones_like(unit)
+    else:
+        value = cpv if weights is None else _per_country(weights, 0.0)
+
+    # Fill the best value-per-rupee countries up to their max, in order
+    order = np.argsort(-(value / unit), kind="stable")
+    order = order[value[order] > 0]
+    cap_cost = ((hi - lo) * unit)[order]
+    filled_before = np.concatenate(([0.0], np.cumsum(cap_cost)[:-1]))
+    spend = np.clip(remaining - filled_before, 0.0, cap_cost)
+
+    extra = np.zeros_like(unit)
+    extra[order] = spend / unit[order]
+    views = np.floor(lo + extra + 1e-9).astype(np.int64)
+    subs = np.floor(subs_ratio * views + 1e-9).astype(np.int64)
+    cost = views * cpv + subs * cps
+    return BudgetAllocation(list(countries), views, subs, cost, budget_inr, objective)
+
+
+def optimize_budget_usd(card: RateCard, budget_usd: float, countries: list[str], **kwargs) -> BudgetAllocation:
+    """optimize_budget with the budget given in USD."""
+    return optimize_budget(card, budget_usd / INR_TO_USD, countries, **kwargs)
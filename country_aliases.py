@@ -0,0 +1,108 @@
+"""
+Country alias resolution and typo suggestions.
+
+The exports name countries their own way ("United States", "Turkiye",
+"Myanmar (Burma)"), while quotes and costing.csv say "USA", "Turkey" or
+"MM". data/country_aliases.csv maps each export name to its ISO-2/ISO-3
+codes and common alternative names. A CountryIndex built over a rate card's
+names turns that table into one dict from normalized alias to card ID, so
+a known alias resolves in O(1). A trigram index over the same names, built
+on the first suggest() call, gives ranked "did you mean" suggestions
+without scanning every name.
+"""
+import csv
+from collections import Counter
+from functools import lru_cache
+import heapq
+import os
+import re
+import unicodedata
+
+ALIASES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "country_aliases.csv")
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(name: str) -> str:
+    """Accent-, case- and punctuation-insensitive form: 'Côte d'Ivoire' → 'cote d ivoire'."""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = _NON_ALNUM.sub(" ", text.replace("&", " and ")).strip()
+    return text[4:] if text.startswith("the ") else text
+
+
+@lru_cache(maxsize=4)
+def load_alias_table(path: str = ALIASES_FILE) -> dict[str, tuple[str, ...]]:
+    """Casefolded export name → (ISO-2, ISO-3, other names...)."""
+    table = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = csv.reader(f)
+        next(rows, None)
+        for row in rows:
+            if len(row) < 3:
+                continue
+            others = tuple(a for a in (row[3].split(";") if len(row) > 3 else ()) if a.strip())
+            table[row[0].strip().casefold()] = (row[1], row[2], *others)
+    return table
+
+
+def _trigrams(form: str) -> set[str]:
+    padded = f"  {form} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CountryIndex:
+    """
+    Alias and trigram index over a rate card's casefolded names (one ID
+    per name, as in RateCard.names).
+    """
+
+    def __init__(self, names, aliases: dict[str, tuple[str, ...]] = None):
+        aliases = load_alias_table() if aliases is None else aliases
+        self.names = names
+        self.alias_ids: dict[str, int] = {}
+        forms: list[tuple[str, int]] = []
+        # Export names first, so an alias never shadows a real name
+        candidates = [(name, cid) for cid, name in enumerate(names)]
+        candidates += [(alias, cid) for cid, name in enumerate(names) for alias in aliases.get(name, ())]
+        for alias, cid in candidates:
+            form = normalize(alias)
+            if form and form not in self.alias_ids:
+                self.alias_ids[form] = cid
+                forms.append((form, cid))
+
+        # Suggestions come from full names only; 2-3 letter codes match too much
+        self._forms = [(form, cid) for form, cid in forms if len(form) > 3 or form == normalize(names[cid])]
+        self._grams: list[int] = []
+        self._postings: dict[str, list[int]] | None = None  # built by the first suggest()
+
+    def _build_postings(self):
+        grams, postings = [], {}
+        for i, (form, _) in enumerate(self._forms):
+            form_grams = _trigrams(form)
+            grams.append(len(form_grams))
+            for gram in form_grams:
+                postings.setdefault(gram, []).append(i)
+        # assigned together last, so a concurrent suggest() never sees half an index
+        self._grams, self._postings = grams, postings
+
+    def resolve(self, name: str) -> int:
+        """Card ID for a name, ISO code or known alias, or -1."""
+        return self.alias_ids.get(normalize(name), -1)
+
+    def suggest(self, name: str, k: int = 5, min_score: float = 0.3) -> list[tuple[int, float]]:
+        """
+        Up to k (card ID, score) pairs for a misspelt name, best first.
+        The score is the Dice coefficient of the trigram sets (1.0 = same).
+        """
+        if self._postings is None:
+            self._build_postings()
+        grams = _trigrams(normalize(name))
+        shared = Counter(i for gram in grams for i in self._postings.get(gram, ()))
+        best: dict[int, float] = {}
+        for i, common in shared.items():
+            score = 2 * common / (len(grams) + self._grams[i])
+            cid = self._forms[i][1]
+            if score >= min_score and score > best.get(cid, 0.0):
+                best[cid] = score
+        return heapq.nlargest(k, best.items(), key=lambda item: (item[1], -item[0]))
@@ -0,0 +1,198 @@
+"""
+Streaming ingest of raw Google Ads location exports into rate cards.
+
+The rate-card CSVs in data/ are small, pre-aggregated reports. The raw
+exports behind them are per-day, per-campaign rows and run to gigabytes,
+so this reads them in fixed-size chunks and keeps only running per-country
+totals of Cost, Conversions and Views: memory stays constant in the file
+size. Several files are aggregated in parallel worker processes and their
+totals merged.
+
+The result is written in the layout load_cps/load_cpvs already read:
+
+    CPS  Country/Territory (User location),Cost / conv.,Cost,Conversions
+    CPV  Country/Territory (User location),Avg. CPV,Cost,Views
+
+A country with no conversions (or views) gets a 0 rate, which the loaders
+replace with DEFAULT_CPS_INR (or DEFAULT_CPV_INR), as for the exports. An
+export with no Conversions (or Views) column at all is refused for
+--cps-out (or --cpv-out) rather than written as all defaults.
+
+    python export_ingest.py exports/*.csv --cps-out data/cps.csv --cpv-out data/cpv.csv
+"""
+import argparse
+import csv
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+import sys
+
+from instrumentation import timed
+
+CHUNK_ROWS = 100_000
+HEADER_SCAN_ROWS = 50  # title/date rows allowed above the header
+
+COUNTRY_HINTS = ("country", "territory", "user location")
+COST_NAMES = ("cost",)
+CONVERSION_NAMES = ("conversions", "conv.")
+VIEW_NAMES = ("views", "video views", "trueview views")
+
+CPS_HEADER = ("Country/Territory (User location)", "Cost / conv.", "Cost", "Conversions")
+CPV_HEADER = ("Country/Territory (User location)", "Avg. CPV", "Cost", "Views")
+
+
+def _norm(name: str) -> str:
+    return re.sub(r"\s+", " ", name.replace("\xa0", " ").strip()).lower()
+
+
+def find_header(filepath: str) -> tuple[int, dict[str, int]]:
+    """
+    (row index of the header, {'country', 'cost', 'conversions', 'views'
+    → column index}) for a raw export. Title and date rows above the header
+    are skipped; 'conversions' and 'views' are absent if the export lacks
+    them. Raises ValueError if no header with a country and cost column is
+    found.
+    """
+    with open(filepath, newline="", encoding="utf-8-sig") as f:
+        for i, row in enumerate(csv.reader(f)):
+            if i >= HEADER_SCAN_ROWS:
+                break
+            names = [_norm(c) for c in row]
+            columns = {}
+            for key, match in (("country", lambda n: any(h in n for h in COUNTRY_HINTS)),
+                               ("cost", COST_NAMES.__contains__),
+                               ("conversions", CONVERSION_NAMES.__contains__),
+                               ("views", VIEW_NAMES.__contains__)):
+                idx = next((j for j, n in enumerate(names) if match(n)), None)
+                if idx is not None:
+                    columns[key] = idx
+            if "country" in columns and "cost" in columns:
+                return i, columns
+    raise ValueError(f"{filepath}: no header row with a country and a Cost column.")
+
+
+def _numeric(series):
+    """Export numbers as floats: '1,234.5' parsed, '--' and blanks as 0."""
+    import pandas as pd
+
+    if not pd.api.types.is_numeric_dtype(series):
+        series = series.str.replace(",", "", regex=False)
+    return pd.to_numeric(series, errors="coerce").fillna(0.0)
+
+
+@timed()
+def aggregate_file(filepath: str, chunk_rows: int = CHUNK_ROWS) -> dict[str, list]:
+    """
+    Per-country totals for one raw export, read chunk_rows at a time:
+    {casefolded country: [display name, cost, conversions, views]}.
+    'Total: …' summary rows are ignored.
+    """
+    import pandas as pd
+
+    skip, columns = find_header(filepath)
+    names = {idx: key for key, idx in columns.items()}
+    totals: dict[str, list] = {}
+    chunks = pd.read_csv(
+        filepath, skiprows=skip, header=0, usecols=sorted(names), dtype={columns["country"]: str},
+        thousands=",", na_values=["--", " --"], chunksize=chunk_rows,
+        encoding="utf-8-sig", skip_blank_lines=True,
+    )
+    for chunk in chunks:
+        chunk.columns = [names[i] for i in sorted(names)]
+        country = chunk["country"].str.strip()
+        keep = country.notna() & (country != "") & ~country.str.startswith("Total:", na=False)
+        frame = pd.DataFrame({
+            "country": country[keep],
+            **{key: _numeric(chunk[key][keep]) for key in ("cost", "conversions", "views") if key in chunk},
+        })
+        sums = frame.groupby("country", sort=False).sum()
+        for name, row in zip(sums.index.tolist(), sums.itertuples(index=False)):
+            entry = totals.setdefault(name.casefold(), [name, 0.0, 0.0, 0.0])
+            entry[1] += row.cost
+            entry[2] += getattr(row, "conversions", 0.0)
+            entry[3] += getattr(row, "views", 0.0)
+    return totals
+
+
+def merge_totals(parts) -> dict[str, list]:
+    merged: dict[str, list] = {}
+    for part in parts:
+        for key, (name, cost, conversions, views) in part.items():
+            entry = merged.setdefault(key, [name, 0.0, 0.0, 0.0])
+            entry[1] += cost
+            entry[2] += conversions
+            entry[3] += views
+    return merged
+
+
+def aggregate_files(filepaths: list[str], workers: int = None,
+                    chunk_rows: int = CHUNK_ROWS) -> dict[str, list]:
+    """aggregate_file over many exports, one worker process per file at a time."""
+    workers = min(workers or os.cpu_count() or 1, len(filepaths))
+    if workers <= 1:
+        return merge_totals(aggregate_file(p, chunk_rows) for p in filepaths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return merge_totals(pool.map(aggregate_file, filepaths, [chunk_rows] * len(filepaths)))
+
+
+def require_columns(filepaths: list[str], columns: list[str]) -> None:
+    """
+    Raise ValueError unless every export has each column in `columns`. A
+    missing Views/Conversions column would otherwise aggregate as zero
+    volume and write a 0 rate (read back as the default) for every country.
+    """
+    for path in filepaths:
+        missing = [c for c in columns if c not in find_header(path)[1]]
+        if missing:
+            raise ValueError(f"{path} has no {' or '.join(c.title() for c in missing)} column.")
+
+
+def _write_rate_csv(path: str, header: tuple, totals: dict[str, list], volume_col: int) -> int:
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for name, cost, *volumes in sorted(totals.values(), key=lambda e: e[0].casefold()):
+            volume = volumes[volume_col]
+            rate = cost / volume if volume > 0 else 0
+            writer.writerow((name, f"{rate:.4f}", f"{cost:.2f}", f"{volume:.0f}"))
+            rows += 1
+    return rows
+
+
+def write_cps_csv(totals: dict[str, list], path: str) -> int:
+    """Cost / conversion per country, readable by load_cps. Returns the row count."""
+    return _write_rate_csv(path, CPS_HEADER, totals, 0)
+
+
+def write_cpv_csv(totals: dict[str, list], path: str) -> int:
+    """Cost / view per country, readable by load_cpvs. Returns the row count."""
+    return _write_rate_csv(path, CPV_HEADER, totals, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate raw Google Ads exports into CPS/CPV rate cards.")
+    parser.add_argument("exports", nargs="+", help="raw export CSVs")
+    parser.add_argument("--cps-out", help="write a CPS rate card here")
+    parser.add_argument("--cpv-out", help="write a CPV rate card here")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+    if not (args.cps_out or args.cpv_out):
+        parser.error("give --cps-out and/or --cpv-out")
+
+    try:
+        require_columns(args.exports, (["conversions"] if args.cps_out else []) + (["views"] if args.cpv_out else []))
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    totals = aggregate_files(args.exports, args.workers, args.chunk_rows)
+    if args.cps_out:
+        print(f"✅ {write_cps_csv(totals, args.cps_out)} countries → {args.cps_out}")
+    if args.cpv_out:
+        print(f"✅ {write_cpv_csv(totals, args.cpv_out)} countries → {args.cpv_out}")
+
+
+if __name__ == "__main__":
+    main()
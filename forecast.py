@@ -0,0 +1,201 @@
+"""
+Monte Carlo cost ranges for split quotes.
+
+A quote prices subscribers at a fixed CPS, but the CPS export is a ratio
+of small counts: plenty of countries have a handful of conversions (or
+none, and get DEFAULT_CPS_INR). This simulates what delivering a quote's
+subscribers could actually cost.
+
+Each country's conversions per INR gets a Gamma posterior from its raw
+Cost and Conversions columns,
+
+    λ ~ Gamma(PRIOR_CONVERSIONS + conversions, PRIOR_CONVERSIONS × pooled CPS + cost)
+
+shrunk toward the pooled CPS of all countries, so a country with little
+spend stays close to the pool and one that spent a lot without converting
+does not. Buying s subscribers at rate λ then costs Gamma(s, 1/λ) INR.
+Views are priced at the quoted CPV: the CPV export has no view counts to
+fit a posterior to.
+
+All simulations × countries are drawn as arrays at once, in fixed-size
+chunks with independent seeds, so results do not depend on `workers`.
+
+    python forecast.py "india:50000, nepal:30000" --subs 2000 --markup 50
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import os
+import sys
+
+from export_ingest import find_header
+from instrumentation import timed
+from pricing_engine import INR_TO_USD, WORLDWIDE, Quote, RateCard, _to_float, quote_targeting
+from rate_snapshot import CPS_FILE, CPV_FILE
+
+PRIOR_CONVERSIONS = 2.0  # prior weight, in conversions at the pooled CPS
+SIMULATIONS = 100_000
+CHUNK_SIMS = 25_000  # simulations per task; fixed so results are reproducible
+PERCENTILES = (10, 50, 90)
+
+
+def load_conversion_counts(filepath: str = CPS_FILE) -> dict[str, tuple[float, float]]:
+    """Casefolded country → (cost INR, conversions) from a CPS export."""
+    skip, columns = find_header(filepath)
+    if "conversions" not in columns:
+        raise ValueError(f"{filepath} has no Conversions column.")
+    country, cost, conversions = columns["country"], columns["cost"], columns["conversions"]
+    counts = {}
+    with open(filepath, newline="", encoding="utf-8-sig") as f:
+        for i, row in enumerate(csv.reader(f)):
+            if i <= skip or len(row) <= max(country, cost, conversions):
+                continue
+            name = row[country].strip()
+            if not name or name.startswith("Total:"):
+                continue
+            counts[name.casefold()] = (
+                _to_float(row[cost].replace(",", "")) or 0.0,
+                _to_float(row[conversions].replace(",", "")) or 0.0,
+            )
+    return counts
+
+
+class ConversionModel:
+    """Gamma posteriors over each country's conversions per INR."""
+
+    def __init__(self, counts: dict[str, tuple[float, float]], prior_conversions: float = PRIOR_CONVERSIONS):
+        self.counts = counts
+        self.prior_conversions = prior_conversions
+        self.pooled = (sum(c for c, _ in counts.values()), sum(n for _, n in counts.values()))
+        if self.pooled[1] <= 0:
+            raise ValueError("The CPS export has no conversions to fit a prior to.")
+
+    @classmethod
+    def from_file(cls, filepath: str = CPS_FILE, prior_conversions: float = PRIOR_CONVERSIONS) -> "ConversionModel":
+        return cls(load_conversion_counts(filepath), prior_conversions)
+
+    @property
+    def pooled_cps(self) -> float:
+        cost, conversions = self.pooled
+        return cost / conversions
+
+    def posterior(self, country: str) -> tuple[float, float]:
+        """(shape, rate) of λ for a country; worldwide uses the pooled counts."""
+        key = country.strip().casefold()
+        cost, conversions = self.pooled if key == WORLDWIDE else self.counts.get(key, (0.0, 0.0))
+        return (self.prior_conversions + conversions,
+                self.prior_conversions * self.pooled_cps + cost)
+
+
+class Forecast:
+    """
+    Simulated internal cost of a quote against its client price. Cost and
+    margin percentiles are INR; margin_at_risk is the quoted margin minus
+    the margin at P90 cost.
+    """
+
+    def __init__(self, quote: Quote, markup_percent: float, costs):
+        import numpy as np
+
+        self.quote = quote
+        self.markup = markup_percent
+        self.simulations = len(costs)
+        self.client_inr = quote.price(markup_percent)[2]
+        self.cost = dict(zip(PERCENTILES, np.percentile(costs, PERCENTILES).round(2).tolist()))
+        self.margin = {p: round(self.client_inr - self.cost[100 - p], 2) for p in PERCENTILES}
+        self.quoted_margin = round(self.client_inr - quote.internal_inr, 2)
+        self.margin_at_risk = round(max(self.quoted_margin - self.margin[10], 0.0), 2)
+        self.loss_probability = float(np.mean(costs > self.client_inr))
+
+    def to_dict(self) -> dict:
+        return {
+            "simulations": self.simulations,
+            "markup": self.markup,
+            "quoted_internal_inr": round(self.quote.internal_inr, 2),
+            "client_inr": self.client_inr,
+            **{f"cost_p{p}_inr": v for p, v in self.cost.items()},
+            **{f"margin_p{p}_inr": v for p, v in self.margin.items()},
+            "margin_at_risk_inr": self.margin_at_risk,
+            "margin_at_risk_usd": round(self.margin_at_risk * INR_TO_USD, 2),
+            "loss_probability": round(self.loss_probability, 4),
+        }
+
+    def summary(self) -> list[str]:
+        return [
+            f"Internal cost P10/P50/P90: ₹{self.cost[10]:,.2f} / ₹{self.cost[50]:,.2f} / ₹{self.cost[90]:,.2f}"
+            f" (quoted ₹{self.quote.internal_inr:,.2f})",
+            f"Client price at {self.markup:g}% markup: ₹{self.client_inr:,.2f}",
+            f"Margin P10/P50/P90: ₹{self.margin[10]:,.2f} / ₹{self.margin[50]:,.2f} / ₹{self.margin[90]:,.2f}",
+            f"Margin at risk (P90 cost): ₹{self.margin_at_risk:,.2f} / ${self.margin_at_risk * INR_TO_USD:,.2f}",
+            f"Chance of a loss: {self.loss_probability:.1%}",
+        ]
+
+
+def _simulate_chunk(seed, sims, shape, rate, subs, fixed_inr):
+    """Total internal cost for `sims` draws: one row per simulation, one column per line."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    conversions_per_inr = rng.gamma(shape, 1.0 / rate, size=(sims, len(shape)))
+    return fixed_inr + rng.gamma(subs, 1.0 / conversions_per_inr).sum(axis=1)
+
+
+@timed()
+def simulate_costs(model: ConversionModel, quote: Quote, simulations: int = SIMULATIONS,
+                   seed: int = None, workers: int = 1):
+    """Simulated internal cost (INR) of a quote, as an array of `simulations` draws."""
+    import numpy as np
+
+    shape, rate = (np.array(p, dtype=np.float64) for p in zip(*(model.posterior(line[0]) for line in quote.lines)))
+    subs = np.array([line[2] for line in quote.lines], dtype=np.float64)
+    fixed_inr = sum(views * cpv for _, views, _, cpv, _ in quote.lines)
+
+    sizes = [min(CHUNK_SIMS, simulations - i) for i in range(0, simulations, CHUNK_SIMS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(s, n, shape, rate, subs, fixed_inr) for s, n in zip(seeds, sizes)]
+    workers = min(workers or os.cpu_count() or 1, len(args))
+    if workers <= 1:
+        return np.concatenate([_simulate_chunk(*a) for a in args])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.concatenate(list(pool.map(_simulate_chunk, *zip(*args))))
+
+
+def forecast(model: ConversionModel, quote: Quote, markup_percent: float,
+             simulations: int = SIMULATIONS, seed: int = None, workers: int = 1) -> Forecast:
+    return Forecast(quote, markup_percent, simulate_costs(model, quote, simulations, seed, workers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the delivery cost range of a quote.")
+    parser.add_argument("targeting", help="'worldwide', 'india:5000, nepal:3000' or 'india, nepal'")
+    parser.add_argument("--views", type=int, help="total views (worldwide and even splits)")
+    parser.add_argument("--subs", type=int, default=0)
+    parser.add_argument("--markup", type=float, default=50.0)
+    parser.add_argument("--sims", type=int, default=SIMULATIONS)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (0: CPU count)")
+    parser.add_argument("--prior", type=float, default=PRIOR_CONVERSIONS,
+                        help="prior weight in conversions at the pooled CPS")
+    parser.add_argument("--cpv", default=CPV_FILE)
+    parser.add_argument("--cps", default=CPS_FILE)
+    args = parser.parse_args()
+
+    try:
+        card = RateCard.from_files(args.cpv, args.cps)
+        quote = quote_targeting(card, args.targeting, args.subs, args.views)
+        result = forecast(ConversionModel.from_file(args.cps, args.prior), quote, args.markup,
+                          args.sims, args.seed, args.workers)
+    except KeyError as e:
+        print(f"❌ {e.args[0]}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"🎲 {result.simulations:,} simulations")
+    for line in result.summary():
+        print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
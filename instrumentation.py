@@ -0,0 +1,209 @@
+"""
+Opt-in hot-path instrumentation.
+
+Set ADCALC_METRICS=1 before starting the CLI, the app or the quoting
+service to record, per operation, the call count, cumulative time and
+p50/p90/p99 over the most recent calls, plus cache hit/miss counts and
+event counters (e.g. rate-card lookup misses). Export with to_json() or
+to_prometheus(); with ADCALC_METRICS_FILE set, the metrics are also
+written there at exit (Prometheus text if it ends in .prom, else JSON).
+
+When disabled, @timed returns the function unchanged and span() returns
+a shared no-op context manager, so the instrumented code pays nothing
+beyond an attribute check. The switch is read once at import time.
+"""
+import atexit
+from collections import deque
+import contextlib
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+ENABLED = os.environ.get("ADCALC_METRICS", "").strip().lower() not in ("", "0", "false", "no")
+METRICS_FILE = os.environ.get("ADCALC_METRICS_FILE", "")
+
+SAMPLE_SIZE = 2048  # recent calls kept per operation for percentiles
+PERCENTILES = (0.5, 0.9, 0.99)
+
+_lock = threading.Lock()
+_timers: dict[str, "_Timer"] = {}
+_counters: dict[str, int] = {}
+_cache_counts: dict[str, list[int]] = {}
+_lru_caches: dict[str, object] = {}
+_lru_baseline: dict[str, tuple[int, int]] = {}  # (hits, misses) at the last reset()
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class _Timer:
+    __slots__ = ("count", "total", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add one timed call of `name`."""
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = _Timer()
+        timer.count += 1
+        timer.total += seconds
+        timer.samples.append(seconds)
+
+
+def timed(name: str = None):
+    """Decorator timing every call; a no-op (returns fn itself) when disabled."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        op = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(op, time.perf_counter() - t0)
+        return wrapper
+    return decorate
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+def span(name: str):
+    """Context manager timing a block as operation `name`."""
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+
+def count(name: str, n: int = 1) -> None:
+    """Bump an event counter."""
+    if ENABLED:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def cache_hit(name: str) -> None:
+    if ENABLED:
+        with _lock:
+            _cache_counts.setdefault(name, [0, 0])[0] += 1
+
+
+def cache_miss(name: str) -> None:
+    if ENABLED:
+        with _lock:
+            _cache_counts.setdefault(name, [0, 0])[1] += 1
+
+
+def track_cache(name: str, fn) -> None:
+    """Report a functools.lru_cache function's hits/misses under `name`."""
+    _lru_caches[name] = fn
+
+
+def reset() -> None:
+    """
+    Zero the timers and counters. Tracked LRU caches keep their entries
+    (clearing them would change the timings being measured); their
+    hits/misses are counted from here on.
+    """
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _cache_counts.clear()
+        for name, fn in _lru_caches.items():
+            info = fn.cache_info()
+            _lru_baseline[name] = (info.hits, info.misses)
+
+
+# ---------- Export ----------
+
+def _percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of a sorted, non-empty list."""
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def snapshot() -> dict:
+    """All metrics as plain data: {'enabled', 'operations', 'caches', 'counters'}."""
+    with _lock:
+        timers = {k: (t.count, t.total, sorted(t.samples)) for k, t in _timers.items()}
+        caches = {k: {"hits": h, "misses": m} for k, (h, m) in _cache_counts.items()}
+        counters = dict(_counters)
+    if ENABLED:
+        for name, fn in _lru_caches.items():
+            info = fn.cache_info()
+            hits, misses = _lru_baseline.get(name, (0, 0))
+            if info.hits < hits or info.misses < misses:  # cleared since the reset
+                hits = misses = 0
+            caches[name] = {"hits": info.hits - hits, "misses": info.misses - misses}
+
+    operations = {}
+    for name, (calls, total, ordered) in sorted(timers.items()):
+        operations[name] = {
+            "count": calls,
+            "total_s": total,
+            "mean_s": total / calls,
+            **{f"p{round(q * 100)}_s": _percentile(ordered, q) for q in PERCENTILES},
+            "max_s": ordered[-1],
+        }
+    return {"enabled": ENABLED, "operations": operations,
+            "caches": dict(sorted(caches.items())), "counters": dict(sorted(counters.items()))}
+
+
+def to_json(indent: int = 2) -> str:
+    return json.dumps(snapshot(), indent=indent)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(prefix: str = "adcalc") -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    snap = snapshot()
+    lines = [
+        f"# HELP {prefix}_op_seconds Recent call durations per operation.",
+        f"# TYPE {prefix}_op_seconds summary",
+    ]
+    for name, op in snap["operations"].items():
+        label = f'op="{_label(name)}"'
+        for q in PERCENTILES:
+            lines.append(f'{prefix}_op_seconds{{{label},quantile="{q}"}} {op[f"p{round(q * 100)}_s"]:.9f}')
+        lines.append(f"{prefix}_op_seconds_sum{{{label}}} {op['total_s']:.9f}")
+        lines.append(f"{prefix}_op_seconds_count{{{label}}} {op['count']}")
+    for kind in ("hits", "misses"):
+        lines += [f"# HELP {prefix}_cache_{kind}_total Cache {kind} per cache.",
+                  f"# TYPE {prefix}_cache_{kind}_total counter"]
+        lines += [f'{prefix}_cache_{kind}_total{{cache="{_label(name)}"}} {counts[kind]}'
+                  for name, counts in snap["caches"].items()]
+    lines += [f"# HELP {prefix}_events_total Event counts.", f"# TYPE {prefix}_events_total counter"]
+    lines += [f'{prefix}_events_total{{event="{_label(name)}"}} {n}' for name, n in snap["counters"].items()]
+    return "\n".join(lines) + "\n"
+
+
+def write(path: str) -> None:
+    """Write the metrics to path: Prometheus text for *.prom, JSON otherwise."""
+    text = to_prometheus() if path.endswith(".prom") else to_json()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+if ENABLED and METRICS_FILE:
+    atexit.register(write, METRICS_FILE)
@@ -1,347 +1,566 @@
-import streamlit as st
+import os
+import sqlite3
+
+import altair as alt
+import numpy as np
 import pandas as pd
+import streamlit as st
+
+from budget_optimizer import OBJECTIVES
+from forecast import ConversionModel, forecast
+import instrumentation
+from package_ladder import LADDER_COUNTRIES, PackageLadder, build_ladders, ladder_markdown
+from pricing_engine import (
+    INR_TO_USD,
+    WORLDWIDE,
+    WORLDWIDE_CPV_INR,
+    WORLDWIDE_CPS_INR,
+    RateCard,
+)
+import quote_memo
+from quote_ledger import RESULT_TIMEOUT, QuoteLedger, default_ledger_path, rate_card_version
+from rate_history import RateHistory, default_history_path
+from rate_reload import IncrementalRateCard
+from rate_snapshot import source_stamp
+from scenario_grid import MAX_SUBS_RATIO, sweep
+from split_quote import SplitQuote
 
 # -------------------------
 # Hard‑coded file paths
 # -------------------------
 CPV_FILE = "data/Cost_Conv_Location_CPV.csv"
 CPS_FILE = "data/Cost_Conv_Location_CPS.csv"
-
-
-INR_TO_USD = 1 / 85
-
-# -------------------------
-# Caching loaders
-# -------------------------
-@st.cache_data
-def load_cpvs(filepath: str) -> dict[str, float]:
-    raw = pd.read_csv(filepath, header=None)
-    first = pd.to_numeric(raw.iloc[0, 1], errors='coerce')
-    data = raw.iloc[1:, [0,1]] if pd.isna(first) else raw.iloc[:, [0,1]]
-    data.columns = ["Country", "CPV_INR"]
-    data["Country"] = data["Country"].str.strip().str.casefold()
-    data["CPV_INR"] = pd.to_numeric(data["CPV_INR"], errors='coerce').fillna(0)
-    data.loc[data["CPV_INR"] == 0, "CPV_INR"] = 0.30
-
-    return dict(zip(data["Country"], data["CPV_INR"]))
-
-@st.cache_data
-def load_cps(filepath: str) -> dict[str, float]:
-    raw = pd.read_csv(filepath, header=None)
-    first = pd.to_numeric(raw.iloc[0, 1], errors='coerce')
-    data = raw.iloc[1:, [0,1]] if pd.isna(first) else raw.iloc[:, [0,1]]
-    data.columns = ["Country", "CPS_INR"]
-    data["Country"] = data["Country"].str.strip().str.casefold()
-    data["CPS_INR"] = pd.to_numeric(data["CPS_INR"], errors='coerce').fillna(0)
-    data.loc[data["CPS_INR"] == 0, "CPS_INR"] = 10.0
-    return dict(zip(data["Country"], data["CPS_INR"]))
+HISTORY_FILE = default_history_path(CPV_FILE)
+LEDGER_FILE = default_ledger_path(CPV_FILE)
 
 # -------------------------
-# Cost calculator
+# Shared, incrementally reloaded rate card
 # -------------------------
-def calculate_cost(total_inr: float, markup_pct: float):
-    client = total_inr * (1 + markup_pct/100)
-    return (
-        round(total_inr,2),
-        round(total_inr * INR_TO_USD,2),
-        round(client,2),
-        round(client * INR_TO_USD,2),
-    )
+@st.cache_resource
+def rate_card_source(cpv_file: str, cps_file: str) -> IncrementalRateCard:
+    return IncrementalRateCard(cpv_file, cps_file)
+
+@st.cache_resource(max_entries=2)
+def rate_history(path: str, stamp: tuple) -> RateHistory:
+    # keyed on the file's size/mtime; holds one RateCard per as-of date
+    return RateHistory.load(path)
+
+@st.cache_resource(max_entries=2)
+def conversion_model(path: str, stamp: tuple) -> ConversionModel:
+    # keyed on the CPS export's size/mtime
+    return ConversionModel.from_file(path)
+
+@st.cache_resource
+def quote_ledger(path: str) -> QuoteLedger:
+    # one writer thread per server process, started (and the file opened) on the first quote
+    return QuoteLedger(path)
+
+@st.cache_resource(max_entries=4)
+def ladders_for(version: int, _card: RateCard) -> dict[str, PackageLadder]:
+    # keyed on the version of the ladder countries only
+    return build_ladders(_card)
 
 # -------------------------
 # App start
 # -------------------------
 st.title("📊 Ad Cost & Subscription Calculator")
 
-# Add this block below the title:
-st.sidebar.markdown("""
-                    
-
-**Worlwide Targeted**
-- **$50:** 5,000 views  
-- **$100:** 10,000 views  
-- **$150:** 15,000 views  
-- **$200:** 20,000 views  
-- **$249:** 25K views + 400-450 subs  
-- **$299:** 32K views + 700-750 subs  
-- **$399:** 50K views + 800-850 subs  
-- **$499:** 80K views + 1.6k-2.4k subs  
-- **$699:** 100K views + 2.8K-3.2K subs  
-- **$999:** 160K views + 3.8K-4.2K subs  
-- **$1,499:** 240K views + 6.2K-6.5K subs  
-- **$1,999:** 325K views + 8K subs  
-- **$2,499:** 415K views + 10K subs  
-- **$3,000:** 520K views + 12K subs  
-- **$3,500:** 620K views + 14K subs  
-- **$4,000:** 730K views + 16K subs  
-- **$4,500:** 850K views + 18K subs  
-- **$5,000:** 1M views + 20K subs  
-
-
-**United States Targeted**
-- **$149:** 3.5K views  
-- **$199:** 4.7K views  
-- **$249:** 6K views  
-- **$299:** 7.2K views  
-- **$399:** 9.5K views  
-- **$499:** 12.5K views  
-- **$1,000:** 26K views   
-""")
-
-# Load once
-cpv_lookup = load_cpvs(CPV_FILE)
-cps_lookup = load_cps(CPS_FILE)
+# Shared across sessions; only changed rows are reparsed when a CSV changes
+source = rate_card_source(CPV_FILE, CPS_FILE)
+source.refresh()
+card = source.card
+ladders = ladders_for(source.version_of(LADDER_COUNTRIES), card)
+
+# Package tiers, priced from the rate card
+st.sidebar.markdown(ladder_markdown(ladders))
+
+# Re-quote with past rates (python rate_history.py append)
+if os.path.exists(HISTORY_FILE):
+    history = rate_history(HISTORY_FILE, source_stamp(HISTORY_FILE))
+    if len(history):
+        st.sidebar.subheader("📅 Rate history")
+        as_of = st.sidebar.date_input(
+            "Quote with rates as of (empty = current export)",
+            value=None,
+            key="rates_as_of"
+        )
+        trailing = st.sidebar.number_input(
+            "Trailing average (months, 0 = off)", min_value=0, max_value=36, value=0, step=1,
+            key="rates_trailing"
+        )
+        if as_of is not None:
+            try:
+                card = history.card(as_of, int(trailing))
+                st.sidebar.caption(f"Periods on file: {', '.join(history.labels())}")
+            except ValueError as e:
+                st.sidebar.warning(str(e))
+
+# Re-open a recorded quote (python quote_ledger.py find ... lists them)
+st.sidebar.subheader("🗂️ Quote ledger")
+reopen_id = st.sidebar.number_input("Re-open quote #", min_value=0, value=0, step=1, key="reopen_id")
+if reopen_id:
+    try:
+        row = quote_ledger(LEDGER_FILE).get(int(reopen_id))
+    except (sqlite3.Error, OSError) as e:
+        st.sidebar.warning(f"The quote ledger cannot be read: {e}")
+        row = {}
+    if row is None:
+        st.sidebar.warning(f"No quote #{reopen_id}.")
+    elif row:
+        record = row["record"]
+        st.sidebar.caption(f"{row['created_at']}" + (f" · {row['customer']}" if row["customer"] else ""))
+        for line in record["breakdown"]:
+            st.sidebar.write("-", line)
+        st.sidebar.markdown(f"**Internal cost:** ₹{record['internal_inr']:.2f}")
+        if record.get("client_inr") is not None:
+            st.sidebar.markdown(f"**Offer at {record['markup']:g}%:** ₹{record['client_inr']} / ${record['client_usd']}")
+
+# Timings for this server process (ADCALC_METRICS=1)
+if instrumentation.ENABLED:
+    with st.sidebar.expander("⏱️ Metrics"):
+        st.download_button("Prometheus text", instrumentation.to_prometheus(),
+                           file_name="adcalc_metrics.prom", mime="text/plain")
+        st.download_button("JSON", instrumentation.to_json(),
+                           file_name="adcalc_metrics.json", mime="application/json")
 
 # Initialize session state
 if "cost_inr" not in st.session_state:
     st.session_state.cost_inr = None
     st.session_state.total_views = None
     st.session_state.breakdown = []
+    st.session_state.quote = None
+    st.session_state.ledger_id = None
+
+MODES = {
+    "Worldwide": "worldwide",
+    "Custom splits (country:views)": "custom",
+    "Even split (by country list)": "even",
+}
+
+# Each section is a fragment: widget changes rerun only their own section.
+# Calculations are memoized in quote_memo on their input tuple (and, for the
+# live card, on the version of the countries they price; see quote_memo.card_key).
+
+def _targeting_text(mode, spec):
+    # the app's inputs as the targeting string the CLI and service accept
+    if mode == "worldwide":
+        return WORLDWIDE
+    if mode == "custom":
+        return ", ".join(f"{country}:{views}" for country, views in spec)
+    return ", ".join(spec)
+
+
+# 1) Inputs + 2) Calculate button — stores into session_state
+@st.fragment
+def quote_inputs():
+    mode = MODES[st.selectbox("Targeting mode", list(MODES))]
+    spec = ()
+
+    if mode == "worldwide":
+        min_views = 80000    # $499 minimum
+        min_subs = 2000
+        if 'views' not in st.session_state:
+            st.session_state.views = min_views
+        if 'subs' not in st.session_state:
+            st.session_state.subs = min_subs
+
+        views = st.number_input(
+            "Total views (minimum for Worldwide is 80,000 views / $499)",
+            min_value=min_views,
+            value=st.session_state.views,
+            step=1,
+            key="views"
+        )
+        max_subs = int(0.05 * views)
+        total_subs = st.number_input(
+            f"Total expected subscribers (minimum 2,000, max {max_subs})",
+            min_value=min_subs,
+            max_value=max_subs,
+            value=min(max(st.session_state.get("subs", min_subs), min_subs), max_subs),
+            step=1,
+            key="subs"
+        )
+        if views < min_views or total_subs < min_subs:
+            st.warning("Minimum allowed for Worldwide is 80,000 views and 2,000 subscribers ($499 package).")
+        if total_subs > max_subs:
+            st.warning(f"Subscribers cannot exceed 5% of total views ({max_subs} for {views} views).")
+
+    elif mode == "custom":
+        # Edited rows are diffed against the running SplitQuote: only the
+        # changed rows are repriced and their breakdown lines re-rendered.
+        split = st.session_state.get("split_quote")
+        if split is None or split.card is not card:
+            split = st.session_state.split_quote = SplitQuote(card)
+        if "split_rows" not in st.session_state:
+            st.session_state.split_rows = pd.DataFrame({"Country": pd.Series(dtype="str"),
+                                                        "Views": pd.Series(dtype="int64")})
+            st.session_state.split_table = 0
+
+        with st.expander("Paste a split (`India:5000, USA:2000`)"):
+            pasted = st.text_area("Country : Views splits", key="split_paste")
+            if st.button("Load into table"):
+                entries = quote_memo.parse_view_splits(pasted)
+                if entries is None:
+                    st.error("Use the format country:views, e.g. India:5000")
+                else:
+                    st.session_state.split_rows = pd.DataFrame(entries, columns=["Country", "Views"])
+                    st.session_state.split_table += 1  # new editor key drops the old edits
+
+        edited = st.data_editor(
+            st.session_state.split_rows,
+            column_config={
+                "Country": st.column_config.TextColumn("Country", help="Name or alias, e.g. India, USA"),
+                "Views": st.column_config.NumberColumn("Views", min_value=0, step=1, format="%d"),
+            },
+            num_rows="dynamic",
+            hide_index=True,
+            width="stretch",
+            key=f"split_table_{st.session_state.split_table}",
+        )
+        rows = [(country, int(v)) for country, v in zip(edited["Country"], edited["Views"])
+                if isinstance(country, str) and country.strip() and pd.notna(v)]
+        views = sum(v for _, v in rows)
+        max_subs = int(0.05 * views) if views > 0 else 1000000
+        total_subs = st.number_input(
+            f"Total expected subscribers (max {max_subs})",
+            min_value=0,
+            max_value=max_subs,
+            value=min(500, max_subs),
+            step=1,
+            key="subs"
+        )
+        if views > 0 and total_subs > max_subs:
+            st.warning(f"Subscribers cannot exceed 5% of total views ({max_subs} for {views} views).")
+        split.update(rows, int(total_subs))  # once per rerun: rows and subscribers together
+        spec = tuple(zip(split.countries, split.views))
+
+        for message in split.errors.values():
+            st.warning(message)
+        st.caption(f"Running total: {views:,} views · ₹{split.internal_inr:,.2f} internal"
+                   + (f" (excluding {len(split.errors)} unpriced row(s))" if split.errors else ""))
 
-# 1) Inputs
-mode = st.selectbox("Targeting mode", [
-    "Worldwide",
-    "Custom splits (country:views)",
-    "Even split (by country list)"
-])
-
-if mode == "Worldwide":
-    min_views = 80000    # $499 minimum
-    min_subs = 2000
-    max_subs = int(0.05 * st.session_state.get("views", min_views))
-    if 'views' not in st.session_state:
-        st.session_state.views = min_views
-    if 'subs' not in st.session_state:
-        st.session_state.subs = min_subs
-
-    views = st.number_input(
-        "Total views (minimum for Worldwide is 80,000 views / $499)",
-        min_value=min_views,
-        value=st.session_state.views,
-        step=1,
-        key="views"
-    )
-    max_subs = int(0.05 * views)
-    total_subs = st.number_input(
-        f"Total expected subscribers (minimum 2,000, max {max_subs})",
-        min_value=min_subs,
-        max_value=max_subs,
-        value=min(max(st.session_state.get("subs", min_subs), min_subs), max_subs),
-        step=1,
-        key="subs"
-    )
-    if views < min_views or total_subs < min_subs:
-        st.warning("Minimum allowed for Worldwide is 80,000 views and 2,000 subscribers ($499 package).")
-    if total_subs > max_subs:
-        st.warning(f"Subscribers cannot exceed 5% of total views ({max_subs} for {views} views).")
-
-elif mode == "Custom splits (country:views)":
-    st.write("Format: `India:5000, USA:2000`")
-    splits = st.text_area("Country : Views splits")
-    views = 0
-    try:
-        parts = [p.strip() for p in splits.split(",") if ":" in p]
-        views = sum(int(x.split(":")[1]) for x in parts)
-    except Exception:
-        pass
-    max_subs = int(0.05 * views) if views > 0 else 1000000
-    total_subs = st.number_input(
-        f"Total expected subscribers (max {max_subs})",
-        min_value=0,
-        max_value=max_subs,
-        value=500,
-        step=1,
-        key="subs"
-    )
-    if views > 0 and total_subs > max_subs:
-        st.warning(f"Subscribers cannot exceed 5% of total views ({max_subs} for {views} views).")
-
-else:
-    countries = sorted([c for c in cpv_lookup.keys() if c and c[0].isalpha()])
-    selected = st.multiselect(
-        "Select countries",
-        countries,
-        default=[]
-    )
-    views = st.number_input(
-        "Total views (split evenly)",
-        min_value=0,
-        value=10000,
-        step=1
-    )
-    max_subs = int(0.05 * views) if views > 0 else 1000000
-    total_subs = st.number_input(
-        f"Total expected subscribers (split evenly, max {max_subs})",
-        min_value=0,
-        max_value=max_subs,
-        value=500,
-        step=1,
-        key="subs"
-    )
-    if views > 0 and total_subs > max_subs:
-        st.warning(f"Subscribers cannot exceed 5% of total views ({max_subs} for {views} views).")
-
-
-# 2) Calculate button — stores into session_state
-if st.button("Calculate"):
-    breakdown = []
-    total_views = 0
-    cost_inr = 0.0
+    else:
+        selected = st.multiselect(
+            "Select countries",
+            quote_memo.country_keys(card),
+            default=[]
+        )
+        spec = tuple(selected)
+        views = st.number_input(
+            "Total views (split evenly)",
+            min_value=0,
+            value=10000,
+            step=1
+        )
+        max_subs = int(0.05 * views) if views > 0 else 1000000
+        total_subs = st.number_input(
+            f"Total expected subscribers (split evenly, max {max_subs})",
+            min_value=0,
+            max_value=max_subs,
+            value=500,
+            step=1,
+            key="subs"
+        )
+        if views > 0 and total_subs > max_subs:
+            st.warning(f"Subscribers cannot exceed 5% of total views ({max_subs} for {views} views).")
+
+    customer = st.text_input("Customer (optional, saved with the quote)", key="customer")
+
+    if st.button("Calculate"):
+        try:
+            with instrumentation.span(f"app.quote.{mode}"):
+                if mode == "custom":
+                    # split.breakdown() re-renders only the rows edited since the last call;
+                    # the quote carries that text, so to_dict() below reuses it for the ledger
+                    quote = split.quote()
+                    breakdown = split.breakdown()
+                else:
+                    quote = quote_memo.quote(card, mode, spec, int(views), int(total_subs), source)
+                    breakdown = quote.breakdown()
+
+            # store
+            st.session_state.cost_inr = quote.internal_inr
+            st.session_state.total_views = quote.total_views
+            st.session_state.breakdown = breakdown
+            st.session_state.quote = quote
+
+            # persisted off the request path; the ID resolves once committed
+            markup = st.session_state.get("markup_slider", 50)
+            request = {"targeting": _targeting_text(mode, spec), "subs": int(total_subs),
+                       "views": int(views), "markup": markup}
+            st.session_state.ledger_id = quote_ledger(LEDGER_FILE).record(
+                quote.to_dict(markup), request, customer.strip() or None, "app", rate_card_version(card))
+        except KeyError as e:
+            st.error(f"Calculation error: {e.args[0]}")
+        except Exception as e:
+            st.error(f"Calculation error: {e}")
+        else:
+            st.rerun()  # refresh the breakdown section
 
-    try:
-        if mode == "Worldwide":
-            cpv, cps = 0.20, 6.0
-            vc, sc = views*cpv, total_subs*cps
-            cost_inr, total_views = vc+sc, views
-            breakdown += [
-                f"Worldwide Views: {views}×₹{cpv:.2f} = ₹{vc:.2f}",
-                f"Worldwide Subs:  {total_subs}×₹{cps:.2f} = ₹{sc:.2f}",
-            ]
-
-        elif mode == "Custom splits (country:views)":
-            parts = [p.strip() for p in splits.split(",") if ":" in p]
-            entries = []
-            for p in parts:
-                c, vstr = [x.strip() for x in p.split(":",1)]
-                entries.append((c, c.casefold(), int(vstr)))
-            total_v = sum(v for *_,v in entries)
-            ideal = [total_subs*v/total_v for *_,v in entries]
-            floors = [int(x) for x in ideal]
-            rem = total_subs - sum(floors)
-            fracs = sorted([(ideal[i]-floors[i],i) for i in range(len(floors))], reverse=True)
-            for _,i in fracs[:rem]: floors[i]+=1
-
-            for (c,k,v),subs in zip(entries, floors):
-                 k = k.casefold() 
-                 if k == "worldwide":
-                    cpv, cps = 0.20, 6.0
-                 else:
-                     cpv = cpv_lookup.get(k, 0.30)
-                     cps = cps_lookup.get(k, 10.0)
-
-                 vc, sc = v*cpv, subs*cps
-                 cost_inr += vc+sc
-                 total_views += v
-                 breakdown += [
-                    f"{c.title()} Views: {v}×₹{cpv:.2f} = ₹{vc:.2f}",
-                    f"{c.title()} Subs:  {subs}×₹{cps:.2f} = ₹{sc:.2f}",
-                ]
-
-        else:  # Even split
-            n = len(selected)
-            v_each, rv = divmod(views, n)
-            s_each, rs = divmod(total_subs, n)
-            for i,c in enumerate(selected):
-                k = c
-                v = v_each + (1 if i<rv else 0)
-                s = s_each + (1 if i<rs else 0)
-                cpv, cps = cpv_lookup[k], cps_lookup[k]
-                vc, sc = v*cpv, s*cps
-                cost_inr += vc+sc
-                total_views += v
-                breakdown += [
-                    f"{c.title()} Views: {v}×₹{cpv:.2f} = ₹{vc:.2f}",
-                    f"{c.title()} Subs:  {s}×₹{cps:.2f} = ₹{sc:.2f}",
-                ]
-
-        # store
-        st.session_state.cost_inr = cost_inr
-        st.session_state.total_views = total_views
-        st.session_state.breakdown = breakdown
-
-    except Exception as e:
-        st.error(f"Calculation error: {e}")
 
 # 3) If we have a stored result, show it (slider outside button)
-if st.session_state.cost_inr is not None:
-    st.subheader("📊 Cost Breakdown")
-    for line in st.session_state.breakdown:
-        st.write("-", line)
-    st.write("**Total views:**", st.session_state.total_views)
-    st.write("**Internal cost (INR):** ₹", f"{st.session_state.cost_inr:.2f}")
+@st.fragment
+def quote_result():
+    if st.session_state.cost_inr is None:
+        return
+    with instrumentation.span("app.render.quote_result"):
+        st.subheader("📊 Cost Breakdown")
+        for line in st.session_state.breakdown:
+            st.write("-", line)
+        st.write("**Total views:**", st.session_state.total_views)
+        st.write("**Internal cost (INR):** ₹", f"{st.session_state.cost_inr:.2f}")
+        if st.session_state.ledger_id is not None:
+            try:
+                quote_id = st.session_state.ledger_id.result(timeout=RESULT_TIMEOUT)
+            except TimeoutError:
+                st.warning("The quote ledger did not answer in time; this quote may not be saved.")
+            except Exception as e:
+                st.warning(f"Quote not saved to the ledger: {e}")
+            else:
+                st.caption(f"🗂️ Saved as quote #{quote_id}")
+    quote_markup()
+
 
+@st.fragment
+def quote_markup():
+    # Moving the slider reruns only this fragment (one memoized calculate_cost)
     markup = st.select_slider(
         "Profit markup %", 
         options=[40,45,50,55,60,65], 
         value=50,
         key="markup_slider"
     )
-    i_inr, i_usd, c_inr, c_usd = calculate_cost(st.session_state.cost_inr, markup)
+    i_inr, i_usd, c_inr, c_usd = quote_memo.price(st.session_state.cost_inr, markup)
     st.markdown(f"**Cost to us:** ₹{i_inr} / ${i_usd}")
     st.markdown(f"**Offer to client (at {markup}% markup):** ₹{c_inr} / ${c_usd}")
 
-# 4) What can you get for $X?
-st.header("💡 What can you get for $X?")
-usd_input = st.number_input("Enter your budget in USD", min_value=50, value=500, step=1)
-inr_budget = usd_input * 85  # Use your INR_TO_USD conversion if needed
+    with st.expander("🎲 Cost range (Monte Carlo)"):
+        st.caption("Simulates subscriber delivery cost from each country's conversion counts.")
+        if st.button("Simulate", key="simulate_cost"):
+            try:
+                model = conversion_model(CPS_FILE, source_stamp(CPS_FILE))
+                result = forecast(model, st.session_state.quote, markup)
+            except ValueError as e:
+                st.warning(str(e))
+            else:
+                for line in result.summary():
+                    st.markdown(f"- {line}")
 
-tab1, tab2, tab3 = st.tabs(["Worldwide", "Custom split", "Even split"])
 
-with tab1:
+def _budget_rows(rows, label=str.title):
+    for country, views, subs, budget in rows:
+        if views >= 0:
+            st.markdown(f"**{label(country)}:** {views:,} views + {subs:,} subs (₹{budget:,.0f})")
+        else:
+            st.write(f"{label(country)}: Invalid CPV/CPS values.")
+
+
+# 4) What can you get for $X?
+@st.fragment
+def budget_section():
+    st.header("💡 What can you get for $X?")
+    usd_input = st.number_input("Enter your budget in USD", min_value=50, value=500, step=1)
+    inr_budget = usd_input / INR_TO_USD
+
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Worldwide", "Custom split", "Even split", "Optimize", "Best value"])
+    with tab1:
+        budget_worldwide(usd_input, inr_budget)
+    with tab2:
+        budget_custom(inr_budget)
+    with tab3:
+        budget_even(inr_budget)
+    with tab4:
+        budget_optimize(inr_budget)
+    with tab5:
+        budget_value(usd_input)
+
+
+@st.fragment
+def budget_worldwide(usd_input, inr_budget):
     # Use worldwide CPV/CPS
-    cpv, cps = 0.20, 6.0
+    cpv, cps = WORLDWIDE_CPV_INR, WORLDWIDE_CPS_INR
     # 5% subs-to-views ratio: cost = views*cpv + subs*cps, subs = 0.05*views
     # cost = views*cpv + (0.05*views)*cps = views*(cpv + 0.05*cps)
-    if cpv + 0.05 * cps > 0:
-        max_views = int(inr_budget / (cpv + 0.05 * cps))
-        max_subs = int(0.05 * max_views)
+    ((_, max_views, max_subs, _),) = quote_memo.budget_split(card, inr_budget, ((WORLDWIDE, 1.0),), source)
+    if max_views >= 0:
         st.markdown(f"**Worldwide:** {max_views:,} views + {max_subs:,} subs")
         st.caption(f"CPV: ₹{cpv}, CPS: ₹{cps}, Budget: ₹{inr_budget:,.0f}")
+        package = ladders["Worldwide"].best_under(usd_input)
+        custom = ladders["Worldwide"].interpolate(usd_input)
+        if package:
+            st.markdown(f"**Best package under ${usd_input:,}:** ${package.price_usd:,.0f} — "
+                        f"{package.views:,} views + {package.subs_text('{:,}'.format)} subs")
+        st.markdown(f"**Custom tier at ${usd_input:,}:** {custom.views:,} views + {custom.subs:,} subs")
     else:
         st.write("Invalid CPV/CPS values.")
 
-with tab2:
+
+@st.fragment
+def budget_custom(inr_budget):
     st.write("Enter your custom split (e.g. India:60, USA:40):")
     split_input = st.text_input("Country : % split", value="India:60, USA:40", key="split_budget")
-    try:
-        parts = [p.strip() for p in split_input.split(",") if ":" in p]
-        split = [(x.split(":")[0].strip(), float(x.split(":")[1].strip())) for x in parts]
-        total_percent = sum([p[1] for p in split])
-        if total_percent > 0:
-            for country, percent in split:
-                country_key = country.casefold()
-                country_budget = inr_budget * (percent / total_percent)
-                cpv = cpv_lookup.get(country_key, 0.30)
-                cps = cps_lookup.get(country_key, 10.0)
-                if cpv + 0.05 * cps > 0:
-                    views = int(country_budget / (cpv + 0.05 * cps))
-                    subs = int(0.05 * views)
-                    st.markdown(f"**{country.title()}:** {views:,} views + {subs:,} subs (₹{country_budget:,.0f})")
-                else:
-                    st.write(f"{country.title()}: Invalid CPV/CPS values.")
-        else:
-            st.write("Please enter valid percentages.")
-    except Exception as e:
+    split = quote_memo.parse_percent_splits(split_input)
+    if split is None:
         st.write("Invalid input format.")
+    elif sum(p for _, p in split) > 0:
+        for message in quote_memo.unknown_countries(card, tuple(c for c, _ in split)):
+            st.warning(message)
+        _budget_rows(quote_memo.budget_split(card, inr_budget, split, source))
+    else:
+        st.write("Please enter valid percentages.")
+
 
-with tab3:
+@st.fragment
+def budget_even(inr_budget):
     st.write("Select countries for even split:")
-    country_options = sorted([c.title() for c in cpv_lookup.keys() if c and c[0].isalpha()])
+    country_options = quote_memo.country_titles(card)
     # Only set defaults if present in options
     default_countries = []
     for d in ["India", "Usa", "United States"]:
         if d in country_options:
             default_countries.append(d)
     if not default_countries:
-        default_countries = country_options[:2]  # fallback to first two
+        default_countries = list(country_options[:2])  # fallback to first two
     even_countries = st.multiselect(
         "Countries",
         country_options,
         default=default_countries,
         key="even_budget"
     )
-    n = len(even_countries)
-    if n > 0:
-        per_country_budget = inr_budget / n
-        for country in even_countries:
-            country_key = country.casefold()
-            cpv = cpv_lookup.get(country_key, 0.30)
-            cps = cps_lookup.get(country_key, 10.0)
-            if cpv + 0.05 * cps > 0:
-                views = int(per_country_budget / (cpv + 0.05 * cps))
-                subs = int(0.05 * views)
-                st.markdown(f"**{country}:** {views:,} views + {subs:,} subs (₹{per_country_budget:,.0f})")
-            else:
-                st.write(f"{country}: Invalid CPV/CPS values.")
+    if even_countries:
+        shares = tuple((c, 1.0) for c in even_countries)
+        _budget_rows(quote_memo.budget_split(card, inr_budget, shares, source), label=str)
     else:
         st.write("Select at least one country.")
+
+
+@st.fragment
+def budget_optimize(inr_budget):
+    st.write("Find the allocation that gets the most for this budget:")
+    objective = st.radio(
+        "Objective",
+        list(OBJECTIVES),
+        format_func=OBJECTIVES.get,
+        horizontal=True,
+        key="opt_objective"
+    )
+    all_options = quote_memo.country_titles(card)
+    eligible = st.multiselect(
+        "Eligible countries (leave empty for all)",
+        all_options,
+        default=[],
+        key="opt_countries"
+    )
+    limits = st.data_editor(
+        [{"Country": c, "Min views": 0, "Max views": None} for c in eligible],
+        column_config={
+            "Country": st.column_config.TextColumn(disabled=True),
+            "Min views": st.column_config.NumberColumn(min_value=0, step=1),
+            "Max views": st.column_config.NumberColumn(min_value=0, step=1),
+        },
+        hide_index=True,
+        key="opt_limits"
+    ) if eligible else []
+    try:
+        result = quote_memo.optimize(
+            card,
+            inr_budget,
+            tuple(eligible) or quote_memo.priced_titles(card),
+            objective,
+            tuple((r["Country"], r["Min views"] or 0) for r in limits),
+            tuple((r["Country"], r["Max views"]) for r in limits if r["Max views"] is not None),
+            source,
+        )
+        st.markdown(
+            f"**Total:** {result.total_views:,} views + {result.total_subs:,} subs "
+            f"(₹{result.total_cost_inr:,.0f} of ₹{inr_budget:,.0f})"
+        )
+        for country, views, subs, cost in result.rows():
+            st.markdown(f"**{country}:** {views:,} views + {subs:,} subs (₹{cost:,.0f})")
+    except KeyError as e:
+        st.write(e.args[0])
+    except ValueError as e:
+        st.write(str(e))
+
+
+@st.fragment
+def budget_value(usd_input):
+    st.write(f"Countries ranked by cost per view + 5% subs, and what ${usd_input:,} buys in each:")
+    # ranked once per rate card (value_table.py); filters and budgets are slices and one division
+    table = quote_memo.value_table(card)
+    col1, col2, col3 = st.columns(3)
+    order = col1.radio("Show", ["Cheapest", "Most expensive"], horizontal=True, key="value_order")
+    region = col2.selectbox("Region", ["All", *table.region_names()], key="value_region")
+    top = col3.number_input("Countries", min_value=1, max_value=len(table), value=10, step=1,
+                            key="value_top")
+    pick = table.cheapest if order == "Cheapest" else table.most_expensive
+    rows = pick(int(top), None if region == "All" else region)
+    st.dataframe(
+        table.frame(rows, usd_input),
+        column_config={
+            "CPV (INR)": st.column_config.NumberColumn(format="₹%.2f"),
+            "CPS (INR)": st.column_config.NumberColumn(format="₹%.2f"),
+            "Cost per view + 5% subs (INR)": st.column_config.NumberColumn(format="₹%.4f"),
+            "Views per $": st.column_config.NumberColumn(format="%.0f"),
+            "Views": st.column_config.NumberColumn(format="localized"),
+            "Subs": st.column_config.NumberColumn(format="localized"),
+        },
+        hide_index=True,
+        width="stretch",
+    )
+
+
+# 5) Scenario grid: markup × views for a country mix
+@st.fragment
+def scenario_section():
+    st.header("📈 Scenario grid")
+    mix = st.text_input("Country mix (worldwide, India:60, USA:40 or India, France)",
+                        value="India:60, USA:40", key="grid_mix")
+    lo_views, hi_views = st.slider("Views", min_value=10_000, max_value=2_000_000,
+                                   value=(50_000, 1_000_000), step=10_000, key="grid_views")
+    view_step = st.number_input("Views step", min_value=1_000, value=50_000, step=1_000, key="grid_step")
+    lo_markup, hi_markup = st.slider("Markup %", min_value=0, max_value=150, value=(40, 65), step=5,
+                                     key="grid_markup")
+    subs = st.number_input("Subscribers (capped at 5% of views)", min_value=0, value=0, step=100,
+                           key="grid_subs")
+    try:
+        grid = sweep(card, [mix],
+                     np.arange(lo_views, hi_views + 1, view_step),
+                     np.array([subs]),
+                     np.arange(lo_markup, hi_markup + 1, 5),
+                     MAX_SUBS_RATIO)
+    except KeyError as e:
+        st.warning(e.args[0])
+        return
+    except ValueError as e:
+        st.warning(str(e))
+        return
+
+    heat = grid.heatmap_frame().dropna()
+    if heat.empty:
+        st.write("No priced cells: subscribers exceed 5% of every view count.")
+        return
+    st.altair_chart(
+        alt.Chart(heat).mark_rect().encode(
+            x=alt.X("markup:O", title="Markup %"),
+            y=alt.Y("views:O", title="Views", sort="descending"),
+            color=alt.Color("client_usd:Q", title="Client USD"),
+            tooltip=["views", "markup", alt.Tooltip("client_usd", format="$,.2f")],
+        ),
+        width="stretch",
+    )
+    frame = grid.to_frame()
+    col1, col2 = st.columns(2)
+    col1.download_button("Download CSV", frame.to_csv(index=False), file_name="scenario_grid.csv",
+                         mime="text/csv")
+    try:
+        col2.download_button("Download Parquet", frame.to_parquet(index=False),
+                             file_name="scenario_grid.parquet", mime="application/octet-stream")
+    except ImportError:
+        col2.caption("Install pyarrow for Parquet export.")
+
+
+quote_inputs()
+quote_result()
+budget_section()
+scenario_section()
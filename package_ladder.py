@@ -0,0 +1,183 @@
+"""
+Package price ladder: the sidebar tiers as a queryable, sorted index.
+
+Each targeting region has a fixed list of published (price, views, subs)
+tiers and the CPV/CPS they were priced against; tiers published with a
+subscriber range ("400-450 subs") are priced at its midpoint and shown
+with the range. Every tier gets its own markup, calibrated so that at
+those reference rates it prices at exactly its published figure; the ladder is then priced from the live rate card
+with those markups, so today's export reproduces the published prices and
+a new CPV/CPS export reprices every tier in proportion to its cost. Views
+and subs never decrease along a ladder, which lets every query run in
+O(log n) with bisect.
+"""
+import bisect
+from typing import NamedTuple
+
+from pricing_engine import INR_TO_USD, WORLDWIDE, RateCard
+from rate_snapshot import source_stamp
+
+# (rate-card key, (reference CPV, CPS) in INR, [(published USD, views, subs)]), cheapest first;
+# subs is a count or a published (low, high) range
+REGION_TIERS = {
+    "Worldwide": (
+        WORLDWIDE, (0.2, 6.0),
+        [(50, 5_000, 0), (100, 10_000, 0), (150, 15_000, 0), (200, 20_000, 0),
+         (249, 25_000, (400, 450)), (299, 32_000, (700, 750)), (399, 50_000, (800, 850)),
+         (499, 80_000, (1_600, 2_400)), (699, 100_000, (2_800, 3_200)),
+         (999, 160_000, (3_800, 4_200)), (1_499, 240_000, (6_200, 6_500)),
+         (1_999, 325_000, 8_000), (2_499, 415_000, 10_000), (3_000, 520_000, 12_000),
+         (3_500, 620_000, 14_000), (4_000, 730_000, 16_000), (4_500, 850_000, 18_000),
+         (5_000, 1_000_000, 20_000)],
+    ),
+    "United States": (
+        "united states", (2.05, 72.09),
+        [(149, 3_500, 0), (199, 4_700, 0), (249, 6_000, 0), (299, 7_200, 0),
+         (399, 9_500, 0), (499, 12_500, 0), (1_000, 26_000, 0)],
+    ),
+}
+
+# Rate-card keys the ladders are priced from
+LADDER_COUNTRIES = [key for key, _, _ in REGION_TIERS.values()]
+
+
+def subs_range(subs) -> tuple[int, int]:
+    """A tier's subs as a (low, high) range; a plain count is its own range."""
+    return tuple(subs) if isinstance(subs, (list, tuple)) else (subs, subs)
+
+
+def _short(n: int) -> str:
+    if n >= 1_000_000:
+        return f"{n / 1_000_000:g}M"
+    if n >= 1_000:
+        return f"{n / 1_000:g}K"
+    return str(n)
+
+
+def calibrate_markup(price_usd: float, internal_inr: float) -> float:
+    """The markup % that turns internal_inr into price_usd."""
+    return (price_usd / (internal_inr * INR_TO_USD) - 1) * 100
+
+
+class Package(NamedTuple):
+    price_usd: float
+    views: int
+    subs: int  # priced count: the midpoint of a published range
+    internal_inr: float
+    custom: bool = False
+    subs_range: tuple[int, int] = None  # published (low, high), None for a single count
+
+    def subs_text(self, fmt=_short) -> str:
+        """Subscribers as published: '400-450' for a range, else the count."""
+        if self.subs_range and self.subs_range[0] != self.subs_range[1]:
+            return "-".join(fmt(n) for n in self.subs_range)
+        return fmt(self.subs)
+
+
+class PackageLadder:
+    """
+    Sorted tiers for one region with bisect-based lookups. `tiers` are
+    (views, subs) pairs, subs a count or a (low, high) range; `markups`
+    holds one markup % per tier (a single number applies to every tier).
+    """
+
+    def __init__(self, region: str, cpv_inr: float, cps_inr: float, markups, tiers):
+        self.region = region
+        self.cpv_inr = cpv_inr
+        self.cps_inr = cps_inr
+        tiers = list(tiers)
+        self.markups = list(markups) if isinstance(markups, (list, tuple)) else [markups] * len(tiers)
+        self.packages = [self._price(v, sum(subs_range(s)) // 2, m, subs_range=subs_range(s))
+                         for (v, s), m in zip(tiers, self.markups)]
+        self.prices = [p.price_usd for p in self.packages]
+        self.views = [p.views for p in self.packages]
+        self.subs = [p.subs for p in self.packages]
+        if any(a > b for seq in (self.prices, self.views, self.subs) for a, b in zip(seq, seq[1:])):
+            raise ValueError(f"{region} tiers must not decrease in price, views or subs.")
+
+    def _price(self, views: int, subs: int, markup: float, custom: bool = False,
+               subs_range: tuple[int, int] = None) -> Package:
+        internal = views * self.cpv_inr + subs * self.cps_inr
+        # not calculate_cost: its whole-basis-point markup would move a calibrated $5,000 by cents
+        return Package(round(internal * INR_TO_USD * (1 + markup / 100), 2), views, subs, internal, custom,
+                       subs_range)
+
+    def __len__(self):
+        return len(self.packages)
+
+    def __iter__(self):
+        return iter(self.packages)
+
+    def best_under(self, budget_usd: float) -> Package | None:
+        """The largest package priced at or under the budget."""
+        i = bisect.bisect_right(self.prices, budget_usd)
+        return self.packages[i - 1] if i else None
+
+    def cheapest_for(self, views: int, subs: int = 0) -> Package | None:
+        """The cheapest package with at least this many views and subs."""
+        i = max(bisect.bisect_left(self.views, views), bisect.bisect_left(self.subs, subs))
+        return self.packages[i] if i < len(self.packages) else None
+
+    def interpolate(self, budget_usd: float) -> Package:
+        """
+        A custom tier for an arbitrary budget: views and subs interpolated
+        linearly between the neighbouring tiers (scaled from the first or
+        last tier outside the ladder), then repriced from the rate card.
+        """
+        i = bisect.bisect_right(self.prices, budget_usd)
+        if 0 < i < len(self.packages):
+            lo, hi = self.packages[i - 1], self.packages[i]
+            t = (budget_usd - lo.price_usd) / (hi.price_usd - lo.price_usd) if hi.price_usd > lo.price_usd else 0.0
+            views = lo.views + t * (hi.views - lo.views)
+            subs = lo.subs + t * (hi.subs - lo.subs)
+            markup = self.markups[i - 1] + t * (self.markups[i] - self.markups[i - 1])
+        else:
+            j = 0 if i == 0 else -1
+            edge = self.packages[j]
+            scale = budget_usd / edge.price_usd if edge.price_usd else 0.0
+            views, subs, markup = edge.views * scale, edge.subs * scale, self.markups[j]
+        return self._price(int(views), int(subs), markup, custom=True)
+
+
+def build_ladders(card: RateCard, markups: dict[str, float] = None) -> dict[str, PackageLadder]:
+    """
+    One ladder per targeting region, priced from the card with each tier's
+    calibrated markup. `markups` overrides a region with one flat markup %.
+    """
+    markups = markups or {}
+    ladders = {}
+    for region, (key, (ref_cpv, ref_cps), tiers) in REGION_TIERS.items():
+        cpv, cps = card.rates(key)
+        tier_markups = markups.get(region)
+        if tier_markups is None:  # an explicit 0% override is still an override
+            tier_markups = [calibrate_markup(price, views * ref_cpv + sum(subs_range(subs)) // 2 * ref_cps)
+                            for price, views, subs in tiers]
+        ladders[region] = PackageLadder(region, cpv, cps, tier_markups, [(v, s) for _, v, s in tiers])
+    return ladders
+
+
+_ladder_cache = {}
+
+
+def load_ladders(cpv_file: str, cps_file: str, markups: dict[str, float] = None) -> dict[str, PackageLadder]:
+    """
+    Ladders for the given exports, rebuilt automatically when either CSV
+    changes (keyed on the files' size and mtime).
+    """
+    key = (cpv_file, cps_file, source_stamp(cpv_file, cps_file), tuple(sorted((markups or {}).items())))
+    if key not in _ladder_cache:
+        _ladder_cache.clear()
+        _ladder_cache[key] = build_ladders(RateCard.from_files(cpv_file, cps_file), markups)
+    return _ladder_cache[key]
+
+
+def ladder_markdown(ladders: dict[str, PackageLadder]) -> str:
+    """Sidebar Markdown for the ladders (one bullet per tier)."""
+    out = []
+    for region, ladder in ladders.items():
+        out.append(f"**{region} Targeted**")
+        for p in ladder:
+            subs = f" + {p.subs_text()} subs" if p.subs else ""
+            out.append(f"- **${p.price_usd:,.0f}:** {_short(p.views)} views{subs}  ")
+        out.append("")
+    return "\n".join(out)
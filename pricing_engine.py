@@ -0,0 +1,773 @@
+"""
+Shared pricing engine for the CLI (ad_cost_calculator.py) and the
+Streamlit app (main.py): rate-card loaders, the RateCard type, subscriber
+allocation and cost/markup maths. Both front ends import from here so
+their rates and fallbacks cannot drift apart again.
+"""
+from array import array
+import csv
+import math
+import re
+
+from instrumentation import cache_miss, count, span, timed
+
+# pandas and numpy are imported lazily: a scripted single quote only needs
+# two columns from a ~237-row file, and the stdlib csv module reads that
+# faster than `import pandas` alone takes.
+
+INR_PER_USD = 85  # Fixed conversion
+INR_TO_USD = 1 / INR_PER_USD
+
+# Money is fixed-point internally: rates and unrounded totals in integer
+# micro-rupees, results in integer paise / US cents. Sums are exact, and
+# the only rounding is the final micro → paise/cents step, halves up.
+MICRO = 1_000_000  # micro-rupees per rupee
+PAISE = 100  # paise per rupee (and cents per dollar)
+
+# Fixed worldwide rates (INR)
+WORLDWIDE = "worldwide"
+WORLDWIDE_CPV_INR = 0.20
+WORLDWIDE_CPS_INR = 6.0
+
+# Used for zero rates in the exports and for countries missing a rate
+DEFAULT_CPV_INR = 0.30
+DEFAULT_CPS_INR = 10.0
+
+DEFAULT_MARKUP = 50
+MAX_MARKUP = 100  # the highest markup % a quote request may ask for, as in the CLI
+
+
+# ---------- Stdlib CSV helpers ----------
+
+def _read_rows(filepath: str) -> list[list[str]]:
+    """All non-blank rows of a CSV file (blank lines skipped, like read_csv)."""
+    with open(filepath, newline="", encoding="utf-8-sig") as f:
+        return [row for row in csv.reader(f) if any(cell.strip() for cell in row)]
+
+
+def _to_float(cell) -> float | None:
+    """Like pd.to_numeric(errors='coerce'): None for '#DIV/0!', '' and friends."""
+    if cell is None:
+        return None
+    text = cell.strip()
+    if not text or "_" in text:
+        return None
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return None if value != value else value
+
+
+def _cell(row: list[str], i: int) -> str:
+    """Cell i of a row as text; missing/empty cells read as 'nan' like pandas."""
+    return row[i] if i < len(row) and row[i] != "" else "nan"
+
+
+def _header_names(row: list[str]) -> list[str]:
+    """Column names as read_csv derives them: 'Unnamed: i' and '.1' de-duplication."""
+    names, seen = [], {}
+    for i, cell in enumerate(row):
+        name = cell if cell.strip() else f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _load_rows(filepath: str) -> list[list[str]]:
+    rows = _read_rows(filepath)
+    if not rows or len(rows[0]) < 2:
+        raise ValueError(f"{filepath} must have at least two columns.")
+    return rows
+
+
+# ---------- Smart CSV reader ----------
+
+@timed()
+def _read_two_col_rows(filepath: str, value_col_name: str,
+                       value_name_hints: list[str] = None) -> list[tuple[str, float]]:
+    """
+    Stdlib backend of _read_two_col_smart: same title-row/header detection,
+    returned as (country, value) pairs with unparseable values as 0.0.
+    """
+    value_col_name = value_col_name.strip()
+    value_name_hints = (value_name_hints or [])
+    rows = _load_rows(filepath)
+
+    with span("_read_two_col_rows.sniff_header"):
+        country_idx, value_idx, body = _sniff_columns(rows, value_col_name, value_name_hints)
+    return [(_cell(r, country_idx).strip(), _to_float(_cell(r, value_idx)) or 0.0) for r in body]
+
+
+def _sniff_columns(rows: list[list[str]], value_col_name: str, value_name_hints: list[str]):
+    """(country column, value column, data rows) after title-row/header detection."""
+    if _to_float(rows[0][1]) is not None:
+        country_idx, value_idx, body = 0, 1, rows
+    else:
+        columns = [re.sub(r"\s+", " ", c.replace("\xa0", " ").strip())
+                   for c in _header_names(rows[0])]
+        country_idx = next(
+            (i for i, c in enumerate(columns)
+             if any(k in c.lower() for k in ['country', 'territory', 'user location'])),
+            0
+        )
+        value_idx = next(
+            (i for i, c in enumerate(columns)
+             if any(h in c.lower() for h in [*value_name_hints, value_col_name.lower()])),
+            len(columns) - 1
+        )
+        body = rows[1:]
+    return country_idx, value_idx, body
+
+
+@timed()
+def _read_two_col_smart(filepath: str, value_col_name: str, value_name_hints: list[str] = None):
+    """
+    Robustly read 2+ column CSVs that might have title rows or be headerless.
+    Returns a DataFrame with columns ['Country', value_col_name].
+    """
+    import pandas as pd
+
+    pairs = _read_two_col_rows(filepath, value_col_name, value_name_hints)
+    return pd.DataFrame(pairs, columns=["Country", value_col_name.strip()])
+
+
+# ---------- Loaders returning lookup dicts ----------
+
+@timed()
+def read_country_cells(filepath: str) -> dict[str, str]:
+    """
+    Raw (casefolded country → unparsed rate cell) pairs from an export,
+    with the header row dropped. Later duplicates win, as in the loaders.
+    """
+    rows = _load_rows(filepath)
+    # Detect header row: if cell (0,1) is not numeric, drop it
+    if _to_float(rows[0][1]) is None:
+        rows = rows[1:]
+    return {_cell(r, 0).strip().casefold(): _cell(r, 1) for r in rows}
+
+
+def parse_rate(cell: str, zero_default: float) -> float:
+    """A rate cell as a float; unparseable and zero values become zero_default."""
+    value = _to_float(cell) or 0.0
+    return value if value != 0 else zero_default
+
+
+@timed()
+def load_cpvs(filepath: str) -> dict[str, float]:
+    """
+    Reads a CSV that is either headerless or has a single header row.
+    Always returns a dict mapping lowercase country → CPV_INR.
+    Zero values are replaced with DEFAULT_CPV_INR.
+    """
+    return {k: parse_rate(c, DEFAULT_CPV_INR) for k, c in read_country_cells(filepath).items()}
+
+
+@timed()
+def load_cps(filepath: str) -> dict[str, float]:
+    """
+    Reads a CSV that is either headerless or has a single header row.
+    Always returns a dict mapping lowercase country → CPS_INR.
+    Zero values are replaced with DEFAULT_CPS_INR.
+    """
+    return {k: parse_rate(c, DEFAULT_CPS_INR) for k, c in read_country_cells(filepath).items()}
+
+
+# ---------- Cost engine ----------
+
+def to_micro(inr: float) -> int:
+    """A rate or amount in integer micro-rupees."""
+    return round(inr * MICRO)
+
+
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _mul_div_round(x, num, den):
+    """
+    x × num / den rounded half up, in integers. x (and num) may be ints or
+    int64 arrays; arrays too large for x × num in int64 are split by den
+    first to keep every product in range.
+    """
+    if isinstance(x, int):
+        return (2 * x * num + den) // (2 * den)
+    import numpy as np
+
+    if x.size == 0 or int(np.abs(x).max()) * int(np.max(num)) < _INT64_MAX // 4:
+        return (2 * x * num + den) // (2 * den)
+    q, r = np.divmod(x, den)
+    return q * num + (2 * r * num + den) // (2 * den)
+
+
+_MICRO_PER_PAISA = MICRO // PAISE
+
+
+def price_micro(total_micro: int, markup_percent: float) -> tuple[int, int, int, int]:
+    """
+    (internal paise, internal US cents, client paise, client US cents) for
+    an exact micro-rupee total: one half-up rounding per figure. The markup
+    is taken to 0.01%.
+    """
+    num = 10_000 + round(markup_percent * 100)  # 1 + markup%, over 10_000
+    x2 = 2 * total_micro
+    paisa, cent = _MICRO_PER_PAISA, _MICRO_PER_PAISA * INR_PER_USD
+    return (
+        (x2 + paisa) // (2 * paisa),
+        (x2 + cent) // (2 * cent),
+        (x2 * num + 10_000 * paisa) // (20_000 * paisa),
+        (x2 * num + 10_000 * cent) // (20_000 * cent),
+    )
+
+
+@timed()
+def calculate_cost(total_inr: float, markup_percent: float):
+    """(internal INR, internal USD, client INR, client USD), each to the paisa/cent."""
+    internal, internal_usd, client, client_usd = price_micro(to_micro(total_inr), markup_percent)
+    return internal / PAISE, internal_usd / PAISE, client / PAISE, client_usd / PAISE
+
+
+# ---------- Subscriber allocation ----------
+
+@timed()
+def allocate_subs(total_subs: int, views: list[int]) -> list[int]:
+    """
+    Split total_subs proportionally to views (largest-remainder method).
+    Leftover units go to the largest fractional parts; ties go to the
+    later entry, matching sorted(..., reverse=True) on (frac, index).
+    """
+    sum_views = sum(views)
+    if sum_views == 0:
+        raise ValueError("Total views cannot be zero.")
+    ideal_subs = [total_subs * v / sum_views for v in views]
+    floor_subs = [int(x) for x in ideal_subs]
+    leftover = total_subs - sum(floor_subs)
+
+    fracs = [(ideal_subs[i] - floor_subs[i], i) for i in range(len(floor_subs))]
+    for _, idx in sorted(fracs, reverse=True)[:leftover]:
+        floor_subs[idx] += 1
+    return floor_subs
+
+
+@timed()
+def allocate_subs_batch(total_subs, views):
+    """
+    Vectorized allocate_subs for many quotes at once.
+
+    views is a (quotes, countries) array (shorter splits padded with zero
+    views) or a single 1-D split; total_subs is a scalar or one total per
+    quote. Returns int64 allocations of the same shape as views, identical
+    to allocate_subs row by row, ties included (inputs whose products
+    would overflow int64 are handed to allocate_subs row by row).
+
+    Instead of sorting every fractional part, np.partition finds each
+    row's leftover-th largest fraction (the cut-off), one call per distinct
+    leftover; everything above the cut-off gets a unit, and units left for
+    fractions equal to the cut-off go to the latest entries.
+    """
+    import numpy as np
+
+    views = np.asarray(views, dtype=np.int64)
+    single = views.ndim == 1
+    views = np.atleast_2d(views)
+    q, n = views.shape
+    totals = np.broadcast_to(np.asarray(total_subs, dtype=np.int64), (q,))
+
+    if views.size and int(np.abs(views).max()) * max(int(np.abs(totals).max()), n) > _INT64_MAX:
+        # views × total_subs (or a row's view sum) would overflow int64; Python ints stay exact
+        result = np.array([allocate_subs(t, row) for t, row in zip(totals.tolist(), views.tolist())],
+                          dtype=np.int64).reshape(q, n)
+        return result[0] if single else result
+
+    sum_views = views.sum(axis=1)
+    if (sum_views == 0).any():
+        raise ValueError("Total views cannot be zero.")
+    ideal = (totals[:, None] * views) / sum_views[:, None]
+    floor = ideal.astype(np.int64)
+    fracs = ideal - floor
+    leftover = totals - floor.sum(axis=1)
+
+    result = floor
+    rows = np.flatnonzero(leftover > 0)
+    if rows.size:
+        k = leftover[rows]
+        sub = fracs[rows]
+        cutoff = np.empty((rows.size, 1))
+        for kk in np.unique(k).tolist():
+            group = np.flatnonzero(k == kk)
+            # ascending position n - kk holds the kk-th largest fraction
+            cutoff[group, 0] = np.partition(sub[group], n - kk, axis=1)[:, n - kk]
+
+        above = sub > cutoff
+        tied = sub == cutoff
+        need = (k - above.sum(axis=1))[:, None]
+        # rank ties from the right so later entries win, like the sort on (frac, index)
+        tie_rank = np.cumsum(tied[:, ::-1], axis=1)[:, ::-1]
+        result[rows] += above | (tied & (tie_rank <= need))
+
+    return result[0] if single else result
+
+
+def split_even(total: int, n: int) -> list[int]:
+    """Split total into n near-equal integer parts; the first ones get the remainder."""
+    each, rem = divmod(total, n)
+    return [each + (1 if i < rem else 0) for i in range(n)]
+
+
+def _inr_text(micro: int) -> str:
+    paise = _mul_div_round(micro, 1, _MICRO_PER_PAISA)
+    return f"{'-' if paise < 0 else ''}{abs(paise) // PAISE}.{abs(paise) % PAISE:02d}"
+
+
+def breakdown_lines(label: str, views: int, subs: int, cpv_inr: float, cps_inr: float) -> list[str]:
+    """The two breakdown lines (views, subs) shown for one country."""
+    return [
+        f"{label} Views: {views} × ₹{cpv_inr:.2f} = ₹{_inr_text(views * to_micro(cpv_inr))}",
+        f"{label} Subs:  {subs} × ₹{cps_inr:.2f} = ₹{_inr_text(subs * to_micro(cps_inr))}",
+    ]
+
+
+# ---------- Rate card ----------
+
+class RateCard:
+    """
+    Country rates with interned integer IDs.
+
+    `names[i]` is the casefolded country for ID i (sorted), `ids` maps a
+    name back to its ID, and `cpv`/`cps` are contiguous float64 buffers
+    indexed by ID. A rate missing from one export is NaN. The fixed
+    worldwide rates are interned as the pseudo-country 'worldwide'.
+
+    A card is immutable: the rate buffers are read-only memoryviews, so one
+    instance can be shared by every Streamlit session and server request.
+    Use with_rates() to derive an updated card.
+    """
+
+    __slots__ = ("names", "ids", "cpv", "cps", "_index")
+
+    def __init__(self, names: list[str], cpv: array, cps: array, ids: dict[str, int] = None, index=None):
+        self.names = tuple(names)
+        self.ids = ids if ids is not None else {name: i for i, name in enumerate(self.names)}
+        self.cpv = memoryview(cpv).toreadonly()
+        self.cps = memoryview(cps).toreadonly()
+        self._index = index
+
+    def __reduce__(self):
+        return RateCard, (self.names, array("d", self.cpv), array("d", self.cps))
+
+    @classmethod
+    def from_lookups(cls, cpv_lookup: dict[str, float], cps_lookup: dict[str, float]) -> "RateCard":
+        cpv_lookup = {WORLDWIDE: WORLDWIDE_CPV_INR, **cpv_lookup}
+        cps_lookup = {WORLDWIDE: WORLDWIDE_CPS_INR, **cps_lookup}
+        names = sorted(set(cpv_lookup) | set(cps_lookup))
+        return cls(
+            names,
+            array("d", (cpv_lookup.get(n, math.nan) for n in names)),
+            array("d", (cps_lookup.get(n, math.nan) for n in names)),
+        )
+
+    @classmethod
+    def from_files(cls, cpv_file: str, cps_file: str) -> "RateCard":
+        """
+        Load via the compiled snapshot (rebuilt when a CSV changes); the
+        card's rates are the snapshot's memory-mapped columns, not copies.
+        If the snapshot cannot be written or mapped (e.g. a read-only data/
+        directory), the CSVs are parsed in memory instead.
+        """
+        from rate_snapshot import load_snapshot
+
+        try:
+            snap = load_snapshot(cpv_file, cps_file)
+        except OSError:
+            cache_miss("rate_snapshot.unwritable")
+            return cls.from_lookups(load_cpvs(cpv_file), load_cps(cps_file))
+        # the views keep the mapping open for as long as the card lives
+        return cls(snap.countries, snap.cpv, snap.cps)
+
+    def with_rates(self, cpv_updates: dict[str, float], cps_updates: dict[str, float]) -> "RateCard":
+        """
+        A copy with some rates replaced (NaN removes a rate). Names and IDs
+        are shared when every key is already interned; otherwise the card
+        is rebuilt. The original card is left untouched.
+        """
+        if not all(k in self.ids for k in (*cpv_updates, *cps_updates)):
+            cpv_lookup = {**self.cpv_lookup(), **cpv_updates}
+            cps_lookup = {**self.cps_lookup(), **cps_updates}
+            return RateCard.from_lookups(
+                {k: v for k, v in cpv_lookup.items() if v == v},
+                {k: v for k, v in cps_lookup.items() if v == v},
+            )
+        cpv, cps = array("d", self.cpv), array("d", self.cps)
+        for key, value in cpv_updates.items():
+            cpv[self.ids[key]] = value
+        for key, value in cps_updates.items():
+            cps[self.ids[key]] = value
+        return RateCard(self.names, cpv, cps, self.ids, self._index)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, key: str):
+        return self.id(key) >= 0
+
+    def id(self, key: str) -> int:
+        """
+        Interned ID for a country name (any case), ISO code or known alias
+        ('USA', 'UK', 'Turkey'), or -1 if unknown.
+        """
+        cid = self.ids.get(key.strip().casefold(), -1)
+        if cid < 0 and key.strip():
+            cid = self.index().resolve(key)
+        return cid
+
+    def index(self):
+        """The alias/typo index over this card's names, built on first use."""
+        if self._index is None:
+            from country_aliases import CountryIndex
+
+            self._index = CountryIndex(self.names)
+        return self._index
+
+    def suggest(self, key: str, k: int = 5) -> list[str]:
+        """Closest country names for an unknown key, best first (title case)."""
+        return [self.names[cid].title() for cid, _ in self.index().suggest(key, k)]
+
+    def missing_message(self, key: str) -> str:
+        """'No CPV/CPS for 'x'.' plus 'Did you mean ...?' when there are close names."""
+        cid = self.id(key)
+        if cid >= 0:
+            # Known country, in only one of the exports
+            missing = "/".join(name for name, rates in (("CPV", self.cpv), ("CPS", self.cps))
+                               if rates[cid] != rates[cid])
+            return f"No {missing or 'CPV/CPS'} for '{key}'."
+        suggestions = self.suggest(key)
+        hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+        return f"No CPV/CPS for '{key}'.{hint}"
+
+    def complete(self, cid: int) -> bool:
+        """True if the country has both a CPV and a CPS."""
+        return cid >= 0 and self.cpv[cid] == self.cpv[cid] and self.cps[cid] == self.cps[cid]
+
+    def rates(self, key: str) -> tuple[float, float]:
+        """(CPV, CPS) for a country, falling back to the defaults when missing."""
+        cid = self.id(key)
+        if cid < 0:
+            count("rate_card.lookup_miss")
+            return DEFAULT_CPV_INR, DEFAULT_CPS_INR
+        cpv, cps = self.cpv[cid], self.cps[cid]
+        if cpv != cpv or cps != cps:
+            count("rate_card.partial_rates")
+        return (cpv if cpv == cpv else DEFAULT_CPV_INR,
+                cps if cps == cps else DEFAULT_CPS_INR)
+
+    def country_names(self) -> list[str]:
+        """Sorted real country keys (no worldwide row, no title/date rows)."""
+        return [n for n in self.names if n and n[0].isalpha() and n != WORLDWIDE]
+
+    def cpv_lookup(self) -> dict[str, float]:
+        return {n: v for n, v in zip(self.names, self.cpv) if v == v}
+
+    def cps_lookup(self) -> dict[str, float]:
+        return {n: v for n, v in zip(self.names, self.cps) if v == v}
+
+    def ids_for(self, keys):
+        """
+        Vectorized name → ID lookup as an int64 NumPy array. Each distinct
+        key is hashed once; integer input is taken as IDs already.
+        Raises KeyError listing every key (or ID) without both rates.
+        """
+        import numpy as np
+
+        keys = np.asarray(keys)
+        if keys.dtype.kind in "iu":
+            ids = keys.astype(np.int64, copy=False)
+            # out-of-range IDs have no name to report (or to wrap around to)
+            missing = [self.missing_message(self.names[cid]) if 0 <= cid < len(self) else f"No CPV/CPS for ID {cid}."
+                       for cid in np.unique(ids).tolist() if not (0 <= cid < len(self) and self.complete(cid))]
+        else:
+            uniq, inverse = np.unique(keys.astype(str), return_inverse=True)
+            uniq_ids = np.array([self.id(k) for k in uniq.tolist()], dtype=np.int64)
+            missing = [self.missing_message(k) for k, cid in zip(uniq.tolist(), uniq_ids.tolist())
+                       if not self.complete(cid)]
+            ids = uniq_ids[inverse.reshape(-1)]
+        if missing:
+            raise KeyError(" ".join(missing))
+        return ids
+
+    def rate_arrays(self):
+        """(CPV, CPS) as NumPy views over the rate buffers (no copy)."""
+        import numpy as np
+
+        return np.frombuffer(self.cpv, dtype=np.float64), np.frombuffer(self.cps, dtype=np.float64)
+
+    def rate_arrays_micro(self, ids):
+        """
+        (CPV, CPS) in int64 micro-rupees for the given IDs. Missing rates
+        stay NaN until then, so IDs without both rates raise KeyError
+        (see ids_for) instead of pricing at zero.
+        """
+        import numpy as np
+
+        ids = self.ids_for(ids)
+        return tuple(np.rint(r[ids] * MICRO).astype(np.int64) for r in self.rate_arrays())
+
+
+# ---------- Targeting quotes ----------
+
+TARGETING_MODES = ("worldwide", "custom", "even")
+
+
+class Quote:
+    """
+    One priced targeting request. `lines` holds (label, views, subs, cpv,
+    cps) per country; breakdown strings are rendered on demand unless
+    already rendered ones are passed in. The total is kept exactly in
+    micro-rupees (internal_micro).
+    """
+
+    def __init__(self, mode: str, lines: list[tuple[str, int, int, float, float]],
+                 breakdown: list[str] = None):
+        self.mode = mode
+        self.lines = lines
+        self._breakdown = breakdown
+        self.total_views = 0
+        self.internal_micro = 0
+        for _, views, subs, cpv, cps in lines:
+            self.internal_micro += views * to_micro(cpv) + subs * to_micro(cps)
+            self.total_views += views
+        self.internal_inr = self.internal_micro / MICRO
+
+    @timed("Quote.breakdown")
+    def breakdown(self) -> list[str]:
+        if self._breakdown is not None:
+            return self._breakdown
+        return [text for line in self.lines for text in breakdown_lines(*line)]
+
+    def price(self, markup_percent: float):
+        """calculate_cost for this quote: (internal INR, internal USD, client INR, client USD)."""
+        internal, internal_usd, client, client_usd = price_micro(self.internal_micro, markup_percent)
+        return internal / PAISE, internal_usd / PAISE, client / PAISE, client_usd / PAISE
+
+    def to_dict(self, markup_percent: float = None) -> dict:
+        out = {
+            "mode": self.mode,
+            "lines": [{"country": label, "views": v, "subs": s, "cpv_inr": cpv, "cps_inr": cps}
+                      for label, v, s, cpv, cps in self.lines],
+            "breakdown": self.breakdown(),
+            "total_views": self.total_views,
+            "internal_inr": price_micro(self.internal_micro, 0)[0] / PAISE,
+        }
+        if markup_percent is not None:
+            internal_inr, internal_usd, client_inr, client_usd = self.price(markup_percent)
+            out.update(markup=markup_percent, internal_usd=internal_usd,
+                       client_inr=client_inr, client_usd=client_usd)
+        return out
+
+
+def targeting_mode(targeting: str) -> str:
+    """'worldwide', 'custom' (country:views list) or 'even' (country list)."""
+    targeting = targeting.strip().casefold()
+    if targeting == WORLDWIDE:
+        return "worldwide"
+    return "custom" if ":" in targeting else "even"
+
+
+def parse_splits(targeting: str) -> list[tuple[str, int]]:
+    """Parse 'country:views, country:views' into (country, views) pairs."""
+    parts = [p.strip() for p in targeting.split(",") if p.strip()]
+    if not parts:
+        raise ValueError("No countries provided.")
+    entries = []
+    for entry in parts:
+        if ":" not in entry:
+            raise ValueError(f"Invalid format: '{entry}'. Use country:views")
+        country_raw, view_str = entry.split(":", 1)
+        try:
+            views = int(view_str.strip())
+        except ValueError:
+            raise ValueError(f"Invalid view count for '{country_raw}'.") from None
+        if views < 0:
+            raise ValueError(f"View count for '{country_raw.strip()}' cannot be negative.")
+        entries.append((country_raw.strip(), views))
+    return entries
+
+
+def _country_rates(card: RateCard, country: str, strict: bool) -> tuple[float, float]:
+    cid = card.id(country)
+    if card.complete(cid):
+        return card.cpv[cid], card.cps[cid]
+    if strict:
+        count("rate_card.lookup_miss")
+        raise KeyError(card.missing_message(country))
+    return card.rates(country)
+
+
+def _label(card: RateCard, country: str) -> str:
+    """Breakdown label: the export's name for resolved aliases ('USA' → 'United States')."""
+    cid = card.id(country)
+    return card.names[cid].title() if cid >= 0 else country.title()
+
+
+@timed()
+def quote_worldwide(views: int, total_subs: int) -> Quote:
+    return Quote("worldwide", [("Worldwide", views, total_subs, WORLDWIDE_CPV_INR, WORLDWIDE_CPS_INR)])
+
+
+@timed()
+def quote_custom(card: RateCard, entries: list[tuple[str, int]], total_subs: int, strict: bool = True) -> Quote:
+    """
+    Custom country:views split; subscribers are allocated in proportion to
+    views. strict=False prices unknown countries at the default rates
+    instead of raising KeyError.
+    """
+    rates = [_country_rates(card, country, strict) for country, _ in entries]
+    subs = allocate_subs(total_subs, [v for _, v in entries])
+    return Quote("custom", [(_label(card, country), v, s, cpv, cps)
+                            for (country, v), s, (cpv, cps) in zip(entries, subs, rates)])
+
+
+@timed()
+def quote_even(card: RateCard, countries: list[str], total_views: int, total_subs: int,
+               strict: bool = True) -> Quote:
+    """Views and subscribers split evenly across the listed countries."""
+    if not countries:
+        raise ValueError("No countries provided.")
+    rates = [_country_rates(card, country, strict) for country in countries]
+    n = len(countries)
+    return Quote("even", [(_label(card, country), v, s, cpv, cps)
+                          for country, v, s, (cpv, cps) in
+                          zip(countries, split_even(total_views, n), split_even(total_subs, n), rates)])
+
+
+@timed()
+def quote_targeting(card: RateCard, targeting: str, total_subs: int, total_views: int = None,
+                    strict: bool = True) -> Quote:
+    """
+    Price a targeting string as the CLI accepts it: 'worldwide', a
+    'country:views' split, or a plain country list split evenly.
+    total_views is required for worldwide and even splits. Raises
+    ValueError (or KeyError for unknown countries) on bad input.
+    """
+    mode = targeting_mode(targeting)
+    if mode == "custom":
+        return quote_custom(card, parse_splits(targeting), total_subs, strict)
+    if total_views is None:
+        raise ValueError("Total views are required for worldwide and even-split targeting.")
+    if mode == "worldwide":
+        return quote_worldwide(total_views, total_subs)
+    countries = [c.strip() for c in targeting.split(",") if c.strip()]
+    return quote_even(card, countries, total_views, total_subs, strict)
+
+
+def quote_request(card: RateCard, req: dict, default_markup: float = DEFAULT_MARKUP) -> dict:
+    """
+    Price one JSON quote request, {"targeting", "subs", "views", "markup"},
+    as Quote.to_dict(markup). Raises ValueError (or KeyError) on bad input,
+    including negative counts and a markup outside 0..MAX_MARKUP %.
+    """
+    if not isinstance(req, dict):
+        raise ValueError("Each quote must be a JSON object.")
+    try:
+        targeting = str(req["targeting"])
+        subs = int(req.get("subs", 0))
+        views = None if req.get("views") is None else int(req["views"])
+        markup = float(req.get("markup", default_markup))
+    except KeyError:
+        raise ValueError("Missing 'targeting'.") from None
+    except (TypeError, ValueError):
+        raise ValueError("'subs', 'views' and 'markup' must be numbers.") from None
+    if subs < 0 or (views is not None and views < 0):
+        raise ValueError("'subs' and 'views' cannot be negative.")
+    if not 0 <= markup <= MAX_MARKUP:
+        raise ValueError(f"'markup' must be between 0 and {MAX_MARKUP}%.")
+    return quote_targeting(card, targeting, subs, views).to_dict(markup)
+
+
+def quote_request_or_error(card: RateCard, req, default_markup: float = DEFAULT_MARKUP) -> dict:
+    """quote_request, with bad input reported as {"error": message}."""
+    try:
+        return quote_request(card, req, default_markup)
+    except KeyError as e:
+        return {"error": e.args[0]}
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+# ---------- Batch quoting ----------
+
+class BatchQuote:
+    """
+    Result of quote_batch. Totals are NumPy arrays with one entry per quote;
+    per-line breakdown strings are only rendered by breakdown().
+    """
+
+    def __init__(self, card, ids, views, subs, quote_ids, markup,
+                 internal_inr, internal_usd, client_inr, client_usd):
+        self.card = card
+        self.ids = ids
+        self.views = views
+        self.subs = subs
+        self.quote_ids = quote_ids
+        self.markup = markup
+        self.internal_inr = internal_inr
+        self.internal_usd = internal_usd
+        self.client_inr = client_inr
+        self.client_usd = client_usd
+
+    def __len__(self):
+        return len(self.internal_inr)
+
+    def breakdown(self, quote: int) -> list[str]:
+        """Render the breakdown lines for a single quote, in input order."""
+        import numpy as np
+
+        lines = []
+        for i in np.flatnonzero(self.quote_ids == quote).tolist():
+            cid = int(self.ids[i])
+            lines += breakdown_lines(self.card.names[cid].title(), int(self.views[i]),
+                                     int(self.subs[i]), self.card.cpv[cid], self.card.cps[cid])
+        return lines
+
+
+@timed()
+def quote_batch(card: RateCard, keys, views, subs, markup=0.0, quote_ids=None) -> BatchQuote:
+    """
+    Price many country:views:subs lines in one vectorized pass.
+
+    keys (country names or RateCard IDs), views and subs are equal-length
+    columns, one row per line. quote_ids optionally groups lines into
+    quotes (integers 0..n-1); by default every line is its own quote.
+    markup is a scalar or one percentage per quote. Lines and totals are
+    summed in int64 micro-rupees and rounded once, like calculate_cost.
+    """
+    import numpy as np
+
+    views = np.asarray(views, dtype=np.int64)
+    subs = np.asarray(subs, dtype=np.int64)
+    if not (len(keys) == len(views) == len(subs)):
+        raise ValueError("keys, views and subs must have the same length.")
+    ids = card.ids_for(keys)
+
+    cpv, cps = card.rate_arrays_micro(ids)
+    line_micro = views * cpv + subs * cps
+
+    if quote_ids is None:
+        quote_ids = np.arange(len(ids))
+        total_micro = line_micro
+    else:
+        quote_ids = np.asarray(quote_ids, dtype=np.int64)
+        total_micro = np.zeros(int(quote_ids.max()) + 1 if len(quote_ids) else 0, dtype=np.int64)
+        np.add.at(total_micro, quote_ids, line_micro)
+
+    markup = np.broadcast_to(np.asarray(markup, dtype=np.float64), total_micro.shape)
+    num = 10_000 + np.rint(markup * 100).astype(np.int64)  # 1 + markup%, over 10_000
+    return BatchQuote(
+        card, ids, views, subs, quote_ids, markup,
+        _mul_div_round(total_micro, 1, _MICRO_PER_PAISA) / PAISE,
+        _mul_div_round(total_micro, 1, _MICRO_PER_PAISA * INR_PER_USD) / PAISE,
+        _mul_div_round(total_micro, num, 10_000 * _MICRO_PER_PAISA) / PAISE,
+        _mul_div_round(total_micro, num, 10_000 * _MICRO_PER_PAISA * INR_PER_USD) / PAISE,
+    )
@@ -0,0 +1,390 @@
+"""
+Append-only quote ledger (SQLite).
+
+Every quote priced by the CLI, the app or the service is recorded with its
+inputs, the rate card it was priced against and its outputs, so a quote
+can be re-opened for an audit or a repeat customer instead of rebuilt:
+
+    quotes           one row per quote; `record` is Quote.to_dict(markup)
+                     without the breakdown strings (re-rendered on read)
+    quote_countries  one row per country line, for country lookups
+
+Rows are never updated or deleted (triggers reject both). Indexes on
+(customer, created_at), (country, created_at) and created_at keep
+"all United States quotes last month" an index range scan at millions of
+rows, and a quote is re-opened by its integer ID.
+
+Writes are off the request path: record() queues the row and returns a
+Future for its ID at once. A writer thread commits whatever queues up
+within BATCH_WAIT in one transaction (group commit), so a burst of quotes
+costs one fsync. The file is opened by the writer on the first write; if it
+cannot be (read-only data/, bad path) the ledger warns once on stderr and
+stops recording, and every quote's Future fails with that error.
+
+    python quote_ledger.py show 123
+    python quote_ledger.py find --country USA --since 2026-09-01 --until 2026-09-30
+    python quote_ledger.py find --customer "Acme Media"
+"""
+import argparse
+from concurrent.futures import Future
+import datetime as dt
+from functools import lru_cache
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from pricing_engine import RateCard, breakdown_lines
+from rate_snapshot import CPS_FILE, CPV_FILE
+
+BATCH_ROWS = 5_000  # most quotes committed in one transaction
+BATCH_WAIT = 0.05  # seconds the writer waits for a batch to fill
+RESULT_TIMEOUT = 10.0  # seconds a caller waits for a quote's ID before giving up
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    customer TEXT,
+    source TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    targeting TEXT,
+    subs INTEGER,
+    views INTEGER,
+    markup REAL,
+    rate_card TEXT NOT NULL,
+    total_views INTEGER NOT NULL,
+    internal_inr REAL NOT NULL,
+    client_inr REAL,
+    client_usd REAL,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS quote_countries (
+    quote_id INTEGER NOT NULL REFERENCES quotes(id),
+    country TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    views INTEGER NOT NULL,
+    subs INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quotes_created ON quotes(created_at);
+CREATE INDEX IF NOT EXISTS quotes_customer ON quotes(customer, created_at);
+CREATE INDEX IF NOT EXISTS quote_countries_country ON quote_countries(country, created_at, quote_id);
+CREATE INDEX IF NOT EXISTS quote_countries_quote ON quote_countries(quote_id);
+CREATE TRIGGER IF NOT EXISTS quotes_no_update BEFORE UPDATE ON quotes
+    BEGIN SELECT RAISE(ABORT, 'the quote ledger is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS quotes_no_delete BEFORE DELETE ON quotes
+    BEGIN SELECT RAISE(ABORT, 'the quote ledger is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS quote_countries_no_update BEFORE UPDATE ON quote_countries
+    BEGIN SELECT RAISE(ABORT, 'the quote ledger is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS quote_countries_no_delete BEFORE DELETE ON quote_countries
+    BEGIN SELECT RAISE(ABORT, 'the quote ledger is append-only'); END;
+"""
+
+_COLUMNS = ("created_at", "customer", "source", "mode", "targeting", "subs", "views", "markup",
+            "rate_card", "total_views", "internal_inr", "client_inr", "client_usd", "record")
+_INSERT_QUOTE_WITH_ID = f"INSERT INTO quotes (id, {', '.join(_COLUMNS)}) VALUES (?{', ?' * len(_COLUMNS)})"
+_INSERT_COUNTRY = "INSERT INTO quote_countries (quote_id, country, created_at, views, subs) VALUES (?, ?, ?, ?, ?)"
+
+
+def default_ledger_path(cpv_file: str = CPV_FILE) -> str:
+    """The ledger lives next to the CPV export by default."""
+    return os.path.join(os.path.dirname(os.path.abspath(cpv_file)), "quotes.ledger")
+
+
+@lru_cache(maxsize=8)
+def rate_card_version(card) -> str:
+    """Short content hash of a RateCard's names and rates."""
+    digest = hashlib.sha256("\n".join(card.names).encode())
+    digest.update(bytes(card.cpv))
+    digest.update(bytes(card.cps))
+    return digest.hexdigest()[:16]
+
+
+def ledger_entry(record: dict, request: dict = None, customer: str = None, source: str = "",
+                 rate_card: str = "", created_at: str = None) -> tuple:
+    """
+    A ledger row for one priced quote: `record` is Quote.to_dict(markup),
+    `request` the inputs it was priced from. Plain tuples, so batch
+    workers can build entries and the writer only inserts them.
+    """
+    request = request or {}
+    created_at = created_at or dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds")
+    countries: dict[str, list[int]] = {}
+    for line in record["lines"]:
+        totals = countries.setdefault(line["country"].casefold(), [0, 0])
+        totals[0] += line["views"]
+        totals[1] += line["subs"]
+    row = (created_at, customer or None, source, record["mode"], request.get("targeting"),
+           request.get("subs"), request.get("views"), record.get("markup"), rate_card,
+           record["total_views"], record["internal_inr"], record.get("client_inr"),
+           record.get("client_usd"),
+           json.dumps({k: v for k, v in record.items() if k != "breakdown"},
+                      ensure_ascii=False, separators=(",", ":")))
+    return row, [(c, v, s) for c, (v, s) in countries.items()]
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class QuoteLedger:
+    """
+    The ledger file plus its writer thread. Safe to share between threads
+    (one instance per process is enough); other processes may write the
+    same file concurrently.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or default_ledger_path()
+        self.unavailable: Exception | None = None  # set if the file could not be opened for writing
+        self.error: Exception | None = None  # first failed commit, re-raised by close()
+        self.lost = 0  # quotes in failed commits
+        # bounded, so a writer that falls behind slows producers down
+        self._queue: queue.Queue = queue.Queue(maxsize=4 * BATCH_ROWS)
+        self._writer = None
+        self._lock = threading.Lock()
+
+    # ---------- Writes ----------
+
+    def record(self, record: dict, request: dict = None, customer: str = None, source: str = "",
+               rate_card: str = "", block: bool = True) -> Future:
+        """Queue a priced quote; the Future resolves to its ledger ID once committed."""
+        return self.append(ledger_entry(record, request, customer, source, rate_card), block)
+
+    def append(self, entry: tuple, block: bool = True) -> Future:
+        """
+        Queue a ledger_entry() tuple. With block=False a full queue raises
+        queue.Full instead of waiting for the writer (for event loops).
+        """
+        future = Future()
+        if self.unavailable is not None:
+            future.set_exception(self.unavailable)
+            return future
+        self._start()
+        self._queue.put((entry, future), block)
+        return future
+
+    def flush(self):
+        """Block until everything queued so far is committed."""
+        if self._writer is not None:
+            done = Future()
+            self._queue.put((None, done))
+            done.result()
+
+    def close(self):
+        """
+        Commit what is queued and stop the writer thread. Re-raises the
+        first commit error, so a caller that never waited on its futures
+        still learns that quotes were lost (`lost` says how many).
+        """
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+        if self.error is not None:
+            raise self.error
+
+    def _start(self):
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="quote-ledger", daemon=True)
+                    self._writer.start()
+
+    def _write_loop(self):
+        conn = None
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + BATCH_WAIT
+            while len(batch) < BATCH_ROWS and batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            if None in batch:
+                stop = True
+            items = [item for item in batch if item is not None]
+            if conn is None and self.unavailable is None:
+                conn = self._open()
+            if conn is None:
+                for entry, future in items:
+                    if entry is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(self.unavailable)
+                continue
+            try:
+                ids = self._insert(conn, [entry for entry, _ in items if entry is not None])
+            except Exception as e:  # fail this batch, never the writer: callers wait on these futures
+                if self.error is None:
+                    self.error = e
+                self.lost += sum(entry is not None for entry, _ in items)
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for entry, future in items:
+                future.set_result(next(ids) if entry is not None else None)
+        if conn is not None:
+            conn.close()
+
+    def _open(self) -> sqlite3.Connection | None:
+        """The writer's connection, or None (warning once) if the file cannot be written."""
+        try:
+            conn = _connect(self.path)
+            try:
+                conn.executescript(_SCHEMA)
+            except sqlite3.Error:
+                conn.close()
+                raise
+            return conn
+        except (sqlite3.Error, OSError) as e:
+            self.unavailable = e
+            print(f"⚠️ Quote ledger {self.path} is unavailable ({e}); quotes will not be recorded.",
+                  file=sys.stderr)
+            return None
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, entries: list[tuple]):
+        """Insert a batch in one transaction; returns an iterator over the new IDs."""
+        if not entries:
+            return iter(())
+        with conn:
+            # IMMEDIATE takes the write lock, so the IDs can be assigned up front
+            conn.execute("BEGIN IMMEDIATE")
+            first = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM quotes").fetchone()[0]
+            conn.executemany(_INSERT_QUOTE_WITH_ID, [(first + i, *row) for i, (row, _) in enumerate(entries)])
+            conn.executemany(_INSERT_COUNTRY, [(first + i, c, row[0], v, s)
+                                               for i, (row, countries) in enumerate(entries)
+                                               for c, v, s in countries])
+        return iter(range(first, first + len(entries)))
+
+    # ---------- Lookups ----------
+
+    def get(self, quote_id: int) -> dict | None:
+        """A quote's ledger row (with `record` decoded), or None."""
+        rows = self._select("SELECT * FROM quotes WHERE id = ?", (quote_id,))
+        return rows[0] if rows else None
+
+    def find(self, customer: str = None, country: str = None, since: dt.date = None,
+             until: dt.date = None, limit: int = 100) -> list[dict]:
+        """
+        Newest-first quotes matching every given filter. `country` is a
+        casefolded rate-card name; since/until are inclusive dates (UTC).
+        """
+        where, params = [], []
+        if country is not None:
+            table = "quote_countries c JOIN quotes q ON q.id = c.quote_id"
+            where.append("c.country = ?")
+            params.append(country.strip().casefold())
+            created, order = "c.created_at", "c.created_at DESC, c.quote_id DESC"
+        else:
+            table, created, order = "quotes q", "q.created_at", "q.created_at DESC, q.id DESC"
+        if customer is not None:
+            where.append("q.customer = ?")
+            params.append(customer)
+        if since is not None:
+            where.append(f"{created} >= ?")
+            params.append(since.isoformat())
+        if until is not None:
+            where.append(f"{created} < ?")
+            params.append((until + dt.timedelta(days=1)).isoformat())
+        sql = (f"SELECT q.* FROM {table}" + (" WHERE " + " AND ".join(where) if where else "")
+               + f" ORDER BY {order} LIMIT ?")
+        return self._select(sql, (*params, limit))
+
+    def __len__(self):
+        if not os.path.exists(self.path):
+            return 0  # nothing written yet
+        conn = _connect(self.path)
+        try:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM quotes").fetchone()[0]
+        finally:
+            conn.close()
+
+    def _select(self, sql: str, params: tuple) -> list[dict]:
+        if not os.path.exists(self.path):
+            return []  # nothing written yet
+        conn = _connect(self.path)
+        try:
+            conn.row_factory = sqlite3.Row
+            rows = [dict(r) for r in conn.execute(sql, params)]
+        finally:
+            conn.close()
+        for row in rows:
+            record = row["record"] = json.loads(row["record"])
+            record["breakdown"] = [text for line in record["lines"] for text in breakdown_lines(
+                line["country"], line["views"], line["subs"], line["cpv_inr"], line["cps_inr"])]
+        return rows
+
+
+def _resolve_country(name: str) -> str:
+    """Canonical rate-card name for an alias ('USA' → 'united states') when the exports are at hand."""
+    try:
+        card = RateCard.from_files(CPV_FILE, CPS_FILE)
+    except (OSError, ValueError):
+        return name.strip().casefold()
+    cid = card.id(name)
+    return card.names[cid] if cid >= 0 else name.strip().casefold()
+
+
+def _print_quote(row: dict):
+    record = row["record"]
+    customer = f" for {row['customer']}" if row["customer"] else ""
+    print(f"🗂️ Quote #{row['id']}{customer}, {row['created_at']} ({row['source']}, rates {row['rate_card']})")
+    if row["targeting"]:
+        print(f"  Targeting: {row['targeting']}")
+    for line in record["breakdown"]:
+        print("  -", line)
+    print(f"  Internal cost: ₹{record['internal_inr']:.2f}")
+    if record.get("client_inr") is not None:
+        print(f"  Offer at {record['markup']:g}% markup: ₹{record['client_inr']} / ${record['client_usd']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up recorded quotes.")
+    parser.add_argument("--ledger", help="ledger file (default: next to the CPV export)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="re-open one quote")
+    show.add_argument("quote_id", type=int)
+    find = sub.add_parser("find", help="list quotes, newest first")
+    find.add_argument("--customer")
+    find.add_argument("--country", help="country name, code or alias")
+    find.add_argument("--since", type=dt.date.fromisoformat)
+    find.add_argument("--until", type=dt.date.fromisoformat)
+    find.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    path = args.ledger or default_ledger_path()
+    if not os.path.exists(path):
+        print(f"❌ No ledger at {path}.")
+        sys.exit(1)
+    ledger = QuoteLedger(path)
+
+    if args.command == "show":
+        row = ledger.get(args.quote_id)
+        if row is None:
+            print(f"❌ No quote #{args.quote_id}.")
+            sys.exit(1)
+        _print_quote(row)
+        return
+
+    country = _resolve_country(args.country) if args.country else None
+    rows = ledger.find(args.customer, country, args.since, args.until, args.limit)
+    for row in rows:
+        countries = ", ".join(line["country"] for line in row["record"]["lines"])
+        price = f"${row['client_usd']}" if row["client_usd"] is not None else f"₹{row['internal_inr']:.2f}"
+        print(f"#{row['id']:<8} {row['created_at']}  {row['customer'] or '-':<20} {price:>12}  {countries}")
+    print(f"{len(rows)} quote(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Memoized calculations for the Streamlit app.
+
+Streamlit re-executes main.py on every rerun, so caches must live in an
+imported module to survive. Each function here is a bounded LRU keyed on
+its input tuple. Results that depend on the whole card (country lists,
+the value table) are keyed on the RateCard's identity: a reload produces a
+new card, so they are never reused and simply age out of the LRU.
+
+Quotes, budget splits and optimizations depend only on the rates of the
+countries they name. Given the IncrementalRateCard the card came from,
+they are keyed on those countries' version in it (CardKey) instead, so
+they survive reloads that changed other countries' rates.
+"""
+from functools import lru_cache
+
+from budget_optimizer import SUBS_RATIO, BudgetAllocation, optimize_budget
+from instrumentation import track_cache
+from pricing_engine import (
+    Quote,
+    RateCard,
+    calculate_cost,
+    quote_custom,
+    quote_even,
+    quote_worldwide,
+)
+from value_table import ValueTable
+
+
+class CardKey:
+    """
+    A RateCard that hashes and compares by `version` instead of identity,
+    for the LRUs below; results priced from it are shared by every card
+    with the same version.
+    """
+
+    __slots__ = ("card", "version")
+
+    def __init__(self, card: RateCard, version):
+        self.card = card
+        self.version = version
+
+    def __hash__(self):
+        return hash(self.version)
+
+    def __eq__(self, other):
+        return isinstance(other, CardKey) and self.version == other.version
+
+
+def card_key(card: RateCard, countries, source=None) -> CardKey:
+    """
+    The cache key for results that depend only on `countries`' rates: their
+    version in `source` (an IncrementalRateCard) while `card` is its current
+    card, else the card itself (identity).
+    """
+    if source is not None:
+        names = [card.names[cid] if cid >= 0 else str(c) for c in countries for cid in (card.id(str(c)),)]
+        version = source.version_of(names)
+        # read after the version: a reload in between replaces source.card first
+        if card is source.card:
+            return CardKey(card, ("rates", version))
+    return CardKey(card, card)
+
+
+@lru_cache(maxsize=8)
+def country_keys(card: RateCard) -> tuple[str, ...]:
+    """Sorted casefolded country keys for multiselects."""
+    return tuple(card.country_names())
+
+
+@lru_cache(maxsize=8)
+def country_titles(card: RateCard) -> tuple[str, ...]:
+    """Sorted title-cased country names for multiselects."""
+    return tuple(sorted(c.title() for c in card.country_names()))
+
+
+@lru_cache(maxsize=8)
+def priced_titles(card: RateCard) -> tuple[str, ...]:
+    """country_titles() with both a CPV and a CPS on the card."""
+    return tuple(c for c in country_titles(card) if card.complete(card.id(c)))
+
+
+@lru_cache(maxsize=256)
+def parse_view_splits(text: str) -> tuple[tuple[str, int], ...] | None:
+    """'India:5000, USA:2000' → (('India', 5000), ('USA', 2000)); None if malformed."""
+    try:
+        parts = [p.strip() for p in text.split(",") if ":" in p]
+        return tuple((c.strip(), int(v)) for c, v in (p.split(":", 1) for p in parts))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=256)
+def parse_percent_splits(text: str) -> tuple[tuple[str, float], ...] | None:
+    """'India:60, USA:40' → (('India', 60.0), ('USA', 40.0)); None if malformed."""
+    try:
+        parts = [p.strip() for p in text.split(",") if ":" in p]
+        return tuple((c.strip(), float(v)) for c, v in (p.split(":", 1) for p in parts))
+    except ValueError:
+        return None
+
+
+def quote(card: RateCard, mode: str, spec: tuple, views: int, subs: int, source=None) -> Quote:
+    """
+    The app's quote for one input tuple. spec is the (country, views)
+    entries for 'custom', the selected countries for 'even', and ignored
+    for 'worldwide'. Aliases resolve ('USA'); an unknown country raises
+    KeyError with suggestions instead of pricing at the default rates.
+    Treat the returned Quote as read-only; it is shared.
+    """
+    countries = [c for c, _ in spec] if mode == "custom" else spec if mode == "even" else ()
+    return _quote(card_key(card, countries, source), mode, spec, views, subs)
+
+
+@lru_cache(maxsize=1024)
+def _quote(key: CardKey, mode: str, spec: tuple, views: int, subs: int) -> Quote:
+    if mode == "worldwide":
+        return quote_worldwide(views, subs)
+    if mode == "custom":
+        return quote_custom(key.card, list(spec), subs)
+    return quote_even(key.card, list(spec), views, subs)
+
+
+@lru_cache(maxsize=1024)
+def unknown_countries(card: RateCard, countries: tuple[str, ...]) -> tuple[str, ...]:
+    """'x' (did you mean ...?) messages for countries the card cannot resolve."""
+    return tuple(card.missing_message(c) for c in countries if card.id(c) < 0)
+
+
+@lru_cache(maxsize=4096)
+def price(internal_inr: float, markup: float) -> tuple:
+    return calculate_cost(internal_inr, markup)
+
+
+def budget_split(card: RateCard, inr_budget: float, shares: tuple[tuple[str, float], ...],
+                 source=None) -> tuple[tuple[str, int, int, float], ...]:
+    """
+    Views and subs each country gets from its share of the budget, buying
+    views plus 5% subs: (country, views, subs, budget INR); views are -1
+    when the rates are invalid.
+    """
+    return _budget_split(card_key(card, [c for c, _ in shares], source), inr_budget, shares)
+
+
+@lru_cache(maxsize=1024)
+def _budget_split(key: CardKey, inr_budget: float, shares: tuple[tuple[str, float], ...]):
+    table = value_table(key.card)
+    total = sum(share for _, share in shares)
+    rows = []
+    for country, share in shares:
+        country_budget = inr_budget * (share / total)
+        unit = table.unit(country)
+        if unit > 0:
+            views = int(country_budget / unit)
+            rows.append((country, views, int(SUBS_RATIO * views), country_budget))
+        else:
+            rows.append((country, -1, -1, country_budget))
+    return tuple(rows)
+
+
+@lru_cache(maxsize=8)
+def value_table(card: RateCard) -> ValueTable:
+    """The card's countries ranked by bundle cost per view, built once per card."""
+    return ValueTable(card)
+
+
+def optimize(card: RateCard, inr_budget: float, countries: tuple[str, ...], objective: str,
+             min_views: tuple[tuple[str, int], ...], max_views: tuple[tuple[str, int], ...],
+             source=None) -> BudgetAllocation:
+    return _optimize(card_key(card, countries, source), inr_budget, countries, objective, min_views, max_views)
+
+
+@lru_cache(maxsize=256)
+def _optimize(key: CardKey, inr_budget: float, countries: tuple[str, ...], objective: str,
+              min_views: tuple[tuple[str, int], ...], max_views: tuple[tuple[str, int], ...]) -> BudgetAllocation:
+    return optimize_budget(key.card, inr_budget, list(countries), objective=objective,
+                           min_views=dict(min_views), max_views=dict(max_views))
+
+
+for _fn in (country_keys, country_titles, priced_titles, parse_view_splits, parse_percent_splits,
+            unknown_countries, price, value_table):
+    track_cache(f"quote_memo.{_fn.__name__}", _fn)
+for _name, _fn in (("quote", _quote), ("budget_split", _budget_split), ("optimize", _optimize)):
+    track_cache(f"quote_memo.{_name}", _fn)
@@ -0,0 +1,298 @@
+"""
+Local quoting service: HTTP/JSON over stdlib asyncio.
+
+Endpoints
+    GET  /health        service status and rate-card version
+    POST /quote         {"targeting": "india:5000, united states:2000",
+                         "subs": 300, "views": null, "markup": 50}
+    POST /quote/batch   {"quotes": [<quote request>, ...]}
+    POST /quote/lines   {"lines": [{"location": "USA", "ad_type": "Generic",
+                         "metric": "cpm", "quantity": 100000}, ...], "markup": 50}
+                        mixed CPM/CPV/CPS lines priced from rate_index
+    POST /reload        reload the CSVs now
+    GET  /changes?since=N   countries whose rates changed after version N
+    GET  /metrics       Prometheus text (JSON with ?format=json); needs
+                        ADCALC_METRICS=1, see instrumentation.py
+
+Priced quotes from /quote and /quote/batch are recorded in the quote
+ledger (quote_ledger.py; a request may carry a "customer"), off the
+request path. If the ledger's queue is full, the quote is refused with
+503 (a per-quote error in a batch) rather than priced unrecorded.
+
+The rate card stays resident. A reload diffs the CSVs off the event loop
+(rate_reload.IncrementalRateCard reparses only changed rows) and then
+swaps a single (card, version) reference, so every request prices against
+one complete card, never a half-loaded one. The CSVs are also polled and
+reloaded automatically when they change.
+
+    python quote_service.py [--host 127.0.0.1] [--port 8765]
+"""
+import argparse
+import asyncio
+import json
+import queue
+import signal
+from urllib.parse import parse_qsl
+
+import instrumentation
+from pricing_engine import DEFAULT_MARKUP, RateCard, calculate_cost, quote_request_or_error
+from quote_ledger import QuoteLedger, default_ledger_path, rate_card_version
+from rate_index import COSTING_FILE, LAYERS, RateIndex, load_costing
+from rate_reload import IncrementalRateCard
+from rate_snapshot import CPS_FILE, CPV_FILE
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+LEDGER_BUSY = "The quote ledger is busy; retry shortly."
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class RateCardHolder:
+    """The live rate card; `current` is replaced atomically on reload."""
+
+    def __init__(self, cpv_file: str, cps_file: str):
+        self.source = IncrementalRateCard(cpv_file, cps_file)
+        self.current = (self.source.card, self.source.version)
+
+    async def reload(self) -> int:
+        """Diff the CSVs in a worker thread, then swap in the patched card."""
+        update = await asyncio.to_thread(self.source.refresh)
+        if update is not None:
+            self.current = (self.source.card, self.source.version)
+            print(f"🔄 Rate card v{update.version}: {len(update.changed)} countries changed")
+        return self.current[1]
+
+    async def watch(self, interval: float):
+        """Reload whenever either CSV's size or mtime changes."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except (OSError, ValueError) as e:
+                print(f"❌ Rate card reload failed: {e}")
+
+
+def _price_lines(index: RateIndex, req, markup_default: float = DEFAULT_MARKUP) -> dict:
+    lines = req.get("lines") if isinstance(req, dict) else None
+    if not isinstance(lines, list) or not all(isinstance(line, dict) for line in lines):
+        raise ValueError("Body must be {\"lines\": [{\"location\", \"metric\", \"quantity\"}, ...]}.")
+    try:
+        locations = [str(line["location"]) for line in lines]
+        metrics = [str(line["metric"]).strip().casefold() for line in lines]
+        quantities = [float(line["quantity"]) for line in lines]
+        markup = float(req.get("markup", markup_default))
+    except KeyError as e:
+        raise ValueError(f"Each line needs 'location', 'metric' and 'quantity' (missing {e.args[0]!r}).") from None
+    except (TypeError, ValueError):
+        raise ValueError("'quantity' and 'markup' must be numbers.") from None
+    ad_types = [str(line.get("ad_type") or "Generic") for line in lines]
+
+    cost, rates, sources = index.price_lines(locations, ad_types, metrics, quantities)
+    internal_inr, internal_usd, client_inr, client_usd = calculate_cost(float(cost.sum()), markup)
+    return {
+        "lines": [{"location": loc, "ad_type": ad, "metric": m, "quantity": q,
+                   "rate_inr": r, "cost_inr": round(c, 2), "source": LAYERS[src]}
+                  for loc, ad, m, q, r, c, src in
+                  zip(locations, ad_types, metrics, quantities, rates.tolist(), cost.tolist(), sources.tolist())],
+        "internal_inr": internal_inr, "internal_usd": internal_usd,
+        "markup": markup, "client_inr": client_inr, "client_usd": client_usd,
+    }
+
+
+class QuoteService:
+    def __init__(self, holder: RateCardHolder, costing_file: str = COSTING_FILE, ledger: QuoteLedger = None):
+        self.holder = holder
+        self.ledger = ledger
+        self.costing_rows = load_costing(costing_file) if costing_file else []
+        self._index = (None, None)
+
+    def rate_index(self, card: RateCard) -> RateIndex:
+        """The composite index for this card, rebuilt after a reload."""
+        built_for, index = self._index
+        if built_for is not card:
+            index = RateIndex(card, self.costing_rows)
+            self._index = (card, index)
+        return index
+
+    async def route(self, method: str, path: str, body: bytes, query: dict = None) -> tuple[int, dict | str]:
+        query = query or {}
+        card, version = self.holder.current  # one card for the whole request
+        if path == "/health":
+            if method != "GET":
+                return 405, {"error": "Use GET."}
+            return 200, {"status": "ok", "rate_card_version": version, "countries": len(card)}
+        if path == "/changes":
+            if method != "GET":
+                return 405, {"error": "Use GET."}
+            try:
+                since = int(query.get("since", "0"))
+            except ValueError:
+                return 400, {"error": "'since' must be an integer."}
+            changed = self.holder.source.changed_since(since)
+            return 200, {"rate_card_version": version, "since": since,
+                         "changed": None if changed is None else sorted(changed)}
+        if path == "/metrics":
+            if method != "GET":
+                return 405, {"error": "Use GET."}
+            if query.get("format") == "json":
+                return 200, instrumentation.snapshot()
+            return 200, instrumentation.to_prometheus()
+        if path == "/reload":
+            if method != "POST":
+                return 405, {"error": "Use POST."}
+            return 200, {"rate_card_version": await self.holder.reload()}
+        if path not in ("/quote", "/quote/batch", "/quote/lines"):
+            return 404, {"error": f"Unknown path '{path}'."}
+        if method != "POST":
+            return 405, {"error": "Use POST."}
+
+        try:
+            req = json.loads(body or b"null")
+        except ValueError:
+            return 400, {"error": "Body must be JSON."}
+
+        if path == "/quote/lines":
+            try:
+                result = _price_lines(self.rate_index(card), req)
+            except KeyError as e:
+                return 400, {"error": e.args[0], "rate_card_version": version}
+            except ValueError as e:
+                return 400, {"error": str(e), "rate_card_version": version}
+            return 200, {**result, "rate_card_version": version}
+
+        if path == "/quote":
+            result = self._quote(card, req)
+            status = 503 if result.get("error") == LEDGER_BUSY else 400 if "error" in result else 200
+            return status, {**result, "rate_card_version": version}
+
+        quotes = req.get("quotes") if isinstance(req, dict) else None
+        if not isinstance(quotes, list):
+            return 400, {"error": "Body must be {\"quotes\": [...]}."}
+        return 200, {"results": [self._quote(card, q) for q in quotes], "rate_card_version": version}
+
+    def _quote(self, card: RateCard, req) -> dict:
+        result = quote_request_or_error(card, req)
+        if self.ledger is not None and "error" not in result:
+            # queued only; the ledger's writer thread commits it. Never wait on
+            # a full queue here: that would stall the event loop and every
+            # connection with it. The quote is refused instead (503 for /quote).
+            try:
+                self.ledger.record(result, req, req.get("customer"), "service", rate_card_version(card),
+                                   block=False)
+            except queue.Full:
+                instrumentation.count("quote_service.ledger_full")
+                return {"error": LEDGER_BUSY}
+        return result
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._send(writer, 400, {"error": "Malformed request line."}, close=True)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._send(writer, 400, {"error": "Invalid Content-Length."}, close=True)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._send(writer, 413, {"error": "Request body too large."}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    path, _, qs = target.partition("?")
+                    status, payload = await self.route(method.upper(), path, body, dict(parse_qsl(qs)))
+                except Exception as e:  # keep serving other requests
+                    status, payload = 500, {"error": f"Calculation error: {e}"}
+
+                close = (headers.get("connection", "").lower() == "close"
+                         or (version == "HTTP/1.0" and headers.get("connection", "").lower() != "keep-alive"))
+                await self._send(writer, status, payload, close)
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            pass  # idle keep-alive connection at shutdown; re-raising makes 3.11's stream callback log it
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, status: int, payload: dict | str, close: bool = False):
+        if isinstance(payload, str):  # Prometheus text
+            data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            data, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json"
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}; charset=utf-8\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+
+async def serve(host: str, port: int, cpv_file: str, cps_file: str, watch_interval: float = 2.0,
+                costing_file: str = COSTING_FILE, ledger_file: str = None):
+    holder = RateCardHolder(cpv_file, cps_file)
+    ledger = QuoteLedger(ledger_file) if ledger_file else None
+    service = QuoteService(holder, costing_file, ledger)
+    server = await asyncio.start_server(service.handle, host, port)
+    watcher = asyncio.create_task(holder.watch(watch_interval)) if watch_interval > 0 else None
+    print(f"✅ Quoting service on http://{host}:{port} ({len(holder.current[0])} countries)")
+    # SIGTERM (a supervisor or container stop) shuts down like Ctrl+C, so queued quotes are committed
+    stopping = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+    try:
+        async with server:
+            await stopping.wait()
+    finally:
+        if watcher:
+            watcher.cancel()
+        if ledger is not None:
+            try:
+                ledger.close()  # commits everything still queued
+            except Exception as e:
+                print(f"❌ {ledger.lost} quotes were not saved to the ledger: {e}")
+            else:
+                print(f"🗂️ Quote ledger closed ({ledger.path})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON quoting service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cpv", default=CPV_FILE, help="CPV export CSV")
+    parser.add_argument("--cps", default=CPS_FILE, help="CPS export CSV")
+    parser.add_argument("--costing", default=COSTING_FILE, help="per-location CPM/CPS sheet")
+    parser.add_argument("--watch", type=float, default=2.0,
+                        help="seconds between CSV change checks (0 disables)")
+    parser.add_argument("--ledger", help="quote ledger file (default: next to the CPV export)")
+    parser.add_argument("--no-ledger", action="store_true", help="do not record quotes")
+    args = parser.parse_args()
+    ledger_file = None if args.no_ledger else args.ledger or default_ledger_path(args.cpv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.cpv, args.cps, args.watch, args.costing, ledger_file))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Time-versioned rate-card store.
+
+Each export covers one reporting period ("1 March 2025 - 27 May 2025").
+Replacing the CSVs used to lose the old rates, so re-quoting an old deal
+gave a different number. A RateHistory keeps every appended export as a
+dated period in one columnar file:
+
+    magic (8s) | version (u32) | header length (u32) | JSON header | pad
+    CPV float64[countries × periods] | CPS float64[countries × periods]
+
+The header lists the periods (sorted by start date) and the sorted,
+casefolded countries. The matrices are country-major, so one country's
+history is a contiguous run. A country missing from a period is NaN.
+
+Lookups never touch the CSVs: rates(country, as_of) bisects the period
+starts and the country index, O(log n) each. trailing_rates() averages the
+periods overlapping the N months before a date, weighted by overlap days.
+
+    python rate_history.py append [cpv.csv cps.csv] [--start 2025-03-01 --end 2025-05-27]
+    python rate_history.py list
+    python rate_history.py query india 2025-04-15 [--trailing 3]
+"""
+from array import array
+import argparse
+import bisect
+import datetime as dt
+import json
+import math
+import os
+import re
+import struct
+import sys
+
+from rate_snapshot import CPS_FILE, CPV_FILE, _fingerprint
+
+MAGIC = b"RATEHIST"
+VERSION = 1
+_PREFIX = struct.Struct("<8sII")
+
+_PERIOD_RE = re.compile(r"(\d{1,2} [A-Za-z]+ \d{4})\s*-\s*(\d{1,2} [A-Za-z]+ \d{4})")
+
+
+def default_history_path(cpv_file: str = CPV_FILE) -> str:
+    """The history lives next to the CPV export by default."""
+    return os.path.join(os.path.dirname(os.path.abspath(cpv_file)), "rates.history")
+
+
+def export_period(filepath: str) -> tuple[dt.date, dt.date] | None:
+    """The 'D Month YYYY - D Month YYYY' period in an export's title rows, if any."""
+    with open(filepath, encoding="utf-8-sig") as f:
+        for _, line in zip(range(5), f):
+            match = _PERIOD_RE.search(line)
+            if match:
+                start, end = (dt.datetime.strptime(d, "%d %B %Y").date() for d in match.groups())
+                return start, end
+    return None
+
+
+def months_before(day: dt.date, months: int) -> dt.date:
+    """The same day-of-month `months` earlier, clamped to the month's length."""
+    y, m = divmod(day.year * 12 + day.month - 1 - months, 12)
+    m += 1
+    last = (dt.date(y + m // 12, m % 12 + 1, 1) - dt.timedelta(days=1)).day
+    return dt.date(y, m, min(day.day, last))
+
+
+class RateHistory:
+    """Dated rate-card periods with as-of and trailing-window lookups."""
+
+    def __init__(self, periods: list[dict], countries: list[str], cpv: array, cps: array):
+        self.periods = periods      # [{"start", "end", "label", "sources"}], sorted by start
+        self.countries = countries  # sorted, casefolded
+        self.cpv = cpv              # country-major: cpv[c * len(periods) + p]
+        self.cps = cps
+        self._starts = [dt.date.fromisoformat(p["start"]) for p in periods]
+        self._ends = [dt.date.fromisoformat(p["end"]) for p in periods]
+        self._cards = {}
+        self._aliases = None
+
+    @classmethod
+    def empty(cls) -> "RateHistory":
+        return cls([], [], array("d"), array("d"))
+
+    def __len__(self):
+        return len(self.periods)
+
+    # ---------- Lookups ----------
+
+    def country_index(self, country: str) -> int:
+        """Position of a country (name or alias, see country_aliases) in the index, or -1."""
+        key = country.strip().casefold()
+        i = bisect.bisect_left(self.countries, key)
+        if i < len(self.countries) and self.countries[i] == key:
+            return i
+        if self._aliases is None:
+            from country_aliases import CountryIndex
+
+            self._aliases = CountryIndex(self.countries)
+        return self._aliases.resolve(country) if key else -1
+
+    def period_at(self, as_of: dt.date) -> int:
+        """Index of the latest period starting on or before as_of, or -1."""
+        return bisect.bisect_right(self._starts, as_of) - 1
+
+    def rates(self, country: str, as_of: dt.date) -> tuple[float, float]:
+        """(CPV, CPS) in effect for a country on a date; NaN where unknown."""
+        p, c = self.period_at(as_of), self.country_index(country)
+        if p < 0 or c < 0:
+            return math.nan, math.nan
+        at = c * len(self.periods) + p
+        return self.cpv[at], self.cps[at]
+
+    def _window(self, as_of: dt.date, months: int) -> list[tuple[int, int]]:
+        """
+        (period, overlap days) for periods overlapping the N months up to
+        as_of. Walks back from period_at(as_of) and stops at the first period
+        ending before the window, so consecutive exports cost O(log n + k).
+        """
+        since = months_before(as_of, months)
+        out = []
+        for p in range(self.period_at(as_of), -1, -1):
+            if self._ends[p] < since:
+                break
+            overlap = (min(self._ends[p], as_of) - max(self._starts[p], since)).days + 1
+            if overlap > 0:
+                out.append((p, overlap))
+        return out
+
+    def trailing_rates(self, country: str, as_of: dt.date, months: int) -> tuple[float, float]:
+        """
+        Overlap-day weighted mean (CPV, CPS) of the periods within the N
+        months up to as_of. Periods missing the country are left out; NaN
+        if none remain.
+        """
+        c = self.country_index(country)
+        if c < 0:
+            return math.nan, math.nan
+        base = c * len(self.periods)
+        window = self._window(as_of, months)
+        means = []
+        for values in (self.cpv, self.cps):
+            total = weight = 0.0
+            for p, days in window:
+                v = values[base + p]
+                if v == v:
+                    total += v * days
+                    weight += days
+            means.append(total / weight if weight else math.nan)
+        return means[0], means[1]
+
+    def card(self, as_of: dt.date = None, trailing_months: int = 0):
+        """
+        A RateCard of the rates in effect on as_of (default: the latest
+        period), or of trailing averages when trailing_months > 0. Cached
+        per argument pair. Raises ValueError if no period covers the date.
+        """
+        from pricing_engine import RateCard
+
+        if not self.periods:
+            raise ValueError("The rate history is empty.")
+        as_of = as_of or self._ends[-1]
+        if self.period_at(as_of) < 0:
+            raise ValueError(f"No rates before {self.periods[0]['start']} (asked for {as_of}).")
+        key = (as_of, trailing_months) if trailing_months else self.period_at(as_of)
+        if key in self._cards:
+            return self._cards[key]
+        if trailing_months:
+            pairs = [self.trailing_rates(c, as_of, trailing_months) for c in self.countries]
+        else:
+            pairs = [self.rates(c, as_of) for c in self.countries]
+        cpv = {c: v for c, (v, _) in zip(self.countries, pairs) if v == v}
+        cps = {c: v for c, (_, v) in zip(self.countries, pairs) if v == v}
+        card = self._cards[key] = RateCard.from_lookups(cpv, cps)
+        return card
+
+    def labels(self) -> list[str]:
+        return [p["label"] for p in self.periods]
+
+    # ---------- Appending ----------
+
+    def with_period(self, start: dt.date, end: dt.date, cpv_lookup: dict[str, float],
+                    cps_lookup: dict[str, float], label: str = None, sources: dict = None) -> "RateHistory":
+        """
+        A new history with one more period. A period with the same start
+        date is replaced (a corrected re-export).
+        """
+        if end < start:
+            raise ValueError(f"Period ends ({end}) before it starts ({start}).")
+        periods = [p for p in self.periods if p["start"] != start.isoformat()]
+        new = {"start": start.isoformat(), "end": end.isoformat(),
+               "label": label or f"{start.day} {start:%B %Y} - {end.day} {end:%B %Y}", "sources": sources or {}}
+        periods = sorted(periods + [new], key=lambda p: p["start"])
+        countries = sorted(set(self.countries) | set(cpv_lookup) | set(cps_lookup))
+
+        old_p = {p["start"]: i for i, p in enumerate(self.periods)}
+        old_c = {c: i for i, c in enumerate(self.countries)}
+        n_old = len(self.periods)
+        cpv, cps = array("d"), array("d")
+        for country in countries:
+            c = old_c.get(country)
+            for period in periods:
+                if period is new:
+                    cpv.append(cpv_lookup.get(country, math.nan))
+                    cps.append(cps_lookup.get(country, math.nan))
+                elif c is None:
+                    cpv.append(math.nan)
+                    cps.append(math.nan)
+                else:
+                    at = c * n_old + old_p[period["start"]]
+                    cpv.append(self.cpv[at])
+                    cps.append(self.cps[at])
+        return RateHistory(periods, countries, cpv, cps)
+
+    # ---------- File format ----------
+
+    def save(self, path: str) -> None:
+        """Write the history (atomic replace)."""
+        cpv, cps = array("d", self.cpv), array("d", self.cps)
+        if sys.byteorder != "little":
+            cpv.byteswap()
+            cps.byteswap()
+        header = json.dumps({"periods": self.periods, "countries": self.countries}).encode("utf-8")
+        pad = -(_PREFIX.size + len(header)) % 8
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            f.write(b"\0" * pad)
+            f.write(cpv.tobytes())
+            f.write(cps.tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "RateHistory":
+        """Read a history file; a missing file is an empty history."""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return cls.empty()
+        try:
+            magic, version, header_len = _PREFIX.unpack_from(data, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} rate history.")
+            header = json.loads(data[_PREFIX.size:_PREFIX.size + header_len])
+            periods, countries = header["periods"], header["countries"]
+        except (struct.error, KeyError, json.JSONDecodeError) as e:
+            raise ValueError(f"{path} is not a valid rate history: {e}") from e
+        offset = _PREFIX.size + header_len
+        offset += -offset % 8
+        n = len(periods) * len(countries)
+        cpv, cps = array("d"), array("d")
+        cpv.frombytes(data[offset:offset + 8 * n])
+        cps.frombytes(data[offset + 8 * n:offset + 16 * n])
+        if sys.byteorder != "little":
+            cpv.byteswap()
+            cps.byteswap()
+        return cls(periods, countries, cpv, cps)
+
+
+def append_export(cpv_file: str, cps_file: str, path: str = None,
+                  start: dt.date = None, end: dt.date = None) -> RateHistory:
+    """
+    Append an export pair to the history at path as a dated period. The
+    period comes from the CPV file's title rows unless start/end are given.
+    An export already in the history (same content hashes) is not added
+    twice.
+    """
+    from pricing_engine import load_cps, load_cpvs
+
+    path = path or default_history_path(cpv_file)
+    history = RateHistory.load(path)
+    sources = {"cpv": _fingerprint(cpv_file), "cps": _fingerprint(cps_file)}
+    hashes = (sources["cpv"]["sha256"], sources["cps"]["sha256"])
+    if any((p["sources"].get("cpv", {}).get("sha256"), p["sources"].get("cps", {}).get("sha256")) == hashes
+           for p in history.periods):
+        return history
+
+    if start is None or end is None:
+        period = export_period(cpv_file) or export_period(cps_file)
+        if period is None:
+            raise ValueError(f"No reporting period in {cpv_file}; pass the start and end dates.")
+        start, end = start or period[0], end or period[1]
+    history = history.with_period(start, end, load_cpvs(cpv_file), load_cps(cps_file), sources=sources)
+    history.save(path)
+    return history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dated rate-card history.")
+    parser.add_argument("--history", help="history file (default: next to the CPV export)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("append", help="add an export pair as a dated period")
+    add.add_argument("cpv", nargs="?", default=CPV_FILE)
+    add.add_argument("cps", nargs="?", default=CPS_FILE)
+    add.add_argument("--start", type=dt.date.fromisoformat)
+    add.add_argument("--end", type=dt.date.fromisoformat)
+    listing = sub.add_parser("list", help="list the stored periods")
+    query = sub.add_parser("query", help="rates for a country as of a date")
+    for cmd in (listing, query):
+        cmd.add_argument("--cpv", default=CPV_FILE, help="CPV export the default history sits next to")
+    query.add_argument("country")
+    query.add_argument("date", type=dt.date.fromisoformat)
+    query.add_argument("--trailing", type=int, default=0, help="average over the trailing N months")
+    args = parser.parse_args()
+
+    path = args.history or default_history_path(args.cpv)
+    try:
+        if args.command == "append":
+            history = append_export(args.cpv, args.cps, path, args.start, args.end)
+            print(f"✅ {len(history)} periods, {len(history.countries)} countries in {path}")
+            return
+        history = RateHistory.load(path)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.command == "list":
+        for p in history.periods:
+            print(f"{p['start']} → {p['end']}  {p['label']}")
+        return
+    if args.trailing:
+        cpv, cps = history.trailing_rates(args.country, args.date, args.trailing)
+    else:
+        cpv, cps = history.rates(args.country, args.date)
+    if cpv != cpv and cps != cps:
+        print(f"❌ No rates for '{args.country}' as of {args.date}.")
+        sys.exit(1)
+    print(f"{args.country.title()} as of {args.date}: CPV ₹{cpv:.2f}, CPS ₹{cps:.2f}")
+
+
+if __name__ == "__main__":
+    main()
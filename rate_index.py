@@ -0,0 +1,185 @@
+"""
+Composite (location, ad type, metric) rate index.
+
+Rates come from two places: the Google Ads exports (country → CPV and
+CPS, via RateCard) and costing.csv, a hand-kept sheet of per-location,
+per-ad-type CPM and CPS:
+
+    Location,Ad Type,CPM (INR),CPS (INR)
+    USA,Generic,2000,65
+
+RateIndex folds both into one float64 array indexed by
+(location ID, ad-type ID, metric). Every cell is resolved once, at build
+time, by walking the precedence layers in order and taking the first rate
+found:
+
+    costing          costing.csv, same location and ad type
+    costing_generic  costing.csv, same location, 'Generic' ad type
+    rate_card        the exports (CPV/CPS only, any ad type)
+    default          DEFAULT_CPV_INR / DEFAULT_CPS_INR (no CPM default)
+
+Ad types with no costing rows of their own read the Generic cells. So
+pricing a line is a single array read, and price_lines() prices a mixed
+CPM/CPV/CPS batch in one vectorized gather. Locations resolve through the
+rate card's alias index ('USA' → 'united states'). `sources` records which
+layer supplied each cell.
+"""
+from array import array
+import csv
+import math
+
+from pricing_engine import DEFAULT_CPS_INR, DEFAULT_CPV_INR, RateCard
+
+COSTING_FILE = "costing.csv"
+
+METRICS = ("cpv", "cps", "cpm")
+UNITS = {"cpv": 1, "cps": 1, "cpm": 1000}  # quantity covered by one rate
+GENERIC = "generic"
+
+LAYERS = ("costing", "costing_generic", "rate_card", "default")
+DEFAULT_PRECEDENCE = LAYERS
+_NO_SOURCE = -1
+
+
+def load_costing(filepath: str = COSTING_FILE) -> list[tuple[str, str, str, float]]:
+    """
+    (location, ad type, metric, INR) rows from a costing sheet. Metric
+    columns are recognised by their header ('CPM (INR)' → 'cpm'); empty and
+    unparseable cells are skipped.
+    """
+    with open(filepath, newline="", encoding="utf-8-sig") as f:
+        rows = [r for r in csv.reader(f) if any(c.strip() for c in r)]
+    if not rows:
+        return []
+    header = [c.split("(")[0].strip().casefold() for c in rows[0]]
+    try:
+        loc_col, ad_col = header.index("location"), header.index("ad type")
+    except ValueError:
+        raise ValueError(f"{filepath} needs 'Location' and 'Ad Type' columns.") from None
+    metric_cols = [(i, name) for i, name in enumerate(header) if name in METRICS]
+
+    out = []
+    for row in rows[1:]:
+        location = row[loc_col].strip() if loc_col < len(row) else ""
+        ad_type = (row[ad_col].strip() if ad_col < len(row) else "") or GENERIC
+        for i, metric in metric_cols:
+            try:
+                value = float(row[i].replace(",", ""))
+            except (IndexError, ValueError):
+                continue
+            if location and value == value:
+                out.append((location, ad_type.casefold(), metric, value))
+    return out
+
+
+class RateIndex:
+    """
+    Rates for every (location, ad type, metric), fallbacks already applied.
+    `rates[key(l, a, m)]` is NaN when no layer has a rate for the cell.
+    """
+
+    __slots__ = ("card", "locations", "ad_types", "rates", "sources", "precedence", "_extra_ids")
+
+    def __init__(self, card: RateCard, costing_rows, precedence=DEFAULT_PRECEDENCE):
+        unknown = set(precedence) - set(LAYERS)
+        if unknown:
+            raise ValueError(f"Unknown precedence layers: {', '.join(sorted(unknown))}. Use: {', '.join(LAYERS)}.")
+        self.card = card
+        self.precedence = tuple(precedence)
+
+        # Locations: the card's IDs first, then costing-only locations
+        self._extra_ids: dict[str, int] = {}
+        locations = list(card.names)
+        resolved = []
+        for location, ad_type, metric, value in costing_rows:
+            lid = self.location_id(location)
+            if lid < 0:
+                lid = self._extra_ids[location.strip().casefold()] = len(locations)
+                locations.append(location.strip().casefold())
+            resolved.append((lid, ad_type, metric, value))
+        self.locations = tuple(locations)
+        self.ad_types = tuple(dict.fromkeys([GENERIC, *(a for _, a, _, _ in resolved)]))
+
+        n_loc, n_ad, n_met = len(self.locations), len(self.ad_types), len(METRICS)
+        ad_ids = {a: i for i, a in enumerate(self.ad_types)}
+        costing = {(lid, ad_ids[a], METRICS.index(m)): v for lid, a, m, v in resolved}
+        self.rates = array("d", [math.nan]) * (n_loc * n_ad * n_met)
+        self.sources = array("b", [_NO_SOURCE]) * (n_loc * n_ad * n_met)
+        card_rates = (card.cpv, card.cps)
+        defaults = (DEFAULT_CPV_INR, DEFAULT_CPS_INR)
+
+        for lid in range(n_loc):
+            for aid in range(n_ad):
+                for mid in range(n_met):
+                    for layer in self.precedence:
+                        if layer == "costing":
+                            value = costing.get((lid, aid, mid), math.nan)
+                        elif layer == "costing_generic":
+                            value = costing.get((lid, 0, mid), math.nan)
+                        elif layer == "rate_card":
+                            value = card_rates[mid][lid] if mid < 2 and lid < len(card) else math.nan
+                        else:
+                            value = defaults[mid] if mid < 2 else math.nan
+                        if value == value:
+                            at = (lid * n_ad + aid) * n_met + mid
+                            self.rates[at] = value
+                            self.sources[at] = LAYERS.index(layer)
+                            break
+
+    @classmethod
+    def from_files(cls, card: RateCard, costing_file: str = COSTING_FILE,
+                   precedence=DEFAULT_PRECEDENCE) -> "RateIndex":
+        return cls(card, load_costing(costing_file), precedence)
+
+    def location_id(self, location: str) -> int:
+        """ID of a location (export name, alias or costing-only name), or -1."""
+        lid = self.card.id(location)
+        return lid if lid >= 0 else self._extra_ids.get(location.strip().casefold(), -1)
+
+    def key(self, location: str, ad_type: str = GENERIC, metric: str = "cpv") -> int:
+        """
+        Flat position of a cell in `rates`, or -1 for an unknown location or
+        metric. Ad types without rates of their own use the Generic cells.
+        """
+        lid = self.location_id(location)
+        folded = ad_type.strip().casefold()
+        aid = self.ad_types.index(folded) if folded in self.ad_types else 0
+        mid = METRICS.index(metric) if metric in METRICS else -1
+        if lid < 0 or mid < 0:
+            return -1
+        return (lid * len(self.ad_types) + aid) * len(METRICS) + mid
+
+    def rate(self, location: str, ad_type: str = GENERIC, metric: str = "cpv") -> tuple[float, str | None]:
+        """(INR rate, layer that supplied it); (NaN, None) if nothing applies."""
+        at = self.key(location, ad_type, metric)
+        if at < 0 or self.sources[at] == _NO_SOURCE:
+            return math.nan, None
+        return self.rates[at], LAYERS[self.sources[at]]
+
+    def price_lines(self, locations, ad_types, metrics, quantities):
+        """
+        Price mixed lines in one pass: (cost INR, rate, source layer index)
+        as NumPy arrays. quantity is views (CPV), subscribers (CPS) or
+        impressions (CPM, priced per thousand). Each distinct
+        (location, ad type, metric) is resolved once. Raises KeyError
+        listing every line key without a rate.
+        """
+        import numpy as np
+
+        quantities = np.asarray(quantities, dtype=np.float64)
+        if not (len(locations) == len(ad_types) == len(metrics) == len(quantities)):
+            raise ValueError("locations, ad_types, metrics and quantities must have the same length.")
+        memo: dict[tuple, int] = {}
+        keys = np.fromiter(
+            (memo[k] if k in memo else memo.setdefault(k, self.key(*k))
+             for k in zip(locations, ad_types, metrics)),
+            dtype=np.int64, count=len(quantities),
+        )
+        rates = np.frombuffer(self.rates, dtype=np.float64)
+        sources = np.frombuffer(self.sources, dtype=np.int8)
+        missing = [k for k, at in memo.items() if at < 0 or sources[at] == _NO_SOURCE]
+        if missing:
+            raise KeyError("No rate for: " + ", ".join(f"{l} / {a} / {m.upper()}" for l, a, m in missing))
+        units = np.array([UNITS[m] for m in METRICS], dtype=np.float64)[keys % len(METRICS)]
+        line_rates = rates[keys]
+        return quantities / units * line_rates, line_rates, sources[keys]
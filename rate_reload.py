@@ -0,0 +1,95 @@
+"""
+Incremental rate-card reload.
+
+IncrementalRateCard keeps the raw rate cell of every country from the last
+read of each export. When a source's size/mtime changes, refresh() re-reads
+the rows and parses only the cells whose text changed. It then derives a new
+RateCard that shares names/IDs with the old one and patches just those
+rates. Each effective change bumps `version` and records which countries
+changed, so downstream caches can key on version_of(countries) and drop
+only the entries that depend on those countries.
+"""
+from collections import deque
+import threading
+from typing import NamedTuple
+
+from pricing_engine import (
+    DEFAULT_CPS_INR,
+    DEFAULT_CPV_INR,
+    RateCard,
+    parse_rate,
+    read_country_cells,
+)
+from rate_snapshot import source_stamp
+
+_ZERO_DEFAULTS = {"cpv": DEFAULT_CPV_INR, "cps": DEFAULT_CPS_INR}
+
+
+class RateCardUpdate(NamedTuple):
+    version: int
+    changed: frozenset[str]  # countries whose CPV or CPS changed, appeared or vanished
+
+
+class IncrementalRateCard:
+    """A RateCard kept current by row-level diffs of its source CSVs."""
+
+    def __init__(self, cpv_file: str, cps_file: str, history: int = 256):
+        self.files = {"cpv": cpv_file, "cps": cps_file}
+        self._stamps = {name: source_stamp(path) for name, path in self.files.items()}
+        self._cells = {name: read_country_cells(path) for name, path in self.files.items()}
+        self._lock = threading.Lock()
+        self.version = 1
+        self.card = RateCard.from_lookups(
+            *({k: parse_rate(c, _ZERO_DEFAULTS[name]) for k, c in self._cells[name].items()}
+              for name in ("cpv", "cps"))
+        )
+        self.country_versions: dict[str, int] = {}
+        self.history: deque[RateCardUpdate] = deque(maxlen=history)
+
+    def refresh(self) -> RateCardUpdate | None:
+        """
+        Pick up changes to either export. Returns the update, or None if no
+        rate changed (untouched files, or a re-save with identical rows).
+        Safe to call from several threads; `card` is swapped, never mutated.
+        """
+        with self._lock:
+            updates = {"cpv": {}, "cps": {}}
+            for name, path in self.files.items():
+                stamp = source_stamp(path)
+                if stamp == self._stamps[name]:
+                    continue
+                old, new = self._cells[name], read_country_cells(path)
+                for key in old.keys() | new.keys():
+                    cell = new.get(key)
+                    if cell != old.get(key):
+                        updates[name][key] = float("nan") if cell is None else parse_rate(cell, _ZERO_DEFAULTS[name])
+                self._cells[name] = new
+                self._stamps[name] = stamp
+
+            changed = frozenset(updates["cpv"]) | frozenset(updates["cps"])
+            if not changed:
+                return None
+            self.card = self.card.with_rates(updates["cpv"], updates["cps"])
+            self.version += 1
+            for key in changed:
+                self.country_versions[key] = self.version
+            update = RateCardUpdate(self.version, changed)
+            self.history.append(update)
+            return update
+
+    def version_of(self, countries) -> int:
+        """
+        The latest version in which any of these countries changed (0 if
+        never). Use it as a cache key for results that depend only on them.
+        """
+        return max((self.country_versions.get(c.strip().casefold(), 0) for c in countries), default=0)
+
+    def changed_since(self, version: int) -> set[str] | None:
+        """Countries changed after `version`, or None if history no longer reaches back that far."""
+        with self._lock:  # refresh() appends from the reload thread
+            current, history = self.version, list(self.history)
+        if version >= current:
+            return set()
+        if not history or history[0].version > version + 1:
+            return None
+        return {c for u in history if u.version > version for c in u.changed}
@@ -0,0 +1,240 @@
+"""
+Compiled, memory-mappable rate-card snapshot.
+
+Parsing the raw Google Ads exports (title rows, header sniffing, #DIV/0!
+cells) dominates CLI start time. This module compiles the CPV and CPS CSVs
+once into a small binary file:
+
+    magic (8s) | version (u32) | header length (u32) | JSON header | pad
+    CPV float64[n] | CPS float64[n] | country names (UTF-8, '\\n'-joined)
+
+Countries are stored sorted, so the index can be searched with bisect.
+A country present in only one source has NaN for the other rate, and the
+built-in worldwide row is compiled in, so RateCard.from_files wraps the
+mapped CPV/CPS columns as its rate arrays without copying them. The JSON
+header records each source's size, mtime and SHA-256; the snapshot is
+rebuilt only when a source actually changes.
+
+Build step:  python rate_snapshot.py [cpv.csv cps.csv [out.snapshot]]
+"""
+from array import array
+import bisect
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from instrumentation import cache_hit, cache_miss
+
+MAGIC = b"RATESNAP"
+VERSION = 3
+_PREFIX = struct.Struct("<8sII")
+
+CPV_FILE = "data/Cost_Conv_Location_CPV.csv"
+CPS_FILE = "data/Cost_Conv_Location_CPS.csv"
+
+
+def default_snapshot_path(cpv_file: str) -> str:
+    """Snapshots live next to the CPV export by default."""
+    return os.path.join(os.path.dirname(os.path.abspath(cpv_file)), "rates.snapshot")
+
+
+# ---------- Source fingerprints ----------
+
+def _stat_key(path: str) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _fingerprint(path: str) -> dict:
+    return {**_stat_key(path), "sha256": _sha256(path)}
+
+
+def source_stamp(*paths: str) -> tuple:
+    """Cheap (size, mtime) stamp of source files, for keying derived caches."""
+    return tuple((k["size"], k["mtime_ns"]) for k in map(_stat_key, paths))
+
+
+# ---------- Snapshot ----------
+
+class RateSnapshot:
+    """
+    Read-only view over a compiled snapshot. `cpv` and `cps` are float64
+    memoryviews backed by the mmap (wrap with np.frombuffer for NumPy);
+    `countries` is the sorted casefolded index.
+    """
+
+    def __init__(self, path: str, header: dict, countries: list[str], cpv, cps, mm=None):
+        self.path = path
+        self.header = header
+        self.countries = countries
+        self.cpv = cpv
+        self.cps = cps
+        self._mm = mm
+
+    def __len__(self):
+        return len(self.countries)
+
+    def index(self, key: str) -> int:
+        """Position of a casefolded country in the sorted index, or -1."""
+        i = bisect.bisect_left(self.countries, key)
+        if i < len(self.countries) and self.countries[i] == key:
+            return i
+        return -1
+
+    def _lookup(self, values) -> dict[str, float]:
+        return {c: v for c, v in zip(self.countries, values.tolist()) if v == v}
+
+    def cpv_lookup(self) -> dict[str, float]:
+        """Same mapping load_cpvs returns: lowercase country → CPV_INR."""
+        return self._lookup(self.cpv)
+
+    def cps_lookup(self) -> dict[str, float]:
+        """Same mapping load_cps returns: lowercase country → CPS_INR."""
+        return self._lookup(self.cps)
+
+    def close(self):
+        for view in (self.cpv, self.cps):
+            if isinstance(view, memoryview):
+                view.release()
+        self.cpv = self.cps = None
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # a caller still holds a rate array; unmapped on GC
+            self._mm = None
+
+
+def write_snapshot(path: str, cpv_lookup: dict[str, float], cps_lookup: dict[str, float],
+                   sources: dict) -> None:
+    """Serialize two lookups into a snapshot file (atomic replace)."""
+    countries = sorted(set(cpv_lookup) | set(cps_lookup))
+    cpv = array("d", (cpv_lookup.get(c, math.nan) for c in countries))
+    cps = array("d", (cps_lookup.get(c, math.nan) for c in countries))
+    if sys.byteorder != "little":
+        cpv.byteswap()
+        cps.byteswap()
+    names = "\n".join(countries).encode("utf-8")
+
+    header = json.dumps({"count": len(countries), "names_len": len(names),
+                         "sources": sources}).encode("utf-8")
+    data_offset = _PREFIX.size + len(header)
+    pad = -data_offset % 8
+
+    # a unique temp file per call: the reload thread and the app may both rebuild at once
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(path)),
+                                     prefix=os.path.basename(path) + ".", suffix=".tmp", delete=False) as f:
+        try:
+            f.write(_PREFIX.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            f.write(b"\0" * pad)
+            f.write(cpv.tobytes())
+            f.write(cps.tobytes())
+            f.write(names)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, path)
+
+
+def read_snapshot(path: str) -> RateSnapshot:
+    """Map a snapshot file into memory. Raises ValueError if it is not one."""
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        magic, version, header_len = _PREFIX.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} rate snapshot.")
+        header = json.loads(mm[_PREFIX.size:_PREFIX.size + header_len])
+        n = header["count"]
+        offset = _PREFIX.size + header_len
+        offset += -offset % 8
+        if sys.byteorder != "little":
+            raise ValueError("memory-mapped snapshots require a little-endian host.")
+        view = memoryview(mm)
+        cpv = view[offset:offset + 8 * n].cast("d")
+        cps = view[offset + 8 * n:offset + 16 * n].cast("d")
+        view.release()
+        names_at = offset + 16 * n
+        blob = mm[names_at:names_at + header["names_len"]].decode("utf-8")
+    except (struct.error, KeyError, json.JSONDecodeError) as e:
+        mm.close()
+        raise ValueError(f"{path} is not a valid rate snapshot: {e}") from e
+    countries = blob.split("\n") if n else []
+    return RateSnapshot(path, header, countries, cpv, cps, mm)
+
+
+def build_snapshot(cpv_file: str, cps_file: str, path: str = None) -> str:
+    """
+    Parse both CSVs with the regular loaders and compile a snapshot, with
+    the worldwide row RateCard.from_lookups adds (an export's own wins).
+    """
+    from pricing_engine import WORLDWIDE, WORLDWIDE_CPS_INR, WORLDWIDE_CPV_INR, load_cps, load_cpvs
+
+    path = path or default_snapshot_path(cpv_file)
+    sources = {"cpv": _fingerprint(cpv_file), "cps": _fingerprint(cps_file)}
+    write_snapshot(path, {WORLDWIDE: WORLDWIDE_CPV_INR, **load_cpvs(cpv_file)},
+                   {WORLDWIDE: WORLDWIDE_CPS_INR, **load_cps(cps_file)}, sources)
+    return path
+
+
+def load_snapshot(cpv_file: str, cps_file: str, path: str = None) -> RateSnapshot:
+    """
+    Return an up-to-date snapshot for the two sources, compiling it if
+    missing or stale. Matching size/mtime skips hashing entirely; if only
+    the stat changed but the content hash matches, the header is refreshed
+    without reparsing the CSVs.
+    """
+    path = path or default_snapshot_path(cpv_file)
+    files = {"cpv": cpv_file, "cps": cps_file}
+
+    try:
+        snap = read_snapshot(path)
+    except (OSError, ValueError):
+        cache_miss("rate_snapshot")
+        build_snapshot(cpv_file, cps_file, path)
+        return read_snapshot(path)
+
+    recorded = snap.header.get("sources", {})
+    stale = {name for name, src in files.items()
+             if {k: recorded.get(name, {}).get(k) for k in ("size", "mtime_ns")} != _stat_key(src)}
+    if not stale:
+        cache_hit("rate_snapshot")
+        return snap
+
+    fresh = {name: _fingerprint(src) for name, src in files.items()}
+    if all(fresh[name]["sha256"] == recorded.get(name, {}).get("sha256") for name in stale):
+        cache_hit("rate_snapshot")
+        cpv_lookup, cps_lookup = snap.cpv_lookup(), snap.cps_lookup()
+        snap.close()
+        write_snapshot(path, cpv_lookup, cps_lookup, fresh)
+    else:
+        cache_miss("rate_snapshot")
+        snap.close()
+        build_snapshot(cpv_file, cps_file, path)
+    return read_snapshot(path)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    cpv_file = args[0] if len(args) > 0 else CPV_FILE
+    cps_file = args[1] if len(args) > 1 else CPS_FILE
+    out = args[2] if len(args) > 2 else None
+    out = build_snapshot(cpv_file, cps_file, out)
+    snap = read_snapshot(out)
+    print(f"✅ Compiled {len(snap)} countries into {out} ({os.path.getsize(out)} bytes)")
+    snap.close()
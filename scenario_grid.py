@@ -0,0 +1,207 @@
+"""
+Markup × volume scenario sweeps.
+
+"What does this deal look like at 40-65% markup and 50k-1M views?" is a
+grid over country mixes × views × subscribers × markups. A mix blends its
+countries' rates by share, so a cell's internal cost is
+
+    views × blended CPV + subs × blended CPS
+
+and the whole grid is one broadcast over the four axes. Cells whose subs
+exceed max_subs_ratio × views (the app's 5% cap) are NaN. Very large grids
+are computed in chunks of the views axis across a process pool.
+
+    python scenario_grid.py --views 50000:1000000:50000 --subs 0:50000:2500 \\
+        --markup 40:65:5 --mix worldwide --mix "india:60, usa:40" --out grid.parquet
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import sys
+
+import numpy as np
+
+from pricing_engine import INR_TO_USD, WORLDWIDE, RateCard
+from rate_snapshot import CPS_FILE, CPV_FILE
+
+MAX_SUBS_RATIO = 0.05
+CHUNK_CELLS = 4_000_000  # grid cells per process-pool task
+
+
+def parse_range(text: str, cast=float) -> np.ndarray:
+    """'start:stop:step' (stop included) or 'a,b,c' as an array."""
+    if ":" in text:
+        start, stop, step = (cast(p) for p in text.split(":"))
+        if step <= 0:
+            raise ValueError(f"Step must be positive in '{text}'.")
+        return np.arange(start, stop + step / 2, step)
+    return np.array([cast(p) for p in text.split(",") if p.strip()])
+
+
+def parse_mix(card: RateCard, text: str) -> tuple[str, float, float]:
+    """
+    (label, blended CPV, blended CPS) for 'worldwide', 'india:60, usa:40'
+    (weights) or 'india, france' (even). Raises KeyError for unknown
+    countries and ValueError for malformed weights.
+    """
+    text = text.strip()
+    if text.casefold() == WORLDWIDE:
+        cpv, cps = card.rates(WORLDWIDE)
+        return "Worldwide", cpv, cps
+    parts = [p.strip() for p in text.split(",") if p.strip()]
+    if not parts:
+        raise ValueError("Empty country mix.")
+    weights = {}
+    for part in parts:
+        country, _, weight = part.partition(":")
+        try:
+            weights[country.strip()] = float(weight) if weight.strip() else 1.0
+        except ValueError:
+            raise ValueError(f"Invalid weight for '{country.strip()}'.") from None
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Mix weights must add up to more than zero.")
+
+    cpv = cps = 0.0
+    for country, weight in weights.items():
+        cid = card.id(country)
+        if not card.complete(cid):
+            raise KeyError(card.missing_message(country))
+        cpv += card.cpv[cid] * weight / total
+        cps += card.cps[cid] * weight / total
+    return text, cpv, cps
+
+
+class ScenarioGrid:
+    """
+    Priced grid. Arrays are shaped (mixes, views, subs, markups); internal
+    cost does not depend on markup and is shaped (mixes, views, subs).
+    """
+
+    def __init__(self, mixes, views, subs, markups, internal_inr, client_inr, client_usd):
+        self.mixes = list(mixes)
+        self.views = views
+        self.subs = subs
+        self.markups = markups
+        self.internal_inr = internal_inr
+        self.client_inr = client_inr
+        self.client_usd = client_usd
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return self.client_inr.shape
+
+    def to_frame(self):
+        """Long format, one row per cell with a valid price."""
+        import pandas as pd
+
+        m, v, s, k = np.indices(self.shape).reshape(4, -1)
+        frame = pd.DataFrame({
+            "mix": np.array(self.mixes, dtype=object)[m],
+            "views": self.views[v],
+            "subs": self.subs[s],
+            "markup": self.markups[k],
+            "internal_inr": self.internal_inr[m, v, s],
+            "client_inr": self.client_inr.reshape(-1),
+            "client_usd": self.client_usd.reshape(-1),
+        })
+        return frame[frame["client_inr"].notna()].reset_index(drop=True)
+
+    def heatmap_frame(self, mix: int = 0, subs: int = 0):
+        """Markup × views client USD for one mix and subscriber count (for charts)."""
+        import pandas as pd
+
+        usd = self.client_usd[mix, :, subs, :]
+        v, k = np.indices(usd.shape).reshape(2, -1)
+        return pd.DataFrame({"views": self.views[v], "markup": self.markups[k], "client_usd": usd.reshape(-1)})
+
+    def export(self, path: str) -> int:
+        """Write CSV, or Parquet for *.parquet (needs pyarrow). Returns the row count."""
+        frame = self.to_frame()
+        if path.endswith(".parquet"):
+            frame.to_parquet(path, index=False)
+        else:
+            frame.to_csv(path, index=False)
+        return len(frame)
+
+
+def _price_block(cpv, cps, views, subs, markups, max_subs_ratio):
+    """(internal INR, client INR, client USD) for one block, rounded like calculate_cost."""
+    internal = (views[None, :, None] * cpv[:, None, None]
+                + subs[None, None, :] * cps[:, None, None])
+    if max_subs_ratio is not None:
+        internal = np.where(subs[None, None, :] <= max_subs_ratio * views[None, :, None], internal, np.nan)
+    client = internal[..., None] * (1 + markups / 100.0)
+    return np.round(internal, 2), np.round(client, 2), np.round(client * INR_TO_USD, 2)
+
+
+def sweep(card: RateCard, mixes: list[str], views, subs, markups,
+          max_subs_ratio: float | None = MAX_SUBS_RATIO, workers: int = None,
+          chunk_cells: int = CHUNK_CELLS) -> ScenarioGrid:
+    """
+    Price every mix × views × subs × markup combination. Grids larger than
+    chunk_cells are split along the views axis and priced across `workers`
+    processes (default: CPU count); smaller ones are priced in-process.
+    """
+    parsed = [parse_mix(card, m) for m in mixes]
+    labels = [p[0] for p in parsed]
+    cpv = np.array([p[1] for p in parsed], dtype=np.float64)
+    cps = np.array([p[2] for p in parsed], dtype=np.float64)
+    views = np.asarray(views, dtype=np.float64)
+    subs = np.asarray(subs, dtype=np.float64)
+    markups = np.asarray(markups, dtype=np.float64)
+
+    cells = len(cpv) * len(views) * len(subs) * len(markups)
+    workers = workers or os.cpu_count() or 1
+    if cells <= chunk_cells or workers <= 1 or len(views) < 2:
+        internal, client, usd = _price_block(cpv, cps, views, subs, markups, max_subs_ratio)
+    else:
+        per_view = cells // len(views)
+        step = max(1, chunk_cells // per_view)
+        chunks = [views[i:i + step] for i in range(0, len(views), step)]
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            blocks = list(pool.map(_price_block, *zip(*[(cpv, cps, c, subs, markups, max_subs_ratio)
+                                                         for c in chunks])))
+        internal, client, usd = (np.concatenate([b[i] for b in blocks], axis=1) for i in range(3))
+    return ScenarioGrid(labels, views, subs, markups, internal, client, usd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Price a markup × volume scenario grid.")
+    parser.add_argument("--views", required=True, help="start:stop:step or a,b,c")
+    parser.add_argument("--subs", default="0", help="start:stop:step or a,b,c")
+    parser.add_argument("--markup", default="40:65:5", help="markup %% range")
+    parser.add_argument("--mix", action="append", required=True,
+                        help="'worldwide', 'india:60, usa:40' or 'india, france' (repeatable)")
+    parser.add_argument("--no-subs-cap", action="store_true",
+                        help="price cells with subs above 5%% of views")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", help="CSV or .parquet file (default: print a summary)")
+    parser.add_argument("--cpv", default=CPV_FILE)
+    parser.add_argument("--cps", default=CPS_FILE)
+    args = parser.parse_args()
+
+    try:
+        card = RateCard.from_files(args.cpv, args.cps)
+        grid = sweep(card, args.mix, parse_range(args.views, int), parse_range(args.subs, int),
+                     parse_range(args.markup), None if args.no_subs_cap else MAX_SUBS_RATIO, args.workers)
+    except KeyError as e:
+        print(f"❌ {e.args[0]}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    shape = " × ".join(str(n) for n in grid.shape)
+    if args.out:
+        rows = grid.export(args.out)
+        print(f"✅ {shape} grid, {rows:,} priced cells → {args.out}")
+        return
+    print(f"📈 {shape} grid (mixes × views × subs × markups)")
+    for i, label in enumerate(grid.mixes):
+        usd = grid.client_usd[i]
+        print(f"  {label}: ${np.nanmin(usd):,.2f} – ${np.nanmax(usd):,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Incrementally priced custom split, for the app's editable split table.
+
+Re-pricing a 200-country split from scratch on every edit means parsing,
+rate lookups and breakdown rendering for every row. A SplitQuote keeps the
+rows, their rates and running micro-rupee totals instead; update() diffs
+the new rows against the old ones and applies only the deltas:
+
+    views_micro += (new views × CPV) − (old views × CPV)   per changed row
+    subs_micro  += (new subs − old subs) × CPS              per row whose share moved
+
+Subscribers are reallocated over all rows with allocate_subs (any views
+change moves every share), but only rows whose views, subs or country
+changed get their breakdown lines re-rendered. quote() gives the same
+Quote as quote_custom on the same rows.
+"""
+from pricing_engine import MICRO, Quote, RateCard, _label, allocate_subs, breakdown_lines, to_micro
+
+
+class SplitQuote:
+    """Rows of (country, views) with cached rates, subs, breakdown lines and totals."""
+
+    def __init__(self, card: RateCard):
+        self.card = card
+        self.countries: list[str] = []
+        self.views: list[int] = []
+        self.subs: list[int] = []
+        self.total_subs = 0
+        self.total_views = 0
+        self.views_micro = 0
+        self.subs_micro = 0
+        self.errors: dict[int, str] = {}  # row → missing-rate message
+        self._rates: list[tuple] = []  # (label, CPV, CPS, CPV micro, CPS micro), or None if unknown
+        self._lines: list[list[str] | None] = []  # rendered breakdown, None when stale
+
+    @property
+    def internal_inr(self) -> float:
+        return (self.views_micro + self.subs_micro) / MICRO
+
+    def _rates_for(self, country: str):
+        cid = self.card.id(country)
+        if not self.card.complete(cid):
+            return None
+        cpv, cps = self.card.cpv[cid], self.card.cps[cid]
+        return _label(self.card, country), cpv, cps, to_micro(cpv), to_micro(cps)
+
+    def _remove(self, i: int):
+        if self._rates[i] is not None:
+            self.views_micro -= self.views[i] * self._rates[i][3]
+            self.subs_micro -= self.subs[i] * self._rates[i][4]
+        self.total_views -= self.views[i]
+
+    def update(self, rows, total_subs: int = None) -> list[int]:
+        """
+        Make the split equal `rows` ((country, views) pairs) with total_subs
+        subscribers (None keeps the current total). Returns the positions
+        whose breakdown changed.
+        """
+        rows = [(str(country).strip(), int(views)) for country, views in rows]
+        changed = set()
+
+        for i in range(len(rows), len(self.countries)):
+            self._remove(i)
+            self.errors.pop(i, None)
+        del self.countries[len(rows):], self.views[len(rows):], self.subs[len(rows):]
+        del self._rates[len(rows):], self._lines[len(rows):]
+
+        for i, (country, views) in enumerate(rows):
+            if i < len(self.countries):
+                if self.countries[i] == country and self.views[i] == views:
+                    continue
+                self._remove(i)
+                if self.countries[i] != country:
+                    self._rates[i] = self._rates_for(country)
+                self.countries[i], self.views[i] = country, views
+            else:
+                self.countries.append(country)
+                self.views.append(views)
+                self.subs.append(0)
+                self._rates.append(self._rates_for(country))
+                self._lines.append(None)
+            rates = self._rates[i]
+            if rates is None:
+                self.errors[i] = self.card.missing_message(country)
+            else:
+                self.errors.pop(i, None)
+                self.views_micro += views * rates[3]
+                self.subs_micro += self.subs[i] * rates[4]
+            self.total_views += views
+            changed.add(i)
+
+        if total_subs is not None:
+            self.total_subs = total_subs
+        subs = allocate_subs(self.total_subs, self.views) if self.total_views > 0 else [0] * len(rows)
+        for i, (old, new) in enumerate(zip(self.subs, subs)):
+            if old != new:
+                if self._rates[i] is not None:
+                    self.subs_micro += (new - old) * self._rates[i][4]
+                self.subs[i] = new
+                changed.add(i)
+
+        for i in changed:
+            self._lines[i] = None
+        return sorted(changed)
+
+    def _render(self, i: int) -> list[str]:
+        if self._lines[i] is None:
+            label, cpv, cps = self._rates[i][:3]
+            self._lines[i] = breakdown_lines(label, self.views[i], self.subs[i], cpv, cps)
+        return self._lines[i]
+
+    def breakdown(self) -> list[str]:
+        """Breakdown lines for every priced row; only stale rows are re-rendered."""
+        return [text for i, rates in enumerate(self._rates) if rates is not None for text in self._render(i)]
+
+    def quote(self) -> Quote:
+        """
+        The split as a Quote, carrying breakdown() so neither the display
+        nor the ledger re-renders unchanged rows. Raises KeyError for the
+        first unknown country.
+        """
+        if self.errors:
+            raise KeyError(self.errors[min(self.errors)])
+        if not self.countries:
+            raise ValueError("Add at least one country:views row.")
+        return Quote("custom", [(label, v, s, cpv, cps) for (label, cpv, cps, _, _), v, s
+                                in zip(self._rates, self.views, self.subs)], self.breakdown())
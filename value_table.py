@@ -0,0 +1,194 @@
+"""
+Per-country value ranking and reverse-budget table.
+
+The budget tabs buy every country as the same bundle, views plus 5%
+subscribers, so one view costs
+
+    unit = CPV + SUBS_RATIO × CPS   (INR)
+
+A ValueTable computes that unit once for every country with both rates,
+sorts the countries cheapest first and indexes them by region (UN M49
+region and subregion, from data/country_regions.csv via the ISO-2 codes in
+the alias table). Top-N cheapest or most expensive, with or without a
+region filter, is then a slice, and "what does $X buy in each country" is
+one vectorized division over the whole card:
+
+    views = ⌊budget INR / unit⌋,  subs = ⌊SUBS_RATIO × views⌋
+
+The table also keeps the unit for every card ID (falling back to the
+default rates like RateCard.rates), so single-country budget lookups are
+one array read. Build it once per rate card; the app memoizes it in
+quote_memo.
+
+    python value_table.py --top 10 --region asia --budget 500
+"""
+import argparse
+import csv
+from functools import lru_cache
+import os
+import sys
+
+import numpy as np
+
+from budget_optimizer import SUBS_RATIO
+from country_aliases import load_alias_table
+from pricing_engine import DEFAULT_CPS_INR, DEFAULT_CPV_INR, INR_TO_USD, RateCard, _label
+from rate_snapshot import CPS_FILE, CPV_FILE
+
+REGIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "country_regions.csv")
+OTHER_REGION = "Other"
+
+
+@lru_cache(maxsize=4)
+def load_region_table(path: str = REGIONS_FILE) -> dict[str, tuple[str, str]]:
+    """ISO-2 code → (region, subregion)."""
+    table = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = csv.reader(f)
+        next(rows, None)
+        for row in rows:
+            if len(row) >= 3:
+                table[row[0].strip().upper()] = (row[1].strip(), row[2].strip())
+    return table
+
+
+def country_regions(names, path: str = REGIONS_FILE) -> list[tuple[str, str]]:
+    """(region, subregion) per casefolded export name; OTHER_REGION when unmapped."""
+    aliases, regions = load_alias_table(), load_region_table(path)
+    unknown = (OTHER_REGION, OTHER_REGION)
+    return [regions.get(aliases[name][0], unknown) if name in aliases else unknown for name in names]
+
+
+class ValueTable:
+    """
+    Countries sorted by bundle cost per view, cheapest first. Row i is
+    `keys[i]` (casefolded card name) with `unit_inr[i]`; `rank` maps a card
+    ID to its row (-1 if unranked) and `unit_by_id` holds the unit for
+    every card ID.
+    """
+
+    def __init__(self, card: RateCard, regions_file: str = REGIONS_FILE):
+        self.card = card
+        cpv, cps = card.rate_arrays()
+        ids = np.array([card.ids[name] for name in card.country_names()], dtype=np.int64)
+        unit = cpv[ids] + SUBS_RATIO * cps[ids]
+        keep = unit > 0  # NaN (a missing rate) compares False too
+        ids, unit = ids[keep], unit[keep]
+        order = np.argsort(unit, kind="stable")
+
+        self.ids = ids[order]
+        self.unit_inr = unit[order]
+        self.cpv = cpv[self.ids]
+        self.cps = cps[self.ids]
+        self.keys = [card.names[cid] for cid in self.ids.tolist()]
+        self.labels = [_label(card, key) for key in self.keys]
+        self.regions = country_regions(self.keys, regions_file)
+
+        self.rank = np.full(len(card), -1, dtype=np.int64)
+        self.rank[self.ids] = np.arange(len(self.ids))
+        self.unit_by_id = (np.where(np.isnan(cpv), DEFAULT_CPV_INR, cpv)
+                           + SUBS_RATIO * np.where(np.isnan(cps), DEFAULT_CPS_INR, cps))
+
+        # region or subregion (casefolded) → rows, ascending, so still cheapest first
+        by_region = {}
+        for row, names in enumerate(self.regions):
+            for name in set(names):
+                by_region.setdefault(name.casefold(), []).append(row)
+        self._by_region = {name: np.array(rows, dtype=np.int64) for name, rows in by_region.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def region_names(self) -> list[str]:
+        """Regions then subregions present in the table, e.g. ['Africa', ..., 'Eastern Asia', ...]."""
+        regions = sorted({r for r, _ in self.regions})
+        return regions + sorted({s for _, s in self.regions} - set(regions))
+
+    def rows_in(self, region: str = None):
+        """Row numbers in a region or subregion (any case), cheapest first; all rows for None."""
+        if not region:
+            return np.arange(len(self.ids))
+        try:
+            return self._by_region[region.strip().casefold()]
+        except KeyError:
+            raise ValueError(f"Unknown region '{region}'. Regions: {', '.join(self.region_names())}") from None
+
+    def cheapest(self, n: int = 10, region: str = None):
+        """Rows of the n cheapest countries per bundle view."""
+        return self.rows_in(region)[:n]
+
+    def most_expensive(self, n: int = 10, region: str = None):
+        """Rows of the n most expensive countries, most expensive first."""
+        return self.rows_in(region)[::-1][:n]
+
+    def unit(self, country: str) -> float:
+        """Bundle cost per view (INR) for any name or alias; default rates if unknown."""
+        cid = self.card.id(country)
+        if cid < 0:
+            return DEFAULT_CPV_INR + SUBS_RATIO * DEFAULT_CPS_INR
+        return float(self.unit_by_id[cid])
+
+    def views_per_usd(self, rows=None):
+        return 1.0 / (self.unit_inr if rows is None else self.unit_inr[rows]) / INR_TO_USD
+
+    def reverse_budget(self, usd, rows=None):
+        """
+        (views, subs) int64 arrays for a USD budget spent entirely in each
+        country. `usd` may be an array of amounts: the result then has one
+        row per amount and one column per country.
+        """
+        unit = self.unit_inr if rows is None else self.unit_inr[rows]
+        inr = np.asarray(usd, dtype=np.float64) / INR_TO_USD
+        if inr.ndim:
+            inr = inr[:, None]
+        views = np.floor(inr / unit).astype(np.int64)
+        return views, np.floor(SUBS_RATIO * views).astype(np.int64)
+
+    def frame(self, rows=None, usd: float = None):
+        """The rows as a DataFrame, with Views/Subs columns for a USD budget."""
+        import pandas as pd
+
+        rows = np.arange(len(self.ids)) if rows is None else np.asarray(rows, dtype=np.int64)
+        data = {
+            "Rank": rows + 1,
+            "Country": [self.labels[r] for r in rows.tolist()],
+            "Region": [self.regions[r][0] for r in rows.tolist()],
+            "Subregion": [self.regions[r][1] for r in rows.tolist()],
+            "CPV (INR)": self.cpv[rows],
+            "CPS (INR)": self.cps[rows],
+            "Cost per view + 5% subs (INR)": self.unit_inr[rows],
+            "Views per $": self.views_per_usd(rows),
+        }
+        if usd is not None:
+            data["Views"], data["Subs"] = self.reverse_budget(usd, rows)
+        return pd.DataFrame(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank countries by bundle cost per view.")
+    parser.add_argument("--top", type=int, default=10, help="countries to list")
+    parser.add_argument("--expensive", action="store_true", help="most expensive first")
+    parser.add_argument("--region", help="region or subregion, e.g. 'Asia' or 'Western Europe'")
+    parser.add_argument("--budget", type=float, help="USD budget to spend in each listed country")
+    parser.add_argument("--cpv", default=CPV_FILE)
+    parser.add_argument("--cps", default=CPS_FILE)
+    args = parser.parse_args()
+
+    table = ValueTable(RateCard.from_files(args.cpv, args.cps))
+    try:
+        rows = (table.most_expensive if args.expensive else table.cheapest)(args.top, args.region)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    views, subs = table.reverse_budget(args.budget, rows) if args.budget else (None, None)
+    for i, row in enumerate(rows.tolist()):
+        line = (f"{row + 1:>4}. {table.labels[row]:<32} ₹{table.unit_inr[row]:.4f}/view"
+                f"  {table.views_per_usd(row):,.0f} views per $")
+        if views is not None:
+            line += f"  ${args.budget:,.0f} → {views[i]:,} views + {subs[i]:,} subs"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()